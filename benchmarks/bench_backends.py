@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.cache import add_cache_arguments, cache_from_args
+from common.client import DblpClient
+from common.search import (DBLP_API_URL, DBLP_SEARCH_URL, api_payload, html_payload,
+                           parse_api_page, parse_html_page)
+
+
+# Compare bytes transferred and parse time per 1000 records for the html and json backends
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dblp search backends.")
+    parser.add_argument("--query", default="attack|detection streamid:conf/ccs:",
+                        help="dblp query to fetch with both backends.")
+    parser.add_argument("--record-class", choices=["inproceedings", "article"], default="inproceedings")
+    parser.add_argument("--pages", type=int, default=1, metavar="INT",
+                        help="Number of 1000-hit pages fetched per backend. Default: 1")
+    parser.add_argument("--repeat", type=int, default=5, metavar="INT",
+                        help="Parse each page this many times and keep the best time. Default: 5")
+    add_cache_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def best_of(repeat, func, *func_args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*func_args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_backend(client, name, args):
+    total_bytes = 0
+    total_records = 0
+    total_parse = 0.0
+    for page in range(args.pages):
+        if name == "json":
+            r = client.get(DBLP_API_URL, api_payload(args.query, page))
+            parse_time, (records, _, _) = best_of(args.repeat, lambda: parse_api_page(r.json(), args.record_class))
+        else:
+            r = client.get(DBLP_SEARCH_URL, html_payload(args.query, page))
+            parse_time, (records, _) = best_of(args.repeat, parse_html_page, r.text, args.record_class)
+        if not records:
+            break
+        total_bytes += len(r.content)
+        total_records += len(records)
+        total_parse += parse_time
+    return total_bytes, total_records, total_parse
+
+
+def main(args):
+    client = DblpClient(cache=cache_from_args(args))
+    print(f"{'backend':<8} {'records':>8} {'bytes':>12} {'KB/1000 rec':>12} {'parse ms/1000 rec':>18}")
+    for name in ("html", "json"):
+        size, records, parse = run_backend(client, name, args)
+        per_k = 1000 / records if records else 0
+        print(f"{name:<8} {records:>8} {size:>12} {size * per_k / 1024:>12.1f} {parse * per_k * 1000:>18.1f}")
+    client.close()
+
+
+if __name__ == "__main__":
+    main(parse_args())
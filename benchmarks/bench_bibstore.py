@@ -0,0 +1,168 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.bibstore import HAS_ZSTD, BibtexStore
+
+
+# Disk size, write rate and random reads of BibTeX kept inline in the fetcher's CSV against the compressed
+# BibTeX store, per codec with and without its dictionary; then the cost of a rerun that adds 1% new entries.
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the compressed BibTeX store.")
+    parser.add_argument("--entries", type=int, default=100000, metavar="INT", help="Number of entries. Default: 100000")
+    parser.add_argument("--per-proceedings", type=int, default=150, metavar="INT",
+                        help="Entries sharing a booktitle, editors and publisher. Default: 150")
+    parser.add_argument("--reads", type=int, default=10000, metavar="INT", help="Random reads. Default: 10000")
+    return parser.parse_args(argv)
+
+
+SYLLABLES = ["ta", "ne", "ri", "co", "mu", "la", "xe", "po", "di", "ser", "at", "tion", "ing", "ment", "vo", "ka"]
+TITLE_WORDS = """adversarial attack detection learning privacy secure network model graph fuzzing kernel memory
+side-channel inference federated robust analysis web malicious user recognition linear attention scheduling
+storage compiler towards efficient scalable deep neural networks via using for with from and of the in on a an
+large language models systems distributed data stream query optimization verification formal program synthesis
+automated testing vulnerability discovery smart contracts blockchain cloud edge computing mobile devices
+android applications understanding measuring evaluating improving practical fast accurate framework approach
+method towards benchmark dataset study empirical real-world private secure multi-party computation encryption
+homomorphic differential zero-knowledge proofs protocol authentication access control policy malware
+classification anomaly intrusion transformer reinforcement generative diffusion representation embedding
+retrieval recommendation ranking search index cache consistency replication consensus fault tolerance""".split()
+FIRST_NAMES = """Wei Jing Li Yang Hao Xin Yu Jun Ming Lei Anna Maria David Michael John Thomas Daniel Peter Paul Sarah
+Laura Emily Alexander Andreas Stefan Christian Martin Jan Marco Luca Giovanni Hiroshi Takeshi Kenji Min-Jun Ji-woo
+Rahul Amit Priya Ananya Mohammed Ahmed Omar Ali Carlos Jose Juan Ivan Dmitry Olga""".split()
+LAST_NAMES = """Wang Li Zhang Liu Chen Yang Huang Zhao Wu Zhou Xu Sun Ma Zhu Hu Guo He Lin Luo Gao Smith Johnson Brown
+Jones Miller Davis Garcia Rodriguez Wilson Martinez Anderson Taylor Thomas Moore Jackson Martin Lee Kim Park Choi
+Nguyen Tran Singh Kumar Sharma Gupta Patel Mueller Schmidt Schneider Fischer Weber Meyer Wagner Becker Rossi Russo
+Ferrari Tanaka Suzuki Sato Ivanov Petrov Silva Santos""".split()
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October",
+          "November", "December"]
+
+
+def word(rng, parts=3):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, parts)))
+
+
+def person(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+# dblp-style entries (bib1): papers of one proceedings share the booktitle, editors and publisher lines;
+# authors, titles, DOIs and timestamps are their own
+def make_entries(n, per_proceedings, seed=0):
+    rng = random.Random(seed)
+    venues = [word(rng, 2).upper() for _ in range(200)]
+    entries = []
+    for i in range(n):
+        group = i // per_proceedings
+        venue, year = venues[group % len(venues)], 2000 + group // len(venues) % 26
+        shared = random.Random(f"{seed}/{group}")
+        editors = " and\n                  ".join(person(shared) for _ in range(shared.randint(2, 5)))
+        month = shared.choice(MONTHS)
+        booktitle = (f"{venue} '{year % 100:02d}: {year} {{ACM}} {word(shared).capitalize()} Conference on "
+                     f"{shared.choice(TITLE_WORDS).capitalize()} and {shared.choice(TITLE_WORDS).capitalize()},"
+                     f"\n                  "
+                     f"{word(shared).capitalize()}, {word(shared).upper()}, {month} {shared.randint(1, 20)}-"
+                     f"{shared.randint(21, 28)}, {year}")
+        authors = [person(rng) for _ in range(rng.randint(1, 6))]
+        joined = " and\n                  ".join(authors)
+        key = f"conf/{venue.lower()}/{authors[0].split()[1]}{year % 100:02d}x{i}"
+        doi = f"10.1145/{rng.randint(1000000, 9999999)}.{rng.randint(1000000, 9999999)}"
+        first = rng.randint(1, 3000)
+        title = " ".join(rng.choice(TITLE_WORDS) for _ in range(rng.randint(5, 12))).capitalize()
+        entries.append((key, (
+            f"@inproceedings{{DBLP:{key},\n"
+            f"  author       = {{{joined}}},\n"
+            f"  editor       = {{{editors}}},\n"
+            f"  title        = {{{title}}},\n"
+            f"  booktitle    = {{{booktitle}}},\n"
+            f"  pages        = {{{first}--{first + rng.randint(5, 20)}}},\n"
+            f"  publisher    = {{{{ACM}}}},\n"
+            f"  year         = {{{year}}},\n"
+            f"  url          = {{https://doi.org/{doi}}},\n"
+            f"  doi          = {{{doi}}},\n"
+            f"  timestamp    = {{{rng.choice(['Mon', 'Tue', 'Wed', 'Thu', 'Fri'])}, {rng.randint(1, 28):02d} "
+            f"{rng.choice(MONTHS)[:3]} {year + 1} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:"
+            f"{rng.randint(0, 59):02d} +0100}},\n"
+            f"  biburl       = {{https://dblp.org/rec/{key}.bib}},\n"
+            f"  bibsource    = {{dblp computer science bibliography, https://dblp.org}}\n"
+            f"}}"), (title, venue, year, f"{first}-{first + 12}", ", ".join(authors),
+                     f"https://dblp.org/rec/{key}.html?view=bibtex")))
+    return entries
+
+
+def write_csv(path, entries, inline):
+    # The fetcher's output, with the BibTeX text or its key
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["title", "venue", "year", "pages", "authors", "bibtex_url",
+                         "bibtex_data" if inline else "bibtex_key"])
+        for key, text, row in entries:
+            writer.writerow(row + (text if inline else key,))
+
+
+def fill(store, entries):
+    for key, text, _ in entries:
+        store.put(key, text)
+    store.flush()
+
+
+def main(args):
+    entries = make_entries(args.entries + args.entries // 100, args.per_proceedings)
+    entries, added = entries[:args.entries], entries[args.entries:]
+    raw = sum(len(text.encode()) for _, text, _ in entries)
+    rng = random.Random(1)
+    reads = [rng.choice(entries)[0] for _ in range(args.reads)]
+    print(f"{len(entries)} entries, {raw / 2 ** 20:.1f} MB of BibTeX ({raw / len(entries):.0f} bytes each)")
+    print(f"{'storage':<18} {'size':>9} {'ratio':>6} {'write':>8} {'read':>9} {'rerun +1%':>10} {'grew':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        inline = os.path.join(workdir, "inline.csv")
+        start = time.perf_counter()
+        write_csv(inline, entries, True)
+        written = time.perf_counter() - start
+        # A rerun of the CSV-only fetcher rewrites the whole file
+        start = time.perf_counter()
+        write_csv(inline, entries + added, True)
+        rerun = time.perf_counter() - start
+        size = os.path.getsize(inline)
+        print(f"{'inline CSV':<18} {size / 2 ** 20:>6.1f} MB {raw / size:>5.1f}x {written:>7.2f}s {'-':>9} "
+              f"{rerun:>9.2f}s {'all':>10}")
+
+        references = os.path.join(workdir, "references.csv")
+        write_csv(references, entries, False)
+        print(f"{'key CSV':<18} {os.path.getsize(references) / 2 ** 20:>6.1f} MB")
+
+        codecs = ["zlib"] + (["zstd"] if HAS_ZSTD else [])
+        for codec in codecs:
+            for train_samples in (0, 256):
+                name = f"{codec}{' + dictionary' if train_samples else ''}"
+                path = os.path.join(workdir, f"{name}.bibstore")
+                store = BibtexStore(path, codec=codec, train_samples=train_samples)
+                start = time.perf_counter()
+                fill(store, entries)
+                written = time.perf_counter() - start
+                start = time.perf_counter()
+                for key in reads:
+                    store.get(key)
+                read = (time.perf_counter() - start) / len(reads)
+                store.close()
+                size = os.path.getsize(path)
+
+                store = BibtexStore(path, codec=codec, train_samples=train_samples)
+                start = time.perf_counter()
+                fill(store, added)
+                rerun = time.perf_counter() - start
+                store.close()
+                grew = os.path.getsize(path) - size
+                print(f"{name:<18} {size / 2 ** 20:>6.1f} MB {raw / size:>5.1f}x {written:>7.2f}s "
+                      f"{read * 1e6:>7.0f}us {rerun:>9.2f}s {grew / 2 ** 10:>7.0f} KB")
+        if not HAS_ZSTD:
+            print("zstd skipped: the zstandard package is not installed")
+
+
+if __name__ == "__main__":
+    main(parse_args())
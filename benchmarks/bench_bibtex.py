@@ -0,0 +1,102 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import defaultdict
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.bibtex import batch_payload, html_bibtex, raw_bibtex_url, split_bibtex, stream_of
+from common.search import DBLP_API_URL, HITS_PER_PAGE, key_from_url
+
+
+# Compare bytes and latency per BibTeX entry: HTML record page, raw .bib, and batched export per venue year
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the BibTeX retrieval paths.")
+    parser.add_argument("--inputfile", default="conference.csv", metavar="*.csv",
+                        help="Crawler output with 'bibtex_url' and 'year' columns. Default: conference.csv")
+    parser.add_argument("--limit", type=int, default=50, metavar="INT",
+                        help="Number of papers fetched with each path. Default: 50")
+    parser.add_argument("--delay", type=float, default=0.5, metavar="FLOAT",
+                        help="Seconds between requests, to stay polite to dblp.org. Default: 0.5")
+    return parser.parse_args(argv)
+
+
+def sample(inputfile, limit):
+    papers = []
+    with open(inputfile, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            key = key_from_url(row.get("bibtex_url", ""))
+            if key:
+                papers.append((key, row["bibtex_url"], int(row["year"]) if row.get("year") else None))
+            if len(papers) >= limit:
+                break
+    return papers
+
+
+# Requests go straight to the session: no cache, no rate limiter, only the fixed delay
+def timed_get(session, delay, url, params=None):
+    time.sleep(delay)
+    start = time.perf_counter()
+    r = session.get(url, params=params, timeout=60)
+    r.raise_for_status()
+    return r, time.perf_counter() - start
+
+
+def run_single(session, delay, papers, name):
+    total_bytes = latency = parse = 0.0
+    entries = 0
+    for key, bibtex_url, _ in papers:
+        r, elapsed = timed_get(session, delay, bibtex_url if name == "html" else raw_bibtex_url(bibtex_url))
+        start = time.perf_counter()
+        bibtex = html_bibtex(r.text) if name == "html" else r.text.strip()
+        parse += time.perf_counter() - start
+        total_bytes += len(r.content)
+        latency += elapsed
+        entries += bool(bibtex)
+    return entries, total_bytes, latency, parse
+
+
+def run_batch(session, delay, papers):
+    groups = defaultdict(set)
+    for key, _, year in papers:
+        if year is not None:
+            groups[(stream_of(key), year)].add(key)
+    total_bytes = latency = parse = 0.0
+    entries = 0
+    for (stream, year), keys in groups.items():
+        page = 0
+        while keys:
+            r, elapsed = timed_get(session, delay, DBLP_API_URL, batch_payload(stream, year, page))
+            start = time.perf_counter()
+            found = split_bibtex(r.text)
+            parse += time.perf_counter() - start
+            total_bytes += len(r.content)
+            latency += elapsed
+            entries += len(keys & found.keys())
+            keys -= found.keys()
+            if len(found) < HITS_PER_PAGE:
+                break
+            page += 1
+    return entries, total_bytes, latency, parse
+
+
+def main(args):
+    papers = sample(args.inputfile, args.limit)
+    session = requests.Session()
+    print(f"{len(papers)} papers from {args.inputfile}")
+    print(f"{'path':<6} {'entries':>8} {'KB/entry':>10} {'ms/entry':>10} {'parse ms/entry':>15}")
+    for name in ("html", "raw", "batch"):
+        if name == "batch":
+            entries, size, latency, parse = run_batch(session, args.delay, papers)
+        else:
+            entries, size, latency, parse = run_single(session, args.delay, papers, name)
+        per = 1 / entries if entries else 0
+        print(f"{name:<6} {entries:>8} {size * per / 1024:>10.2f} {latency * per * 1000:>10.1f} {parse * per * 1000:>15.3f}")
+    session.close()
+
+
+if __name__ == "__main__":
+    main(parse_args())
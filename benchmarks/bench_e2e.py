@@ -0,0 +1,165 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common.client import DblpClient
+from common.engine import CrawlEngine
+from common.ratelimit import add_ratelimit_arguments, limits_from_args
+from common.scoring import load_keywords
+from common.store import PaperStore
+from common.venues import venue_set
+from dblp_stub import add_stub_arguments, stub_from_args
+
+
+# End-to-end crawl, journal crawl and BibTeX fetch against the local dblp stub: requests/s, records/s,
+# peak memory and time of each stage. Each stage runs in its own process, so peak memory is its own.
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end benchmark suite on the local dblp stub.")
+    parser.add_argument("--url", default=None,
+                        help="Base url of a running stub (benchmarks/dblp_stub.py). Default: start one on --port")
+    parser.add_argument("--port", type=int, default=8765, metavar="INT", help="Port of the stub started. Default: 8765")
+    parser.add_argument("--stages", default="conference,journal,bibtex",
+                        help="Comma-separated stages; bibtex needs the conference stage's CSV. "
+                             "Default: conference,journal,bibtex")
+    parser.add_argument("--venues", type=int, default=20, metavar="INT",
+                        help="Venues of venue_set crawled per category. Default: 20")
+    parser.add_argument("--syear", type=int, default=2015, metavar="INT", help="Default: 2015")
+    parser.add_argument("--backend", choices=["json", "html"], default="json", help="Default: json")
+    parser.add_argument("--html-parser", choices=["html.parser", "lxml", "selective"], default="html.parser",
+                        help="Parser of the html backend. Default: html.parser")
+    parser.add_argument("--parse-workers", type=int, default=0, metavar="INT", help="Default: 0")
+    parser.add_argument("--concurrency", type=int, default=4, metavar="INT", help="Default: 4")
+    parser.add_argument("--workers", type=int, default=8, metavar="INT", help="BibTeX fetch workers. Default: 8")
+    parser.add_argument("--mode", choices=["raw", "html"], default="raw", help="BibTeX fetch mode. Default: raw")
+    parser.add_argument("--save", default=None, metavar="FILE", help="Write the results as JSON, e.g. as a baseline")
+    parser.add_argument("--baseline", default=None, metavar="FILE",
+                        help="Results saved by an earlier run; exit 1 if a stage's records/s dropped by more than --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.2, metavar="FLOAT", help="Default: 0.2")
+    add_ratelimit_arguments(parser, rate=50.0, max_rate=200.0)
+    add_stub_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux, in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def new_client(args, pool_size):
+    limits, retry = limits_from_args(args)
+    return DblpClient(pool_size=pool_size, limits=limits, retry=retry)
+
+
+async def crawl(category, workdir, args):
+    # DBLP_URL is read when common.crawl is imported, after main has set it
+    from common.crawl import CrawlSettings, aiter_papers
+    keywords = load_keywords(os.path.join(ROOT, category, "keywords.txt"))
+    settings = CrawlSettings(category, args.syear, None, 0.4, False, args.backend, False, False, args.html_parser)
+    store = PaperStore(os.path.join(workdir, f"{category}.sqlite"))
+    engine = CrawlEngine(new_client(args, args.concurrency), concurrency=args.concurrency,
+                         parse_workers=args.parse_workers)
+    try:
+        async for _ in aiter_papers(venue_set[category][:args.venues], keywords, settings=settings, engine=engine,
+                                    store=store):
+            pass
+        store.export_csv(os.path.join(workdir, f"{category}.csv"), venue_column="venue")
+        return store.count(), engine.client.retries
+    finally:
+        store.close()
+        engine.close()
+
+
+def fetch_bibtex(workdir, args):
+    from common.bibfetch import process_csv
+    client = new_client(args, args.workers)
+    try:
+        return process_csv(os.path.join(workdir, "conference.csv"), os.path.join(workdir, "conference_with_bibtex.csv"),
+                           client, workers=args.workers, mode=args.mode), client.retries
+    finally:
+        client.close()
+
+
+def run_stage(stage, workdir, results, args):
+    start = time.perf_counter()
+    if stage == "bibtex":
+        records, retries = fetch_bibtex(workdir, args)
+    else:
+        records, retries = asyncio.run(crawl(stage, workdir, args))
+    results.put({"seconds": time.perf_counter() - start, "records": records, "retries": retries,
+                 "peak_rss_mb": peak_rss_mb()})
+
+
+def stub_stats(reset=False):
+    with urllib.request.urlopen(f"{os.environ['DBLP_URL']}/_stats{'?reset=1' if reset else ''}") as r:
+        return json.load(r)
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for stage, result in results.items():
+        before = baseline.get(stage)
+        if before and before["records_per_s"] and \
+                result["records_per_s"] < before["records_per_s"] * (1 - tolerance):
+            regressions.append(f"{stage}: {result['records_per_s']:.0f} records/s, "
+                               f"baseline {before['records_per_s']:.0f}")
+    return regressions
+
+
+def main(args):
+    # The crawl modules read DBLP_URL when imported; stage processes inherit it
+    os.environ["DBLP_URL"] = args.url or f"http://127.0.0.1:{args.port}"
+    server = None if args.url else stub_from_args(args, port=args.port)
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    print(f"dblp stub at {os.environ['DBLP_URL']}, backend {args.backend}, {args.venues} venues per category")
+    print(f"{'stage':<11} {'seconds':>8} {'requests':>9} {'req/s':>7} {'records':>8} {'rec/s':>8} "
+          f"{'retries':>8} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for stage in args.stages.split(","):
+            stub_stats(reset=True)
+            outcome = context.Queue()
+            process = context.Process(target=run_stage, args=(stage, workdir, outcome, args))
+            process.start()
+            while True:
+                try:
+                    result = outcome.get(timeout=1)
+                    break
+                except queue.Empty:
+                    if not process.is_alive():
+                        sys.exit(f"Stage {stage} failed, exit code {process.exitcode}")
+            process.join()
+            stats = stub_stats()
+            requests = stats.get("requests", 0) + stats.get("dropped", 0)
+            result.update(requests=requests, requests_per_s=requests / result["seconds"],
+                          records_per_s=result["records"] / result["seconds"], stub=stats)
+            results[stage] = result
+            print(f"{stage:<11} {result['seconds']:>8.2f} {requests:>9} {result['requests_per_s']:>7.1f} "
+                  f"{result['records']:>8} {result['records_per_s']:>8.0f} {result['retries']:>8} "
+                  f"{result['peak_rss_mb']:>8.1f}")
+    if server is not None:
+        server.shutdown()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main(parse_args())
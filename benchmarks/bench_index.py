@@ -0,0 +1,130 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.paperindex import PaperIndex
+from common.store import PaperRow, PaperStore
+
+
+# Build time and size of the search index of a paper store, then the latency of title, prefix, author,
+# coauthor and combined queries against the same questions answered by scanning the papers table.
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the search index of the paper store.")
+    parser.add_argument("--papers", type=int, default=1000000, metavar="INT", help="Number of papers. Default: 1000000")
+    parser.add_argument("--authors", type=int, default=300000, metavar="INT", help="Distinct author names. Default: 300000")
+    parser.add_argument("--repeat", type=int, default=20, metavar="INT", help="Runs of each query. Default: 20")
+    return parser.parse_args(argv)
+
+
+WORDS = """adversarial attack detection learning privacy secure network model graph fuzzing kernel memory
+side-channel inference federated robust analysis web malicious user recognition linear attention scheduling
+storage compiler efficient scalable deep neural networks large language models systems distributed data stream
+query optimization verification formal program synthesis automated testing vulnerability discovery smart
+contracts blockchain cloud edge computing mobile devices android applications understanding measuring
+evaluating improving practical fast accurate framework approach method benchmark dataset study empirical
+real-world private multi-party computation encryption homomorphic differential zero-knowledge proofs protocol
+authentication access control policy malware classification anomaly intrusion transformer reinforcement
+generative diffusion representation embedding retrieval recommendation ranking search index cache consistency
+replication consensus fault tolerance""".split()
+STOP = ["towards", "via", "using", "for", "with", "from", "and", "of", "the", "in", "on", "a"]
+FIRST_NAMES = ["Wei", "Anna", "David", "Li", "Maria", "Jun"]
+
+
+def person(i):
+    return f"{FIRST_NAMES[i % len(FIRST_NAMES)]} Author{i}"
+
+
+# Titles from a vocabulary with made-up rare words; the most prolific authors have about a thousand papers
+def make_rows(rng, papers, authors):
+    vocabulary = WORDS + [f"{rng.choice(WORDS)[:4]}{i}" for i in range(50000)]
+    people = [person(i) for i in range(authors)]
+    venues = [f"VENUE{i}" for i in range(300)]
+    for i in range(papers):
+        words = [vocabulary[int(len(vocabulary) * rng.random() ** 4)] for _ in range(rng.randint(4, 10))]
+        words.insert(rng.randint(0, len(words)), rng.choice(STOP))
+        venue = venues[int(len(venues) * rng.random() ** 2)]
+        authors = list(dict.fromkeys(people[int(len(people) * rng.random() ** 1.5)] for _ in range(rng.randint(1, 6))))
+        key = f"conf/{venue.lower()}/P{i}"
+        yield PaperRow(key, venue, venue, " ".join(words).capitalize() + ".", 2000 + i % 26, "1-12", authors,
+                       f"https://dblp.org/rec/{key}.html?view=bibtex", 0.0, True)
+
+
+def timed(function, *params):
+    start = time.perf_counter()
+    result = function(*params)
+    return result, time.perf_counter() - start
+
+
+def fill(path, papers, authors):
+    store = PaperStore(path)
+    page = []
+    for row in make_rows(random.Random(0), papers, authors):
+        page.append(row)
+        if len(page) == 1000:
+            store.add_page(page)
+            page.clear()
+    store.add_page(page)
+    store.close()
+
+
+def latency(function, repeat):
+    # Median of the runs, in ms
+    runs = sorted(timed(function)[1] for _ in range(repeat))
+    return runs[len(runs) // 2] * 1000
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "papers.sqlite")
+        _, filled = timed(fill, path, args.papers, args.authors)
+        size = os.path.getsize(path)
+        print(f"{args.papers} papers, {args.authors} authors: store of {size / 2 ** 20:.0f} MB filled in {filled:.1f}s")
+        index, built = timed(PaperIndex, path)
+        print(f"index of {index.added} papers built in {built:.1f}s, "
+              f"+{(os.path.getsize(path) - size) / 2 ** 20:.0f} MB")
+        db = index._db
+        # A prolific author, one with a few papers, and a prefix matching a few names, as dblp's numbered ones
+        prolific, regular, prefix = person(0), person(args.authors // 60), person(args.authors // 7)
+        queries = [
+            ("title word", lambda: index.search(title="fuzzing"),
+             lambda: db.execute("SELECT * FROM papers WHERE title LIKE '%fuzzing%' ORDER BY year DESC LIMIT 20")
+             .fetchall()),
+            ("title boolean", lambda: index.search(title="kernel AND (fuzzing OR testing) NOT android"),
+             lambda: db.execute("SELECT * FROM papers WHERE title LIKE '%kernel%' AND (title LIKE '%fuzzing%' OR "
+                                "title LIKE '%testing%') AND title NOT LIKE '%android%' ORDER BY year DESC LIMIT 20")
+             .fetchall()),
+            ("title prefix", lambda: index.search(title="homo* encrypt*"),
+             lambda: db.execute("SELECT * FROM papers WHERE (title LIKE 'homo%' OR title LIKE '% homo%') AND "
+                                "(title LIKE 'encrypt%' OR title LIKE '% encrypt%') ORDER BY year DESC LIMIT 20")
+             .fetchall()),
+            ("count matches", lambda: index.count_matches(title="graph neural"),
+             lambda: db.execute("SELECT COUNT(*) FROM papers WHERE title LIKE '%graph%' AND title LIKE '%neural%'")
+             .fetchall()),
+            ("author since", lambda: index.search(authors=[regular], syear=2020),
+             lambda: db.execute("SELECT * FROM papers WHERE year >= 2020 AND ', ' || authors || ', ' LIKE ? "
+                                "ORDER BY year DESC LIMIT 20", (f"%, {regular}, %",)).fetchall()),
+            ("prolific author", lambda: index.search(authors=[prolific], title="learning", venues=["VENUE0"]),
+             lambda: db.execute("SELECT * FROM papers WHERE published_in = 'VENUE0' AND title LIKE '%learning%' AND "
+                                "', ' || authors || ', ' LIKE ? ORDER BY year DESC LIMIT 20",
+                                (f"%, {prolific}, %",)).fetchall()),
+            ("author prefix", lambda: index.search(authors=[prefix + "*"]),
+             lambda: db.execute("SELECT * FROM papers WHERE ', ' || authors LIKE ? ORDER BY year DESC LIMIT 20",
+                                (f"%, {prefix}%",)).fetchall()),
+            ("coauthors", lambda: index.coauthors(regular),
+             lambda: db.execute("SELECT authors FROM papers WHERE ', ' || authors || ', ' LIKE ?",
+                                (f"%, {regular}, %",)).fetchall()),
+        ]
+        print(f"{'query':<16} {'index':>10} {'scan':>10} {'results':>8}")
+        for name, indexed, scan in queries:
+            results = indexed()
+            print(f"{name:<16} {latency(indexed, args.repeat):>7.2f} ms {timed(scan)[1] * 1000:>7.0f} ms "
+                  f"{results if isinstance(results, int) else len(results):>8}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,181 @@
+import argparse
+import csv
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.batch import HAS_PYARROW
+from common.crawl import Paper, intern
+from common.store import PaperRow, PaperStore
+
+
+# Memory and build throughput of a million papers held as Paper objects, before and after __slots__ and
+# name interning; then export time, file size and a two-column read of the CSV against the Parquet and Arrow
+# exports of the same store.
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark in-memory paper representations and the columnar exports.")
+    parser.add_argument("--papers", type=int, default=1000000, metavar="INT", help="Number of papers. Default: 1000000")
+    parser.add_argument("--venues", type=int, default=300, metavar="INT", help="Distinct venue names. Default: 300")
+    parser.add_argument("--authors", type=int, default=300000, metavar="INT", help="Distinct author names. Default: 300000")
+    parser.add_argument("--skip-export", action="store_true", help="Only compare the in-memory representations.")
+    return parser.parse_args(argv)
+
+
+# Paper as it was before __slots__: one __dict__ per paper, and every venue and author name its own string
+class DictPaper:
+    def __init__(self, title=None, venue=None, year=None, pages=None, bibtex_url=None, key=None, target=None):
+        self.title = title
+        self.venue = venue
+        self.year = year
+        self.pages = pages
+        self.authors = []
+        self.score = None
+        self.bibtex_url = bibtex_url
+        self.bibtex_data = None
+        self.key = key
+        self.target = target
+
+
+def make_pool(rng, venue_count, author_count):
+    syllables = ["ta", "ne", "ri", "co", "mu", "la", "xe", "po", "di", "ser", "at", "tion", "ing", "ment"]
+    vocabulary = ["".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(20000)]
+    venues = [f"{''.join(rng.choice(syllables) for _ in range(3)).upper()}" for _ in range(venue_count)]
+    people = [f"{rng.choice(vocabulary).capitalize()} {rng.choice(vocabulary).capitalize()} {i:04d}"
+              for i in range(author_count)]
+    return vocabulary, [venue.encode() for venue in venues], [person.encode() for person in people]
+
+
+def make_records(pool, papers, seed=1):
+    # Raw (key, venue, title, year, pages, authors, bibtex_url, score) records of a crawl, as the bytes of the
+    # page: every build decodes its own strings, as the parser would. Venues and authors are skewed, a few of
+    # them are on most papers.
+    vocabulary, venues, people = pool
+    rng = random.Random(seed)
+    raw = []
+    for i in range(papers):
+        venue = venues[int(len(venues) * rng.random() ** 2)]
+        key = f"conf/{venue.decode().lower()}/P{i}".encode()
+        authors = tuple(people[int(len(people) * rng.random() ** 3)] for _ in range(rng.randint(1, 6)))
+        title = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(5, 12))).capitalize() + "."
+        raw.append((key, venue, title.encode(), 2000 + i % 26, f"{i % 300 + 1}-{i % 300 + 12}".encode(), authors,
+                    b"https://dblp.org/rec/" + key + b".html?view=bibtex", round(rng.random(), 2)))
+    return raw
+
+
+def records(raw):
+    for key, venue, title, year, pages, authors, bibtex_url, score in raw:
+        yield (key.decode(), venue.decode(), title.decode(), year, pages.decode(), [a.decode() for a in authors],
+               bibtex_url.decode(), score)
+
+
+def build_dict_papers(raw):
+    papers = []
+    for key, venue, title, year, pages, authors, bibtex_url, score in records(raw):
+        pp = DictPaper(title=title, venue=venue, year=year, pages=pages, bibtex_url=bibtex_url, key=key, target=venue)
+        pp.authors.extend(authors)
+        pp.score = score
+        papers.append(pp)
+    return papers
+
+
+def build_slotted_papers(raw):
+    papers = []
+    for key, venue, title, year, pages, authors, bibtex_url, score in records(raw):
+        venue = intern(venue)
+        pp = Paper(title=title, venue=venue, year=year, pages=pages, bibtex_url=bibtex_url, key=key, target=venue)
+        pp.authors.extend(map(intern, authors))
+        pp.score = score
+        papers.append(pp)
+    return papers
+
+
+def decode_only(raw):
+    for _ in records(raw):
+        pass
+
+
+def measure(build, raw):
+    # Build time, then in a second run under tracemalloc (which slows it down) the memory held by the result
+    # and the peak while building, in MB
+    gc.collect()
+    start = time.perf_counter()
+    result = build(raw)
+    elapsed = time.perf_counter() - start
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = build(raw)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return held / 2 ** 20, peak / 2 ** 20, elapsed
+
+
+def timed(function, *params):
+    start = time.perf_counter()
+    result = function(*params)
+    return result, time.perf_counter() - start
+
+
+def export_benchmark(raw, workdir):
+    store = PaperStore(os.path.join(workdir, "papers.sqlite"))
+    page = []
+    for key, venue, title, year, pages, authors, bibtex_url, score in records(raw):
+        page.append(PaperRow(key, venue, venue, title, year, pages, authors, bibtex_url, score, True))
+        if len(page) == 1000:
+            store.add_page(page)
+            page.clear()
+    store.add_page(page)
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def read_csv(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            return sum(1 for _ in csv.reader(f)) - 1
+
+    def read_parquet(path):
+        return pq.read_table(path, columns=["title", "year"]).num_rows
+
+    def read_arrow(path):
+        with pa.memory_map(path) as source:
+            return pa.ipc.open_file(source).read_all().select(["title", "year"]).num_rows
+
+    print(f"{'export':<10} {'write':>8} {'size':>10} {'read title, year':>17}")
+    for name, reader in (("csv", read_csv), ("parquet", read_parquet), ("arrow", read_arrow)):
+        path = os.path.join(workdir, f"papers.{name}")
+        _, written = timed(store.export, path)
+        _, read = timed(reader, path)
+        print(f"{name:<10} {written:>7.1f}s {os.path.getsize(path) / 2 ** 20:>7.0f} MB {read:>16.2f}s")
+    store.close()
+
+
+def main(args):
+    raw = make_records(make_pool(random.Random(0), args.venues, args.authors), args.papers)
+    _, generation = timed(decode_only, raw)
+    print(f"{args.papers} papers, {args.venues} venues, {args.authors} authors; "
+          f"decoding the records alone takes {generation:.1f}s")
+    print(f"{'in memory':<16} {'held':>9} {'peak':>9} {'build':>8} {'papers/s':>11}")
+    for name, build in (("dict Paper", build_dict_papers), ("slotted Paper", build_slotted_papers)):
+        held, peak, elapsed = measure(build, raw)
+        # Throughput of the representation alone, without the decoding
+        rate = args.papers / max(elapsed - generation, 1e-9)
+        print(f"{name:<16} {held:>6.0f} MB {peak:>6.0f} MB {elapsed:>7.1f}s {rate:>11,.0f}")
+
+    if args.skip_export:
+        return
+    if not HAS_PYARROW:
+        print("Exports skipped: pyarrow is not installed")
+        return
+    with tempfile.TemporaryDirectory() as workdir:
+        export_benchmark(raw, workdir)
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,109 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.client import DblpClient
+from common.search import DBLP_SEARCH_URL, HAS_LXML, HITS_PER_PAGE, HTML_PARSERS, html_payload, parse_html_page
+from dblp_stub import Corpus, html_page
+
+
+# Records per second per core of each HTML parser on saved result pages, on one core and in a process pool
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the parsers of the html backend.")
+    parser.add_argument("--fixtures", default="parse_fixtures", metavar="DIR",
+                        help="Directory of saved result pages (*.html). Synthetic dblp-like pages are written there "
+                             "if it has none. Default: parse_fixtures")
+    parser.add_argument("--fetch", default=None, metavar="QUERY",
+                        help="Download --pages real result pages of this dblp query into --fixtures first, "
+                             "e.g. 'streamid:conf/ccs:'")
+    parser.add_argument("--pages", type=int, default=8, metavar="INT",
+                        help="Number of pages generated or fetched. Default: 8")
+    parser.add_argument("--record-class", choices=["inproceedings", "article"], default="inproceedings")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), metavar="INT",
+                        help="Processes of the pool run. Default: number of cores")
+    parser.add_argument("--repeat", type=int, default=3, metavar="INT",
+                        help="Run each parser this many times and keep the best time. Default: 3")
+    return parser.parse_args(argv)
+
+
+def fetch_pages(query, fixtures, count):
+    client = DblpClient()
+    try:
+        for page in range(count):
+            text = client.get(DBLP_SEARCH_URL, html_payload(query, page)).text
+            with open(os.path.join(fixtures, f"page{page:03d}.html"), "w", encoding="utf-8") as f:
+                f.write(text)
+    finally:
+        client.close()
+
+
+# Full result pages of the stub server's corpus, which spans 26 years: enough papers per year for count pages
+def synthetic_pages(count):
+    records = Corpus(papers_per_year=count * 40).search("streamid:conf/ccs:")
+    return [html_page(records[page * HITS_PER_PAGE:(page + 1) * HITS_PER_PAGE], "https://dblp.org")
+            for page in range(count)]
+
+
+def load_fixtures(fixtures, count, fetch=None):
+    os.makedirs(fixtures, exist_ok=True)
+    if fetch:
+        fetch_pages(fetch, fixtures, count)
+    paths = sorted(glob.glob(os.path.join(fixtures, "*.html")))
+    if not paths:
+        for page, text in enumerate(synthetic_pages(count)):
+            path = os.path.join(fixtures, f"synthetic{page:03d}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            paths.append(path)
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    return pages
+
+
+def parse_all(pages, record_class, name, pool=None):
+    if pool is None:
+        return [parse_html_page(text, record_class, name)[0] for text in pages]
+    return list(pool.map(parse_html_page, pages, [record_class] * len(pages), [name] * len(pages)))
+
+
+def best_of(repeat, func, *func_args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*func_args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(args):
+    pages = load_fixtures(args.fixtures, args.pages, args.fetch)
+    size = sum(len(text.encode("utf-8")) for text in pages)
+    parsers = [name for name in HTML_PARSERS if name != "lxml" or HAS_LXML]
+    workers = max(args.workers, 1)
+    cores = min(workers, os.cpu_count() or 1)
+    print(f"{len(pages)} pages, {size / 1024 / 1024:.1f} MB from {args.fixtures}; "
+          f"pool of {workers} processes on {cores} of {os.cpu_count()} cores")
+    if "lxml" not in parsers:
+        print("lxml is not installed, skipping it")
+
+    reference = None
+    print(f"{'parser':<12} {'records':>8} {'1 core rec/s':>13} {'pool rec/s':>11} {'pool rec/s/core':>16} {'same records':>13}")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for name in parsers:
+            single, results = best_of(args.repeat, parse_all, pages, args.record_class, name)
+            pooled, _ = best_of(args.repeat, parse_all, pages, args.record_class, name, pool)
+            records = sum(len(page) for page in results)
+            if reference is None:
+                reference = results
+            print(f"{name:<12} {records:>8} {records / single:>13.0f} {records / pooled:>11.0f} "
+                  f"{records / pooled / cores:>16.0f} {str(results == reference):>13}")
+
+
+if __name__ == "__main__":
+    main(parse_args())
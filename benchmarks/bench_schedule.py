@@ -0,0 +1,87 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common.checkpoint import CheckpointStore
+from common.client import DblpClient
+from common.engine import CrawlEngine
+from common.ranking import new_scorer
+from common.ratelimit import HostLimits
+from common.scoring import load_keywords
+from common.store import PaperStore
+from common.venues import venue_set
+from dblp_stub import add_stub_arguments, stub_from_args
+
+
+# Accepted papers found under a request budget: the venue list order against the yield-aware schedule.
+# A first run crawls everything; the budgeted runs start from an empty store and plan with the yields the
+# first one stored, as if its data had gone stale, and are compared with what the first one found.
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the yield-aware scheduler on the local dblp stub.")
+    parser.add_argument("--venues", type=int, default=40, metavar="INT",
+                        help="Venues of venue_set crawled. Default: 40")
+    parser.add_argument("--syear", type=int, default=2016, metavar="INT", help="Default: 2016")
+    parser.add_argument("--eyear", type=int, default=2025, metavar="INT", help="Default: 2025")
+    parser.add_argument("--budgets", default="0.1,0.25,0.5", help="Budgets, as fractions of the full run's requests")
+    parser.add_argument("--concurrency", type=int, default=4, metavar="INT", help="Default: 4")
+    parser.add_argument("--port", type=int, default=8766, metavar="INT", help="Port of the stub started. Default: 8766")
+    add_stub_arguments(parser)
+    parser.set_defaults(latency=5.0, jitter=2.0, skew=4.0)
+    return parser.parse_args(argv)
+
+
+async def crawl(args, workdir, name, requests=None, stored=None):
+    # Returns the records and accepted papers stored per venue year, and the requests sent.
+    # DBLP_URL is read when common.crawl is imported, after main has set it
+    from common.crawl import CrawlSettings, aiter_papers
+    from common.schedule import Budget, aiter_items, plan
+    keywords = load_keywords(os.path.join(ROOT, "conference", "keywords.txt"))
+    settings = CrawlSettings("conference", args.syear, args.eyear)
+    venues = venue_set["conference"][:args.venues]
+    client = DblpClient(pool_size=args.concurrency, limits=HostLimits(rate=1000.0, max_rate=1000.0))
+    engine = CrawlEngine(client, concurrency=args.concurrency)
+    if requests is not None:
+        engine.budget = Budget(client.metrics, requests)
+    store = PaperStore(os.path.join(workdir, f"{name}.sqlite"))
+    checkpoint = CheckpointStore(os.path.join(workdir, f"{name}.checkpoint"))
+    try:
+        scorer = new_scorer(keywords)
+        if stored is None:
+            papers = aiter_papers(venues, keywords, scorer, settings, engine, store)
+        else:
+            papers = aiter_items(plan(venues, args.syear, args.eyear, stored), keywords, scorer, settings, engine,
+                                 store, checkpoint)
+        async for _ in papers:
+            pass
+        return store.yields(), client.metrics.counts["requests"]
+    finally:
+        store.close()
+        checkpoint.close()
+        engine.close()
+
+
+def main(args):
+    os.environ["DBLP_URL"] = f"http://127.0.0.1:{args.port}"
+    server = stub_from_args(args, port=args.port)
+    with tempfile.TemporaryDirectory() as workdir:
+        stored, full_requests = asyncio.run(crawl(args, workdir, "full"))
+        total = sum(accepted for _, accepted in stored.values())
+        print(f"{len(venue_set['conference'][:args.venues])} venues x {args.eyear - args.syear + 1} years: {total} accepted papers "
+              f"in {full_requests} requests (skew {args.skew})")
+        # Items already running when the budget runs out finish, so a run may send a few more requests
+        print(f"{'budget':>7} {'list order':>11} {'requests':>9} {'scheduled':>10} {'requests':>9}")
+        for i, fraction in enumerate(float(budget) for budget in args.budgets.split(",")):
+            requests = max(int(full_requests * fraction), 1)
+            listed, listed_requests = asyncio.run(crawl(args, workdir, f"list{i}", requests))
+            ranked, ranked_requests = asyncio.run(crawl(args, workdir, f"ranked{i}", requests, stored))
+            found = [sum(accepted for _, accepted in run.values()) / total for run in (listed, ranked)]
+            print(f"{requests:>7} {found[0]:>11.0%} {listed_requests:>9} {found[1]:>10.0%} {ranked_requests:>9}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,72 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.ranking import HAS_NUMPY, new_scorer
+from common.scoring import MATCH_MODES, RANKINGS
+
+
+# Score synthetic titles with a large keyword taxonomy: per-title loop vs the compiled scorer and the rankings
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark of keyword scoring.")
+    parser.add_argument("--titles", type=int, default=1000000, metavar="INT", help="Number of titles. Default: 1000000")
+    parser.add_argument("--keywords", type=int, default=2000, metavar="INT", help="Number of keywords. Default: 2000")
+    parser.add_argument("--page", type=int, default=1000, metavar="INT", help="Titles scored per call. Default: 1000")
+    parser.add_argument("--naive-sample", type=int, default=20000, metavar="INT",
+                        help="Titles scored with the per-title loop, extrapolated to --titles. Default: 20000")
+    return parser.parse_args(argv)
+
+
+def make_corpus(rng, keyword_count, title_count):
+    syllables = ["ta", "ne", "ri", "co", "mu", "la", "xe", "po", "di", "ser", "at", "tion", "ing", "ment"]
+    vocabulary = ["".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(20000)]
+    keywords = {word: round(rng.uniform(0.05, 0.5), 2) for word in rng.sample(sorted(set(vocabulary)), keyword_count)}
+    titles = [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(5, 12))).capitalize() + "."
+              for _ in range(title_count)]
+    return keywords, titles
+
+
+def main(args):
+    rng = random.Random(0)
+    keywords, titles = make_corpus(rng, args.keywords, args.titles)
+    print(f"{len(titles)} titles, {len(keywords)} keywords")
+
+    sample = titles[:args.naive_sample]
+    start = time.perf_counter()
+    for title in sample:
+        sum(keywords[keyword] for keyword in keywords if keyword in title.lower())
+    naive = (time.perf_counter() - start) * len(titles) / max(len(sample), 1)
+    print(f"{'per-title loop':<22} {naive:>8.1f}s (extrapolated from {len(sample)} titles)")
+
+    for mode in MATCH_MODES:
+        start = time.perf_counter()
+        scorer = new_scorer(keywords, mode)
+        compile_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for i in range(0, len(titles), args.page):
+            scorer.score_many(titles[i:i + args.page])
+        elapsed = time.perf_counter() - start
+        print(f"{'compiled ' + mode:<22} {elapsed:>8.1f}s ({compile_time * 1000:.0f} ms to compile, "
+              f"{len(titles) / elapsed:,.0f} titles/s)")
+
+    # rescore.py's path for the rankings: one pass for the corpus statistics, one to score against them
+    print(f"rankings use {'numpy' if HAS_NUMPY else 'pure Python, numpy is not installed'}")
+    for mode in RANKINGS:
+        scorer = new_scorer(keywords, mode)
+        start = time.perf_counter()
+        for i in range(0, len(titles), args.page):
+            scorer.add(titles[i:i + args.page])
+        counted = time.perf_counter() - start
+        start = time.perf_counter()
+        for i in range(0, len(titles), args.page):
+            scorer.score_many(titles[i:i + args.page])
+        ranked = time.perf_counter() - start
+        print(f"{'corpus ' + mode:<22} {counted + ranked:>8.1f}s ({counted:.1f}s for the statistics, {ranked:.1f}s "
+              f"to score, {len(titles) / (counted + ranked):,.0f} titles/s)")
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,343 @@
+import argparse
+import functools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.cache import ResponseCache
+
+# Local stand-in for dblp.org, for benchmarks that must not touch the real site. It serves the search
+# fragment (search/publ/inc), the search API (JSON and BibTeX export) and the record pages (?view=bibtex
+# and .bib) from a deterministic synthetic corpus, or replays pages recorded in a response cache.
+# Point the crawlers at it with DBLP_URL=http://127.0.0.1:8765.
+
+WORDS = ["adversarial", "attack", "detection", "learning", "privacy", "secure", "network", "model", "graph",
+         "fuzzing", "kernel", "memory", "side-channel", "inference", "federated", "robust", "analysis", "web",
+         "malicious", "user", "recognition", "linear", "attention", "scheduling", "storage", "compiler"]
+
+RECORD_CLASSES = {"conf": "inproceedings", "journals": "article"}
+API_TYPES = {"inproceedings": "Conference and Workshop Papers", "article": "Journal Articles"}
+BIB_TYPES = {"inproceedings": ("inproceedings", "booktitle"), "article": ("article", "journal")}
+KEY_NAME = re.compile(r"^P(\d{4})x(\d+)$")
+FACET = re.compile(r"(streamid|year):([^:]+):")
+HOMONYM = re.compile(r"\s+\d{4}$")
+
+StubRecord = namedtuple("StubRecord", ["key", "year", "title", "venue", "pages", "authors", "record_class"])
+
+# Markup around the BibTeX of a record page, padded to the size of a real one
+RECORD_PAGE = ('<!DOCTYPE html><html lang="en"><head><meta charset="UTF-8"><title>dblp: {key}</title></head><body>'
+               '<header><nav>{padding}</nav></header><div id="main"><h1>BibTeX record {key}</h1>'
+               '<div id="bibtex-section" class="section"><pre class="verbatim select-on-click">{bibtex}</pre>'
+               '</div></div></body></html>')
+PADDING = '<li class="drop-down"><div class="head"><a href="https://dblp.org/">dblp</a></div></li>'
+
+
+# Synthetic papers of every stream and year, the same on each run with the same seed.
+# With skew > 0 each stream favours its own words, so some venues match the keywords far more than others.
+class Corpus:
+    def __init__(self, papers_per_year=100, first_year=2000, last_year=2025, seed=0, skew=0.0):
+        self.papers_per_year = papers_per_year
+        self.first_year = first_year
+        self.last_year = last_year
+        self.seed = seed
+        self.skew = skew
+        self.records = functools.lru_cache(maxsize=8192)(self._records)
+        self.search = functools.lru_cache(maxsize=256)(self._search)
+
+    def _records(self, stream, year):
+        if not self.first_year <= year <= self.last_year:
+            return []
+        record_class = RECORD_CLASSES.get(stream.split("/")[0], "inproceedings")
+        venue = stream.rpartition("/")[2].upper()
+        rng = random.Random(f"{self.seed}/{stream}/{year}")
+        if self.skew:
+            topic = random.Random(f"{self.seed}/{stream}")
+            weights = [topic.random() ** self.skew for _ in WORDS]
+        records = []
+        for i in range(self.papers_per_year):
+            length = rng.randint(4, 10)
+            words = rng.choices(WORDS, weights, k=length) if self.skew else [rng.choice(WORDS) for _ in range(length)]
+            title = " ".join(words).capitalize() + "."
+            authors = [f"Author {rng.randint(1, 5000)}" for _ in range(rng.randint(1, 6))]
+            first = rng.randint(1, 400)
+            records.append(StubRecord(f"{stream}/P{year}x{i}", year, title, venue, f"{first}-{first + 12}",
+                                      authors, record_class))
+        return records
+
+    def _search(self, query):
+        # Stream and year facets OR'ed within a token; keyword tokens are AND'ed, each an OR of terms
+        streams, years, terms = [], [], []
+        for token in query.split():
+            facets = FACET.findall(token)
+            if facets:
+                streams += [value for name, value in facets if name == "streamid"]
+                years += [int(value) for name, value in facets if name == "year" and value.isdigit()]
+            else:
+                terms.append([term.lower() for term in token.split("|") if term])
+        years = sorted(set(years) or range(self.first_year, self.last_year + 1), reverse=True)
+        found = []
+        for year in years:
+            for stream in streams:
+                for record in self.records(stream, year):
+                    title = record.title.lower()
+                    if all(any(term in title for term in alternatives) for alternatives in terms):
+                        found.append(record)
+        return found
+
+    def record(self, key):
+        stream, _, name = key.rpartition("/")
+        match = KEY_NAME.match(name)
+        if not match:
+            return None
+        records = self.records(stream, int(match.group(1)))
+        index = int(match.group(2))
+        return records[index] if index < len(records) else None
+
+
+# One entry in the markup of the dblp search fragment
+def html_entry(record, base):
+    key = record.key
+    authors = ", ".join(
+        f'<span itemprop="author" itemscope itemtype="http://schema.org/Person">'
+        f'<a href="{base}/pid/{i}.html" itemprop="url"><span itemprop="name" title="{author}">{HOMONYM.sub("", author)}</span></a></span>'
+        for i, author in enumerate(record.authors))
+    return (
+        f'<li class="entry {record.record_class} toc" id="{key}" itemscope itemtype="http://schema.org/ScholarlyArticle">'
+        f'<link itemprop="additionalType" href="https://dblp.org/rdf/schema#Publication">'
+        f'<div class="box"><img alt="" title="{API_TYPES[record.record_class]}" src="{base}/img/n.png"></div>'
+        f'<nav class="publ"><ul><li class="drop-down"><div class="head"><a href="https://doi.org/10.1145/{key}">'
+        f'<img alt="" src="{base}/img/paper.dark.hollow.16x16.png" class="icon"></a></div>'
+        f'<div class="body"><p><b>view</b></p><ul><li class="ee"><a href="https://doi.org/10.1145/{key}" itemprop="url">'
+        f'electronic edition via DOI</a></li></ul></div></li>'
+        f'<li class="drop-down"><div class="head"><a href="{base}/rec/{key}.html?view=bibtex">'
+        f'<img alt="" src="{base}/img/download.dark.hollow.16x16.png" class="icon"></a></div>'
+        f'<div class="body"><p><b>export record</b></p><ul><li><a href="{base}/rec/{key}.html?view=bibtex" '
+        f'rel="nofollow">BibTeX</a></li><li><a href="{base}/rec/{key}.ris" rel="nofollow">RIS</a></li>'
+        f'</ul></div></li></ul></nav>'
+        f'<cite class="data tts-content" itemprop="headline">{authors}:<br> '
+        f'<span class="title" itemprop="name">{escape(record.title)}</span> '
+        f'<a href="{base}/db/{key.rpartition("/")[0]}/{record.year}.html"><span itemprop="isPartOf" itemscope '
+        f'itemtype="http://schema.org/BookSeries"><span itemprop="name">{record.venue}</span></span></a> '
+        f'<span itemprop="pagination">{record.pages}</span></cite>'
+        f'<meta property="genre" content="computer science"></li>\n'
+    )
+
+
+# A result page of the fragment endpoint: entries of one year follow their "li.year" header
+def html_page(records, base):
+    parts = ['<ul class="publ-list">\n']
+    year = None
+    for record in records:
+        if record.year != year:
+            year = record.year
+            parts.append(f'<li class="year">{year}</li>\n')
+        parts.append(html_entry(record, base))
+    parts.append("</ul>\n")
+    return "".join(parts)
+
+
+def api_hit(record, base):
+    authors = [{"@pid": str(i), "text": author} for i, author in enumerate(record.authors)]
+    return {"info": {
+        # dblp sends a single author as an object, not a list
+        "authors": {"author": authors[0] if len(authors) == 1 else authors},
+        "title": record.title, "venue": record.venue, "pages": record.pages, "year": str(record.year),
+        "type": API_TYPES[record.record_class], "key": record.key, "url": f"{base}/rec/{record.key}",
+    }}
+
+
+def api_page(records, total, first, base):
+    return json.dumps({"result": {"hits": {"@total": str(total), "@computed": str(total), "@sent": str(len(records)),
+                                           "@first": str(first), "hit": [api_hit(r, base) for r in records]}}})
+
+
+def bibtex_entry(record, base):
+    entry_type, venue_field = BIB_TYPES[record.record_class]
+    return (f"@{entry_type}{{DBLP:{record.key},\n"
+            f"  author       = {{{' and '.join(record.authors)}}},\n"
+            f"  title        = {{{record.title}}},\n"
+            f"  {venue_field:<12} = {{{record.venue}}},\n"
+            f"  pages        = {{{record.pages.replace('-', '--')}}},\n"
+            f"  year         = {{{record.year}}},\n"
+            f"  biburl       = {{{base}/rec/{record.key}.bib}},\n"
+            f"  bibsource    = {{dblp computer science bibliography, https://dblp.org}}\n"
+            f"}}\n")
+
+
+def record_page(record, base, padding):
+    return RECORD_PAGE.format(key=record.key, padding=PADDING * padding, bibtex=escape(bibtex_entry(record, base)))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, as dblp.org
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        url = urlsplit(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        if url.path == "/_stats":
+            return self.send(200, json.dumps(server.snapshot(reset="reset" in params)), "application/json", count=False)
+
+        if server.latency or server.jitter:
+            time.sleep(max(server.latency + server.rng.uniform(-server.jitter, server.jitter), 0) / 1000)
+        roll = server.rng.random()
+        if roll < server.drop_rate:
+            server.count("dropped")
+            self.close_connection = True
+            return
+        roll -= server.drop_rate
+        if roll < server.throttle_rate:
+            server.count("throttled")
+            return self.send(429, "Too Many Requests", headers={"Retry-After": str(server.retry_after)})
+        roll -= server.throttle_rate
+        if roll < server.error_rate:
+            server.count("errors")
+            return self.send(503, "Service Unavailable")
+
+        body = server.replay_body(url.path, params)
+        if body is not None:
+            server.count("replayed")
+            return self.send(200, body, "text/html; charset=utf-8")
+        base = f"http://{self.headers.get('Host') or server.url.split('//')[1]}"
+        status, body, content_type = self.route(url.path, params, base)
+        self.send(status, body, content_type)
+
+    def route(self, path, params, base):
+        corpus = self.server.corpus
+        if path in ("/search/publ/inc", "/search/publ/api"):
+            records = corpus.search(params.get("q", ""))
+            hits = int(params.get("h", 30))
+            first = int(params.get("b", 0)) * hits if path.endswith("inc") else int(params.get("f", 0))
+            page = records[first:first + hits]
+            if path.endswith("inc"):
+                return 200, html_page(page, base), "text/html; charset=utf-8"
+            if params.get("format", "xml").startswith("bib"):
+                return 200, "\n".join(bibtex_entry(r, base) for r in page), "text/plain; charset=utf-8"
+            return 200, api_page(page, len(records), first, base), "application/json"
+        if path.startswith("/rec/"):
+            key, dot, extension = path[len("/rec/"):].rpartition(".")
+            record = corpus.record(key) if dot else None
+            if record is not None and extension == "bib":
+                return 200, bibtex_entry(record, base), "text/plain; charset=utf-8"
+            if record is not None and extension == "html":
+                return 200, record_page(record, base, self.server.padding), "text/html; charset=utf-8"
+        return 404, "Not Found", "text/plain"
+
+    def send(self, status, body, content_type="text/plain", headers=None, count=True):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        if count:
+            self.server.count("requests", status=status, size=len(data))
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, corpus, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rate=0.0, drop_rate=0.0,
+                 retry_after=1, padding=200, replay=None, seed=0):
+        super().__init__(address, StubHandler)
+        self.corpus = corpus
+        self.latency = latency  # ms
+        self.jitter = jitter  # ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.drop_rate = drop_rate
+        self.retry_after = retry_after
+        self.padding = padding
+        self.replay = ResponseCache(replay, offline=True) if replay else None
+        self.rng = random.Random(seed)
+        self.url = f"http://{self.server_address[0]}:{self.server_address[1]}"
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    def count(self, name, status=None, size=0):
+        with self._lock:
+            self._stats[name] += 1
+            self._stats["bytes"] += size
+            if status is not None:
+                self._stats[f"status_{status}"] += 1
+
+    def snapshot(self, reset=False):
+        with self._lock:
+            stats = dict(self._stats)
+            if reset:
+                self._stats.clear()
+        return stats
+
+    def replay_body(self, path, params):
+        # Pages recorded by a crawl with the response cache on, looked up under their dblp.org url
+        if self.replay is None:
+            return None
+        entry, _ = self.replay.lookup(f"https://dblp.org{path}", params or None)
+        return self.replay.response(entry, path).content if entry else None
+
+
+# Serve in a background thread; returns the server, its url is server.url
+def start_stub(host="127.0.0.1", port=0, corpus=None, **options):
+    server = StubServer((host, port), corpus or Corpus(), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_stub_arguments(parser):
+    parser.add_argument("--papers-per-year", type=int, default=100, metavar="INT",
+                        help="Synthetic papers per venue and year. Default: 100")
+    parser.add_argument("--latency", type=float, default=50.0, metavar="MS",
+                        help="Delay before every response, in milliseconds. Default: 50")
+    parser.add_argument("--jitter", type=float, default=20.0, metavar="MS",
+                        help="Uniform +/- jitter of the delay, in milliseconds. Default: 20")
+    parser.add_argument("--error-rate", type=float, default=0.0, metavar="FLOAT",
+                        help="Fraction of requests answered with 503. Default: 0")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, metavar="FLOAT",
+                        help="Fraction of requests answered with 429 and Retry-After. Default: 0")
+    parser.add_argument("--drop-rate", type=float, default=0.0, metavar="FLOAT",
+                        help="Fraction of connections closed without an answer. Default: 0")
+    parser.add_argument("--retry-after", type=int, default=1, metavar="SECONDS",
+                        help="Retry-After of the 429 answers. Default: 1")
+    parser.add_argument("--replay", default=None, metavar="DIR",
+                        help="Response cache directory recorded by a real crawl; its pages are served first")
+    parser.add_argument("--seed", type=int, default=0, metavar="INT", help="Seed of the corpus and the injection")
+    parser.add_argument("--skew", type=float, default=0.0, metavar="FLOAT",
+                        help="Topical skew of the venues, e.g. 4: each venue favours its own words. Default: 0")
+
+
+def stub_from_args(args, host="127.0.0.1", port=0):
+    return start_stub(host, port, Corpus(args.papers_per_year, seed=args.seed, skew=args.skew), latency=args.latency,
+                      jitter=args.jitter, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                      drop_rate=args.drop_rate, retry_after=args.retry_after, replay=args.replay, seed=args.seed)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local dblp stub server for benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, metavar="INT", help="Default: 8765")
+    add_stub_arguments(parser)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = stub_from_args(args, args.host, args.port)
+    print(f"dblp stub on {server.url}, run the crawlers with DBLP_URL={server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
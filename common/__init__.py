@@ -0,0 +1,6 @@
+"""Shared building blocks for the conference and journal crawlers.
+
+The crawler scripts live in ``conference/`` and ``journal/`` and are run
+directly, so each of them puts the repository root on ``sys.path`` before
+importing from this package.
+"""
@@ -0,0 +1,60 @@
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Columnar export formats by file extension; any other extension is exported as CSV
+COLUMNAR_FORMATS = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+def columnar_format(filename):
+    return COLUMNAR_FORMATS.get(os.path.splitext(filename)[1].lower())
+
+
+# Columns of the Parquet and Arrow exports: the CSV columns with authors as a list, then the record key, the
+# score and the venue_set name crawled for. Venue and author names are dictionary encoded, with dictionaries=False
+# they are plain strings.
+def arrow_schema(venue_column="venue", bibtex=False, dictionaries=True):
+    name = pa.dictionary(pa.int32(), pa.string()) if dictionaries else pa.string()
+    fields = [("title", pa.large_string()), (venue_column, name), ("year", pa.int32()), ("pages", pa.large_string()),
+              ("authors", pa.list_(name)), ("bibtex_url", pa.large_string()), ("key", pa.large_string()),
+              ("score", pa.float64()), ("target", name)]
+    if bibtex:
+        fields.append(("bibtex_data", pa.large_string()))
+    return pa.schema(fields)
+
+
+# Record batch of arrow_schema from PaperStore rows (key, venue, published_in, title, year, pages, authors,
+# bibtex_url, score, bibtex_data), authors joined by ", ". Converted a column at a time by Arrow, which
+# splits the authors and codes the names without a Python object per value.
+def rows_to_arrow(rows, venue_column="venue", bibtex=False):
+    key, venue, published_in, title, year, pages, authors, bibtex_url, score, bibtex_data = (
+        zip(*rows) if rows else [()] * 10)
+    authors = pc.split_pattern(pa.array([names or None for names in authors], pa.string()), ", ")
+    authors = pc.if_else(pc.is_null(authors), pa.scalar([], authors.type), authors)
+    columns = [pa.array(title, pa.large_string()), pa.array(published_in, pa.string()).dictionary_encode(),
+               pa.array(year, pa.int32()), pa.array(pages, pa.large_string()),
+               pa.ListArray.from_arrays(authors.offsets, authors.values.dictionary_encode()),
+               pa.array(bibtex_url, pa.large_string()), pa.array(key, pa.large_string()),
+               pa.array(score, pa.float64()), pa.array(venue, pa.string()).dictionary_encode()]
+    if bibtex:
+        columns.append(pa.array(bibtex_data, pa.large_string()))
+    return pa.RecordBatch.from_arrays(columns, schema=arrow_schema(venue_column, bibtex))
+
+
+# Write record batches of arrow_schema to a Parquet file (a row group per batch) or an Arrow IPC file, by
+# extension; returns the rows. Every batch has its own name dictionaries, which the IPC file format cannot
+# replace, so it gets plain strings.
+def write_batches(filename, batches, venue_column="venue", bibtex=False):
+    parquet = columnar_format(filename) == "parquet"
+    schema = arrow_schema(venue_column, bibtex, dictionaries=parquet)
+    count = 0
+    with (pq.ParquetWriter(filename, schema) if parquet else pa.ipc.new_file(filename, schema)) as writer:
+        for batch in batches:
+            writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+            count += batch.num_rows
+    return count
@@ -0,0 +1,267 @@
+import argparse
+import csv
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from tqdm import tqdm  # 引入进度条模块
+
+from common.bibstore import HAS_ZSTD, add_bibstore_arguments, bibstore_from_args
+from common.bibtex import add_bibtex_arguments, fetch_batch, fetch_bibtex, stream_of
+from common.cache import add_cache_arguments, cache_from_args
+from common.client import DblpClient
+from common.metrics import add_metrics_arguments, metrics_from_args, write_metrics
+from common.ratelimit import add_ratelimit_arguments, limits_from_args
+from common.rowindex import RowIndex
+from common.search import key_from_url
+from common.store import PaperStore
+
+
+# The BibTeX fetcher of both categories; conference/ and journal/bibtex_fetcher.py only set their defaults
+logger = logging.getLogger("BibTeX Fetcher")
+
+
+# Argument parser for input and output files; the defaults are the category's crawler outputs
+def parse_fetcher_args(category, argv=None):
+    parser = argparse.ArgumentParser(description='Fetch BibTeX data for papers.')
+    parser.add_argument("--inputfile", default=f"{category}.csv", metavar="*.csv",
+                        help=f"Input CSV file with a 'bibtex_url' column. Default: {category}.csv")
+    parser.add_argument("--outputfile", default=f"{category}_with_bibtex.csv", metavar="*.csv",
+                        help=f"Output CSV file to save results. Default: {category}_with_bibtex.csv")
+    parser.add_argument("--store", default=None, metavar="FILE",
+                        help="Read the papers from the crawler's SQLite store instead of --inputfile, keep the fetched "
+                             f"BibTeX there and export --outputfile from it, e.g. {category}.sqlite")
+    parser.add_argument("--batch-min", type=int, default=20, metavar="INT",
+                        help="With --store, fetch a venue year with one BibTeX export request when at least this many "
+                             "of its papers are missing; 0 disables batching. Default: 20")
+    add_bibtex_arguments(parser)
+    add_bibstore_arguments(parser)
+    add_ratelimit_arguments(parser, rate=2.0, max_rate=10.0)
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser, profile=False)
+    args = parser.parse_args(argv)
+    if args.bibstore and args.store:
+        parser.error("--bibstore applies to the CSV input; with --store the BibTeX is kept in the store")
+    if args.bibstore_codec == "zstd" and not HAS_ZSTD:
+        parser.error("--bibstore-codec zstd needs the zstandard package: pip install zstandard")
+    return args
+
+
+# BibTeX of many papers of one venue year in one export request; missing keys are fetched one by one later
+def fetch_bibtex_batch(client, stream, year, keys):
+    try:
+        return fetch_batch(client, stream, year, keys)
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"BibTeX export failed for {stream} {year}, fetching its papers one by one: {e}")
+        return {}
+
+
+# Rows are matched to earlier results by dblp record key, or by title when there is no BibTeX url
+def row_key(row):
+    return key_from_url(row.get("bibtex_url", "").strip()) or row.get("title", "").strip()
+
+
+# Only rows with real BibTeX are worth reusing, placeholders are fetched again
+def has_bibtex(row):
+    bibtex_data = row.get("bibtex_data", "").strip()
+    return bool(bibtex_data) and bibtex_data not in ("Not Available", "No URL")
+
+
+# Decide what to write for a row: earlier BibTeX (its key when it is in the BibTeX store), a fetch to schedule,
+# or a placeholder
+def resolve_row(row, index, bibstore=None):
+    bibtex_url = row.get("bibtex_url", "").strip()
+
+    # 优先使用已有数据（二次检索逻辑）
+    if bibstore is not None:
+        if row_key(row) in bibstore:
+            return row_key(row), None
+    else:
+        existing = index.get(row_key(row))
+        if existing is not None:
+            return existing["bibtex_data"].strip(), None
+
+    # 需要获取 BibTeX 数据且存在 URL
+    if bibtex_url:
+        return None, bibtex_url
+    return "No URL", None
+
+
+# 并行获取，按输入顺序边处理边写入，每完成一条记录就保存，防止数据丢失。
+# The input is streamed row by row; earlier results are found through an on-disk index of
+# (key -> file offset), so memory stays flat however large the files are.
+# New rows go to <outputfile>.partial, which replaces the output when the run completes;
+# an interrupted run's partial file is reused by the next run.
+# With a BibtexStore the text goes to the store and the output gets a bibtex_key column instead, so a rerun
+# looks rows up in the store and only appends what it fetched; BibTeX inline in an earlier output is moved
+# into the store first.
+def process_csv(inputfile, outputfile, client, workers=8, mode="raw", bibstore=None):
+    partial = f"{outputfile}.partial"
+    resume = f"{outputfile}.resume"
+    if os.path.exists(partial):
+        os.replace(partial, resume)
+    index = None if bibstore is not None else RowIndex(f"{outputfile}.index", row_key)
+    for source in (outputfile, resume):
+        if not os.path.exists(source):
+            continue
+        if index is not None:
+            index.add_file(source, keep=has_bibtex)
+            continue
+        with open(source, mode="r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if has_bibtex(row) and row_key(row) not in bibstore:
+                    bibstore.put(row_key(row), row["bibtex_data"].strip())
+    column = "bibtex_data" if bibstore is None else "bibtex_key"
+
+    total = fetched = reused = 0
+    start = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=max(workers, 1))
+    with open(inputfile, mode="r", newline="", encoding="utf-8") as infile, \
+            open(partial, mode="w", newline="", encoding="utf-8") as outfile:
+        reader = csv.DictReader(infile)
+        fieldnames = [name for name in reader.fieldnames or [] if name not in ("bibtex_data", "bibtex_key")]
+        fieldnames.append(column)
+        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+        writer.writeheader()
+
+        # Rows wait in input order; at most workers * 4 fetches are queued ahead of the writer
+        pending = deque()
+
+        def write_head():
+            row, bibtex_data, future = pending.popleft()
+            if future is not None:
+                bibtex_data = future.result() or "Not Available"
+                if bibstore is not None and bibtex_data != "Not Available":
+                    bibstore.put(row_key(row), bibtex_data)
+                    bibtex_data = row_key(row)
+            row.pop("bibtex_data" if bibstore is not None else "bibtex_key", None)
+            row[column] = bibtex_data
+            with client.metrics.time("write"):
+                writer.writerow(row)
+                outfile.flush()  # 每写入一条记录后刷新确保数据写入磁盘
+
+        try:
+            for row in tqdm(reader, desc="Processing papers", leave=False):
+                total += 1
+                bibtex_data, bibtex_url = resolve_row(row, index, bibstore)
+                future = None
+                if bibtex_url:
+                    future = pool.submit(fetch_bibtex, client, bibtex_url, mode, logger)
+                    fetched += 1
+                elif bibtex_data != "No URL":
+                    reused += 1
+                pending.append((row, bibtex_data, future))
+                # Write every finished row at the head so output stays ordered
+                while pending and (pending[0][2] is None or pending[0][2].done()):
+                    write_head()
+                while len(pending) > max(workers, 1) * 4:
+                    write_head()
+
+            while pending:
+                write_head()
+        except KeyboardInterrupt:
+            # Keep the finished rows at the head, which the next run resumes from, then drop the queued
+            # fetches and cut short the running ones instead of waiting for their retries
+            while pending and (pending[0][2] is None or pending[0][2].done()):
+                write_head()
+            if bibstore is not None:
+                bibstore.flush()
+            pool.shutdown(wait=False, cancel_futures=True)
+            client.cancel()
+            raise
+    pool.shutdown()
+
+    if bibstore is not None:
+        # Every key in the output is in the store before the output replaces the old one
+        bibstore.flush()
+    os.replace(partial, outputfile)
+    if os.path.exists(resume):
+        os.remove(resume)
+    if index is not None:
+        index.close()
+
+    # Statistics of the same pass
+    elapsed = time.monotonic() - start
+    rate = fetched / elapsed if elapsed > 0 else 0.0
+    logger.error(f"Total target entries in {inputfile}: {total}")
+    logger.error(f"Existing successful BibTeX entries reused: {reused}")
+    logger.error(f"Processed {total} rows, fetched {fetched} BibTeX entries "
+                 f"in {elapsed:.1f}s ({rate:.2f} fetches/s, {workers} workers)")
+    if bibstore is not None:
+        entries, blocks, size, stored = bibstore.stats()
+        logger.error(f"BibTeX store {bibstore.path}: {entries} entries in {blocks} blocks, "
+                     f"{size / 2 ** 20:.1f} MB compressed to {stored / 2 ** 20:.1f} MB")
+    return total
+
+
+# Fetch the BibTeX of every stored paper that does not have it yet, then export the CSV from the store.
+# Only missing entries are read, so reruns neither rescan the CSV files nor refetch what is stored.
+# Venue years with at least batch_min missing papers are fetched with one export request, the rest one by one.
+def process_store(path, outputfile, client, workers=8, batch_min=20, mode="raw", venue_column="venue"):
+    store = PaperStore(path)
+    try:
+        todo = store.missing_bibtex()
+        logger.error(f"Papers in {path}: {store.count()}, missing BibTeX: {len(todo)}")
+        groups = defaultdict(list)
+        for key, bibtex_url, year in todo:
+            groups[(stream_of(key), year)].append((key, bibtex_url))
+
+        start = time.monotonic()
+        singles = []
+        batched = 0
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            futures = {}
+            for (stream, year), papers in groups.items():
+                if batch_min and year is not None and stream and len(papers) >= batch_min:
+                    futures[pool.submit(fetch_bibtex_batch, client, stream, year, [key for key, _ in papers])] = papers
+                else:
+                    singles.extend(papers)
+            for future in as_completed(futures):
+                found = future.result()
+                for key, bibtex_url in futures[future]:
+                    if key in found:
+                        store.set_bibtex(key, found[key])
+                        batched += 1
+                    else:
+                        singles.append((key, bibtex_url))
+
+            futures = {pool.submit(fetch_bibtex, client, bibtex_url, mode, logger): key for key, bibtex_url in singles}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Processing papers", leave=False):
+                bibtex_data = future.result()
+                if bibtex_data:
+                    store.set_bibtex(futures[future], bibtex_data)
+
+        elapsed = time.monotonic() - start
+        rate = len(todo) / elapsed if elapsed > 0 else 0.0
+        logger.error(f"Fetched {len(todo)} BibTeX entries ({batched} in batches, {len(singles)} one by one) "
+                     f"in {elapsed:.1f}s ({rate:.2f} entries/s, {workers} workers)")
+        with client.metrics.time("write"):
+            store.export_csv(outputfile, venue_column=venue_column, bibtex=True)
+    finally:
+        store.close()
+
+
+# Main function of the fetcher scripts; venue_column names the venue column of a --store export
+def fetcher_main(args, venue_column="venue"):
+    # Pooled session shared by all fetch workers
+    limits, retry = limits_from_args(args)
+    metrics = metrics_from_args(args)
+    client = DblpClient(pool_size=args.workers, timeout=10, log=logger, cache=cache_from_args(args),
+                        limits=limits, retry=retry, metrics=metrics)
+    bibstore = bibstore_from_args(args)
+    try:
+        if args.store:
+            process_store(args.store, args.outputfile, client, workers=args.workers, batch_min=args.batch_min,
+                          mode=args.mode, venue_column=venue_column)
+        else:
+            process_csv(args.inputfile, args.outputfile, client, workers=args.workers, mode=args.mode,
+                        bibstore=bibstore)
+    finally:
+        if bibstore is not None:
+            bibstore.close()
+        logger.error(metrics.summary(client))
+        write_metrics(metrics, args, client)
+        client.close()
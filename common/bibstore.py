@@ -0,0 +1,219 @@
+import hashlib
+import sqlite3
+import time
+import zlib
+from collections import Counter
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+CODECS = ("zstd", "zlib")
+
+# Entries are buffered until this many can train the dictionary, then compressed with it; 0 disables it
+TRAIN_SAMPLES = 256
+# zlib only looks back 32 KB, which is also plenty for BibTeX with zstd
+DICTIONARY_SIZE = 32 * 1024
+# zstd beyond this level is much slower for a few percent on BibTeX blocks
+ZSTD_LEVEL = 6
+# Entries compressed together as a block, and written in one transaction, once the dictionary exists
+FLUSH_EVERY = 128
+
+
+# Raw-content dictionary of sample entries: the lines and "field = {" heads they share, the most frequent last,
+# where the compressor reaches them with the shortest distances. Venue lines (booktitle, editors, publisher)
+# recur in every entry of a venue year and field names in every entry; titles and authors do not.
+def build_dictionary(samples, size=DICTIONARY_SIZE):
+    counts = Counter()
+    for text in samples:
+        for line in text.splitlines(keepends=True):
+            counts[line] += 1
+            head, sep, _ = line.partition("= {")
+            if sep:
+                counts[head + sep] += 1
+    picked, total = [], 0
+    for fragment, count in counts.most_common():
+        data = fragment.encode()
+        if count < 2 or total + len(data) > size:
+            continue
+        picked.append(data)
+        total += len(data)
+    return b"".join(reversed(picked))
+
+
+# Compress and decompress functions of a codec, with an optional dictionary.
+# zlib writes raw deflate streams, without the header and checksum sqlite makes redundant.
+def _codec(codec, dictionary=None):
+    if codec == "zlib":
+        options = {"zdict": dictionary} if dictionary else {}
+
+        def compress(data):
+            c = zlib.compressobj(9, zlib.DEFLATED, -15, 9, **options)
+            return c.compress(data) + c.flush()
+
+        def decompress(data):
+            d = zlib.decompressobj(-15, **options)
+            return d.decompress(data) + d.flush()
+
+        return compress, decompress
+    if not HAS_ZSTD:
+        raise RuntimeError("zstd BibTeX blocks need the zstandard package: pip install zstandard")
+    zdict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=zdict, write_checksum=False,
+                                          write_dict_id=False)
+    decompressor = zstandard.ZstdDecompressor(dict_data=zdict)
+    return compressor.compress, decompressor.decompress
+
+
+# BibTeX entries keyed by dblp record key. The entries of a flush are compressed together as one block, so the
+# papers of a proceedings, fetched one after the other, share their venue lines; the index keeps the block and
+# the place of each entry in it, and reading one decompresses its block (the last one read is kept).
+# Identical entries are stored once (the index is also keyed by content digest), and a dictionary built from
+# the first TRAIN_SAMPLES entries gives the start of every block what earlier blocks held.
+# Writes only append blocks, so a rerun adds its new entries without rewriting the store.
+class BibtexStore:
+    def __init__(self, path, codec=None, train_samples=TRAIN_SAMPLES):
+        self.path = path
+        self.codec = codec or ("zstd" if HAS_ZSTD else "zlib")
+        self.train_samples = train_samples
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS dictionaries (
+            id INTEGER PRIMARY KEY, codec TEXT NOT NULL, data BLOB NOT NULL, created_at REAL NOT NULL)""")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS blocks (
+            id INTEGER PRIMARY KEY, codec TEXT NOT NULL, dictionary INTEGER, size INTEGER NOT NULL,
+            data BLOB NOT NULL, added_at REAL NOT NULL)""")
+        # The index is most of the store once the BibTeX is compressed: no rowid, so each key is stored once,
+        # and a 64-bit digest, checked against the stored text when it matches
+        self._db.execute("""CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY, digest INTEGER NOT NULL, block INTEGER NOT NULL, offset INTEGER NOT NULL,
+            length INTEGER NOT NULL) WITHOUT ROWID""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest)")
+        self._db.commit()
+        self._codecs = {}
+        self._pending = {}
+        self._block = (None, None)
+        row = self._db.execute("SELECT id FROM dictionaries WHERE codec = ? ORDER BY id DESC LIMIT 1",
+                               (self.codec,)).fetchone()
+        self._dictionary = row[0] if row else None
+
+    def _codec(self, codec, dictionary):
+        # (compress, decompress) of a codec and dictionary id, loaded once
+        if (codec, dictionary) not in self._codecs:
+            data = None
+            if dictionary is not None:
+                data = self._db.execute("SELECT data FROM dictionaries WHERE id = ?", (dictionary,)).fetchone()[0]
+            self._codecs[codec, dictionary] = _codec(codec, data)
+        return self._codecs[codec, dictionary]
+
+    def _read(self, block, offset, length):
+        return self._read_block(block)[offset:offset + length]
+
+    def _read_block(self, block):
+        if self._block[0] != block:
+            codec, dictionary, data = self._db.execute("SELECT codec, dictionary, data FROM blocks WHERE id = ?",
+                                                       (block,)).fetchone()
+            self._block = (block, self._codec(codec, dictionary)[1](data))
+        return self._block[1]
+
+    def __contains__(self, key):
+        if key in self._pending:
+            return True
+        return self._db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def get(self, key):
+        if key in self._pending:
+            return self._pending[key]
+        row = self._db.execute("SELECT block, offset, length FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return self._read(*row).decode()
+
+    def put(self, key, text):
+        # Buffered: written with the next flush, every FLUSH_EVERY entries or TRAIN_SAMPLES before the
+        # dictionary exists
+        self._pending[key] = text
+        if len(self._pending) >= (FLUSH_EVERY if self._dictionary is not None or not self.train_samples
+                                  else self.train_samples):
+            self.flush()
+
+    def _train(self):
+        # Dictionary from the pending entries and the blocks stored without a dictionary
+        samples = list(self._pending.values())
+        for codec, data in self._db.execute("SELECT codec, data FROM blocks WHERE dictionary IS NULL"):
+            samples.append(self._codec(codec, None)[1](data).decode())
+        stored = self._db.execute("SELECT COUNT(*) FROM entries JOIN blocks ON blocks.id = entries.block "
+                                  "WHERE dictionary IS NULL").fetchone()[0]
+        if len(self._pending) + stored < self.train_samples:
+            return
+        cursor = self._db.execute("INSERT INTO dictionaries (codec, data, created_at) VALUES (?, ?, ?)",
+                                  (self.codec, build_dictionary(samples), time.time()))
+        self._dictionary = cursor.lastrowid
+
+    def flush(self):
+        if not self._pending:
+            return
+        with self._db:
+            if self._dictionary is None and self.train_samples:
+                self._train()
+            block, rows, seen = bytearray(), [], {}
+            for key, text in self._pending.items():
+                data = text.encode()
+                digest = int.from_bytes(hashlib.sha256(data).digest()[:8], "big", signed=True)
+                if digest not in seen:
+                    row = next((row for row in self._db.execute(
+                        "SELECT block, offset, length FROM entries WHERE digest = ?", (digest,))
+                        if self._read(*row) == data), None)
+                    if row is None:
+                        # A newline between entries keeps their lines apart for the compressor
+                        row = (None, len(block), len(data))
+                        block += data + b"\n"
+                    seen[digest] = row
+                rows.append((key, digest, *seen[digest]))
+            if block:
+                block_id = self._db.execute(
+                    "INSERT INTO blocks (codec, dictionary, size, data, added_at) VALUES (?, ?, ?, ?, ?)",
+                    (self.codec, self._dictionary, len(block),
+                     self._codec(self.codec, self._dictionary)[0](bytes(block)), time.time())).lastrowid
+                rows = [(key, digest, block_id if b is None else b, offset, length)
+                        for key, digest, b, offset, length in rows]
+            self._db.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", rows)
+        self._pending.clear()
+
+    def count(self):
+        self.flush()
+        return self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self):
+        # (entries, blocks, BibTeX bytes, compressed bytes) of the written entries
+        entries = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        blocks, size, stored = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM blocks").fetchone()
+        return entries, blocks, size, stored
+
+    def iter_entries(self):
+        # (key, BibTeX) of every written entry, in the order they were added (duplicates where the first was)
+        self.flush()
+        for key, block, offset, length in self._db.execute(
+                "SELECT key, block, offset, length FROM entries ORDER BY block, offset").fetchall():
+            yield key, self._read(block, offset, length).decode()
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+
+def add_bibstore_arguments(parser):
+    parser.add_argument("--bibstore", default=None, metavar="FILE",
+                        help="Keep the BibTeX in a compressed store keyed by dblp record key, and write a bibtex_key "
+                             "column referencing it instead of the bibtex_data text. Reruns only add new entries.")
+    parser.add_argument("--bibstore-codec", choices=CODECS, default=None,
+                        help="Compression of new BibTeX blocks. Default: zstd if the zstandard package is installed, "
+                             "else zlib")
+
+
+def bibstore_from_args(args):
+    if not args.bibstore:
+        return None
+    return BibtexStore(args.bibstore, codec=args.bibstore_codec)
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from bs4 import BeautifulSoup
+
+from common.search import DBLP_API_URL, DBLP_URL, HITS_PER_PAGE, key_from_url
+
+logger = logging.getLogger("dblp bibtex")
+
+DBLP_REC_URL = f"{DBLP_URL}/rec"
+
+# How fetch_bibtex gets an entry: the raw .bib of the record, or the bibtex-section of its HTML page
+MODES = ("raw", "html")
+
+# dblp BibTeX export of search results: bib0 condensed, bib1 standard, bib2 with crossref entries
+BIB_FORMAT = "bib1"
+
+# Start of one dblp entry, e.g. "@inproceedings{DBLP:conf/ccs/X20,"
+ENTRY_START = re.compile(r"^@\w+\{DBLP:([^,\s]+),", re.MULTILINE)
+
+
+# Raw BibTeX url of a record, from the url the crawlers store:
+# https://dblp.org/rec/conf/ccs/X20.html?view=bibtex -> https://dblp.org/rec/conf/ccs/X20.bib
+def raw_bibtex_url(bibtex_url):
+    key = key_from_url(bibtex_url)
+    return f"{DBLP_REC_URL}/{key}.bib" if key else None
+
+
+# Stream of a record key, e.g. conf/ccs/X20 -> conf/ccs
+def stream_of(key):
+    return key.rpartition("/")[0]
+
+
+# BibTeX from the HTML record page, as the fetchers always did
+def html_bibtex(text):
+    soup = BeautifulSoup(text, "html.parser")
+    bibtex_section = soup.find("div", id="bibtex-section")
+    if bibtex_section and bibtex_section.find("pre"):
+        return bibtex_section.find("pre").text.strip()
+    return None
+
+
+# {dblp key: entry} of a multi-record BibTeX export
+def split_bibtex(text):
+    starts = list(ENTRY_START.finditer(text))
+    entries = {}
+    for i, match in enumerate(starts):
+        end = starts[i + 1].start() if i + 1 < len(starts) else len(text)
+        entries[match.group(1)] = text[match.start():end].strip()
+    return entries
+
+
+def fetch_raw(client, bibtex_url):
+    url = raw_bibtex_url(bibtex_url)
+    if url is None:
+        return None
+    text = client.get(url).text.strip()
+    return text if text.startswith("@") else None
+
+
+def fetch_html(client, bibtex_url):
+    text = client.get(bibtex_url).text
+    with client.metrics.time("parse"):
+        return html_bibtex(text)
+
+
+def batch_payload(stream, year, page, hits=HITS_PER_PAGE):
+    return {"q": f"streamid:{stream}: year:{year}:", "format": BIB_FORMAT, "h": str(hits), "f": str(page * hits)}
+
+
+# BibTeX of many records of one stream and year with one export request per page of hits.
+# Returns {key: entry} for the keys found; pages stop once all keys are found or a page comes back short.
+def fetch_batch(client, stream, year, keys, hits=HITS_PER_PAGE):
+    wanted = set(keys)
+    found = {}
+    page = 0
+    while wanted:
+        text = client.get(DBLP_API_URL, batch_payload(stream, year, page, hits)).text
+        with client.metrics.time("parse"):
+            entries = split_bibtex(text)
+        for key in wanted & entries.keys():
+            found[key] = entries[key]
+        wanted -= entries.keys()
+        if len(entries) < hits:
+            break
+        page += 1
+    return found
+
+
+# BibTeX of one paper: the raw .bib first (no HTML to parse), then the HTML record page
+def fetch_bibtex(client, bibtex_url, mode="raw", log=logger):
+    if mode == "raw":
+        try:
+            bibtex_data = fetch_raw(client, bibtex_url)
+            if bibtex_data:
+                client.metrics.count("bibtex_fetched")
+                return bibtex_data
+        except requests.exceptions.RequestException as e:
+            log.warning(f"Raw BibTeX failed for {bibtex_url}, falling back to the HTML page: {e}")
+    try:
+        bibtex_data = fetch_html(client, bibtex_url)
+        client.metrics.count("bibtex_fetched" if bibtex_data else "bibtex_missing")
+        if not bibtex_data:
+            log.warning(f"No BibTeX section found for URL: {bibtex_url}")
+        return bibtex_data
+    except requests.exceptions.RequestException as e:
+        client.metrics.count("bibtex_failed")
+        log.error(f"Failed to fetch BibTeX data from {bibtex_url}: {e}")
+        return None
+
+
+# BibTeX stage of a fused crawl: fetches the BibTeX of papers while the async iterable producing them
+# is still running, and calls on_done(paper) with paper.bibtex_data set. At most `workers` fetches run at
+# once; while they are all busy the producer is not read, and once its buffer fills the crawl waits.
+async def attach_bibtex(papers, client, on_done, workers=8, mode="raw", log=logger):
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max(workers, 1))
+    tasks = set()
+
+    async def fetch(paper, pool):
+        try:
+            paper.bibtex_data = await loop.run_in_executor(pool, fetch_bibtex, client, paper.bibtex_url, mode, log)
+        finally:
+            slots.release()
+        on_done(paper)
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        async for paper in papers:
+            if not paper.bibtex_url:
+                on_done(paper)
+                continue
+            await slots.acquire()
+            task = asyncio.create_task(fetch(paper, pool))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+
+
+def add_bibtex_arguments(parser, workers=8):
+    parser.add_argument("--workers", type=int, default=workers, metavar="INT",
+                        help=f"Number of BibTeX entries fetched in parallel. Default: {workers}")
+    parser.add_argument("--mode", choices=MODES, default="raw",
+                        help="raw: download the record's .bib, html: parse the BibTeX out of the record page. "
+                             "raw falls back to html when it fails. Default: raw")
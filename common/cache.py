@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlencode
+
+import requests
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "dblp-crawer")
+
+# TTL in seconds, matched against the request URL; the first matching fragment wins
+DEFAULT_TTLS = {
+    "/search/publ/": 24 * 3600,  # search result pages change when dblp adds records
+    "/rec/": 30 * 24 * 3600,     # record pages and BibTeX are stable
+}
+DEFAULT_TTL = 24 * 3600
+# Stores between recounts of the cache size, which also pick up what other processes added or evicted
+RECOUNT_EVERY = 256
+
+
+# Raised in offline mode when a request is not in the cache
+class CacheMiss(requests.exceptions.RequestException):
+    pass
+
+
+# Minimal stand-in for requests.Response built from a cached body
+class CachedResponse:
+    from_cache = True
+
+    def __init__(self, url, content, encoding, headers=None):
+        self.url = url
+        self.content = content
+        self.encoding = encoding or "utf-8"
+        self.headers = headers or {}
+        self.status_code = 200
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        pass
+
+
+def request_key(url, params=None):
+    # Params are sorted so the same query always maps to the same entry
+    if params:
+        url = url + "?" + urlencode(sorted(params.items()))
+    return url
+
+
+# Content-addressed response cache: bodies live in blobs/<sha256>, an SQLite index maps requests to them
+class ResponseCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=1024 ** 3, ttls=None, offline=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._stores = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite"), timeout=30,
+                                   check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY, digest TEXT NOT NULL, size INTEGER NOT NULL,
+            encoding TEXT, etag TEXT, last_modified TEXT,
+            fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        # Running size of the cache, kept up to date by store and evict
+        self._bytes = self.total_bytes()
+
+    def ttl_for(self, url):
+        for fragment, ttl in self.ttls.items():
+            if fragment in url:
+                return ttl
+        return DEFAULT_TTL
+
+    def _blob_path(self, digest):
+        return os.path.join(self.directory, "blobs", digest[:2], digest)
+
+    def lookup(self, url, params=None):
+        # Returns (entry dict, fresh) or (None, False)
+        key = request_key(url, params)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest, encoding, etag, last_modified, fetched_at FROM entries WHERE key = ?",
+                (key,)).fetchone()
+        if row is None or not os.path.exists(self._blob_path(row[0])):
+            return None, False
+        entry = dict(zip(("digest", "encoding", "etag", "last_modified", "fetched_at"), row), key=key)
+        fresh = time.time() - entry["fetched_at"] < self.ttl_for(url)
+        return entry, fresh
+
+    def response(self, entry, url):
+        # None if another process evicted the blob since the lookup, which is a miss
+        try:
+            with open(self._blob_path(entry["digest"]), "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), entry["key"]))
+        self.hits += 1
+        return CachedResponse(url, content, entry["encoding"])
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def revalidated(self, entry):
+        # A 304 answer: the cached body is still current
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE entries SET fetched_at = ?, accessed_at = ? WHERE key = ?",
+                             (now, now, entry["key"]))
+
+    def store(self, url, params, response):
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        key = request_key(url, params)
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, digest, len(content), response.encoding,
+                 response.headers.get("ETag"), response.headers.get("Last-Modified"), now, now))
+            self._bytes += len(content) - (old[0] if old else 0)
+            self._stores += 1
+        self.misses += 1
+        if self._stores % RECOUNT_EVERY == 0:
+            self._bytes = self.total_bytes()
+        self.evict()
+
+    def total_bytes(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self):
+        # Drop least recently used entries until the cache fits into max_bytes
+        if self.max_bytes is None or self._bytes <= self.max_bytes:
+            return
+        excess = self._bytes - self.max_bytes
+        with self._lock:
+            victims = []
+            for key, digest, size in self._db.execute(
+                    "SELECT key, digest, size FROM entries ORDER BY accessed_at"):
+                victims.append((key, digest))
+                excess -= size
+                self._bytes -= size
+                if excess <= 0:
+                    break
+            self._db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in victims])
+            for _, digest in victims:
+                # Blobs are shared between keys, only remove unreferenced ones
+                if not self._db.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+                    try:
+                        os.remove(self._blob_path(digest))
+                    except FileNotFoundError:
+                        pass
+
+    def close(self):
+        self._db.close()
+
+
+def add_cache_arguments(parser):
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Directory of the HTTP response cache. Default: {DEFAULT_CACHE_DIR}")
+    parser.add_argument("--cache-size", type=int, default=1024, metavar="MB",
+                        help="Maximum cache size in MB, least recently used entries are evicted. Default: 1024")
+    parser.add_argument("--cache-ttl", action="append", default=[], metavar="FRAGMENT=SECONDS",
+                        help="Override the TTL of URLs containing FRAGMENT, e.g. /search/publ/=3600. Repeatable.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Disable the HTTP response cache.")
+    parser.add_argument("--offline", action="store_true",
+                        help="Serve every request from the cache only, never touch the network.")
+
+
+def cache_from_args(args):
+    if args.no_cache and not args.offline:
+        return None
+    ttls = dict(DEFAULT_TTLS)
+    for item in args.cache_ttl:
+        fragment, _, seconds = item.rpartition("=")
+        ttls.pop(fragment, None)
+        ttls = {fragment: float(seconds), **ttls}
+    return ResponseCache(args.cache_dir, max_bytes=args.cache_size * 1024 ** 2, ttls=ttls, offline=args.offline)
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import sqlite3
+import time
+from collections import namedtuple
+
+# Progress of one query unit (a venue, or a batch of venues)
+UnitState = namedtuple("UnitState", ["complete", "next_page", "backend"])
+FRESH = UnitState(False, 0, None)
+
+
+def checkpoint_path(args):
+    return args.checkpoint or f"{args.filename}.checkpoint"
+
+
+def signature(*parts):
+    # Identifies the query a checkpoint belongs to; a new keyword set or year window starts over
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+# Per-venue crawl checkpoints: pages done per query unit, plus years done and newest year per venue
+class CheckpointStore:
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS units (
+            unit TEXT PRIMARY KEY, signature TEXT NOT NULL, backend TEXT,
+            next_page INTEGER NOT NULL, complete INTEGER NOT NULL, updated_at REAL NOT NULL)""")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS venues (
+            venue TEXT PRIMARY KEY, newest_year INTEGER, first_year INTEGER, last_year INTEGER,
+            completed_at REAL)""")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS items (
+            venue TEXT NOT NULL, year INTEGER NOT NULL, crawled_at REAL NOT NULL, PRIMARY KEY (venue, year))""")
+        self._db.commit()
+
+    def state(self, unit, sig):
+        row = self._db.execute("SELECT signature, complete, next_page, backend FROM units WHERE unit = ?",
+                               (unit,)).fetchone()
+        if row is None or row[0] != sig:
+            return FRESH
+        return UnitState(bool(row[1]), row[2], row[3])
+
+    def page_done(self, unit, sig, backend, page, newest_years):
+        # Called after the rows of a page are written; newest_years is {venue: newest year on the page}
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO units VALUES (?, ?, ?, ?, 0, ?)",
+                             (unit, sig, backend, page + 1, time.time()))
+            self._note_years(newest_years)
+
+    def unit_done(self, unit, sig, backend, venues, first_year, last_year):
+        now = time.time()
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO units VALUES (?, ?, ?, 0, 1, ?)",
+                             (unit, sig, backend, now))
+            for venue in venues:
+                self._db.execute("INSERT OR IGNORE INTO venues (venue) VALUES (?)", (venue,))
+                # Years done only grow: keep the widest contiguous window crawled so far
+                self._db.execute("""UPDATE venues SET completed_at = ?,
+                    first_year = MIN(COALESCE(first_year, ?), ?),
+                    last_year = MAX(COALESCE(last_year, ?), ?) WHERE venue = ?""",
+                                 (now, first_year, first_year, last_year, last_year, venue))
+
+    def _note_years(self, newest_years):
+        for venue, year in newest_years.items():
+            self._db.execute("INSERT OR IGNORE INTO venues (venue) VALUES (?)", (venue,))
+            self._db.execute("UPDATE venues SET newest_year = MAX(COALESCE(newest_year, ?), ?) WHERE venue = ?",
+                             (year, year, venue))
+
+    def newest_year(self, venues):
+        # Oldest "newest year" over completed venues; None if any venue was never completed
+        years = []
+        for venue in venues:
+            row = self._db.execute("SELECT newest_year, completed_at FROM venues WHERE venue = ?",
+                                   (venue,)).fetchone()
+            if row is None or row[1] is None:
+                return None
+            if row[0] is not None:
+                years.append(row[0])
+        return min(years) if years else None
+
+    def items_done(self, venue, years):
+        # Years of a venue crawled to the end by a scheduled run
+        now = time.time()
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?)",
+                                 ((venue, year, now) for year in years))
+
+    def crawled(self):
+        # {(venue, year): last time crawled}, by scheduled runs or by whole-venue crawls
+        crawled = {}
+        for venue, first_year, last_year, completed_at in self._db.execute(
+                "SELECT venue, first_year, last_year, completed_at FROM venues WHERE completed_at IS NOT NULL"):
+            if first_year is not None and last_year is not None:
+                crawled.update(((venue, year), completed_at) for year in range(first_year, last_year + 1))
+        for venue, year, crawled_at in self._db.execute("SELECT venue, year, crawled_at FROM items"):
+            crawled[venue, year] = max(crawled.get((venue, year), 0), crawled_at)
+        return crawled
+
+    def clear(self):
+        with self._db:
+            self._db.execute("DELETE FROM units")
+            self._db.execute("DELETE FROM venues")
+            self._db.execute("DELETE FROM items")
+
+    def close(self):
+        self._db.close()
+
+
+def add_checkpoint_arguments(parser):
+    parser.add_argument("--checkpoint", default=None, metavar="FILE",
+                        help="Checkpoint database used to resume crawls. Default: <filename>.checkpoint")
+    parser.add_argument("--restart", action="store_true",
+                        help="Forget the checkpoints and crawl every venue from scratch.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only fetch records from the newest year seen in the last complete run onwards.")
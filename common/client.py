@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from common.cache import CacheMiss
+from common.metrics import Metrics
+from common.ratelimit import RETRY_STATUSES, HostLimits, RetryPolicy, parse_retry_after
+
+logger = logging.getLogger("dblp client")
+
+
+# Raised by the requests of a cancelled client instead of waiting for their turn or a retry
+class RequestCancelled(requests.exceptions.RequestException):
+    pass
+
+
+# One keep-alive session with a connection pool, reused for every request.
+# Every request goes through the per-host adaptive rate limiter and circuit breaker of `limits`.
+# Network time, rate limit waits and bytes go to `metrics`, which the crawl engine shares.
+class DblpClient:
+    def __init__(self, pool_size=10, timeout=60, log=None, cache=None, limits=None, retry=None, metrics=None):
+        self.logger = log or logger
+        self.cache = cache
+        self.metrics = metrics or Metrics()
+        self.timeout = timeout
+        self.limits = limits or HostLimits()
+        self.retry = retry or RetryPolicy()
+        self.retries = 0
+        self.throttled = 0
+        self._cancelled = threading.Event()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url, params=None, timeout=None):
+        if self.cache is None:
+            return self._fetch(url, params, timeout)
+
+        entry, fresh = self.cache.lookup(url, params)
+        if entry and (fresh or self.cache.offline):
+            cached = self.cache.response(entry, url)
+            if cached is not None:
+                return cached
+            entry = None  # evicted since the lookup
+        if self.cache.offline:
+            raise CacheMiss(f"Not in cache (offline mode): {url} {params or ''}")
+
+        # Expired entries are revalidated with ETag / Last-Modified
+        r = self._fetch(url, params, timeout, headers=self.cache.conditional_headers(entry))
+        if r.status_code == 304 and entry:
+            self.cache.revalidated(entry)
+            cached = self.cache.response(entry, url)
+            if cached is not None:
+                return cached
+            r = self._fetch(url, params, timeout)
+        self.cache.store(url, params, r)
+        return r
+
+    def _fetch(self, url, params=None, timeout=None, headers=None):
+        host = urlsplit(url).netloc
+        limiter, breaker = self.limits.for_host(host)
+        shared = self.limits.shared
+        for attempt in range(self.retry.max_retries + 1):
+            breaker.before_request(host)
+            with self.metrics.time("ratelimit"):
+                limiter.acquire(self._cancelled.wait)
+                if shared is not None:
+                    shared.acquire(host, self._cancelled.wait)
+            if self._cancelled.is_set():
+                raise RequestCancelled(f"Client cancelled before requesting {url}")
+            start = time.monotonic()
+            retry_after = None
+            try:
+                with self.metrics.time("network"):
+                    r = self.session.get(url, params=params, headers=headers, timeout=timeout or self.timeout)
+                    content = r.content  # read the body inside the timer
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+                limiter.on_error()
+                breaker.record_failure()
+            else:
+                self.metrics.count("requests")
+                self.metrics.count("bytes", len(content))
+                if r.status_code not in RETRY_STATUSES:
+                    limiter.on_success(time.monotonic() - start)
+                    breaker.record_success()
+                    r.raise_for_status()  # other 4xx are not worth a retry
+                    return r
+                error = requests.exceptions.HTTPError(f"{r.status_code} for url: {r.url}", response=r)
+                if r.status_code == 429:
+                    self.throttled += 1
+                    retry_after = parse_retry_after(r.headers.get("Retry-After"))
+                    limiter.on_throttle(retry_after)
+                    if shared is not None and retry_after:
+                        shared.pause(host, retry_after)
+                    breaker.record_throttle()
+                else:
+                    limiter.on_error()
+                    breaker.record_failure()
+
+            if attempt == self.retry.max_retries:
+                raise error
+            self.retries += 1
+            wait_time = max(retry_after or 0, self.retry.backoff(attempt))
+            self.logger.warning(f"Request failed (attempt {attempt + 1}/{self.retry.max_retries + 1}): {error}, "
+                                f"waiting {wait_time:.1f} seconds")
+            self._cancelled.wait(wait_time)
+
+    # Requests waiting in the rate limiter or between retries fail at once with RequestCancelled, e.g. after
+    # Ctrl-C, so worker threads do not hold up the exit; requests already on the wire finish
+    def cancel(self):
+        self._cancelled.set()
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
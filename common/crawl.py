@@ -0,0 +1,292 @@
+import asyncio
+import datetime
+import logging
+import queue
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+
+import requests
+
+from common.checkpoint import FRESH, signature
+from common.engine import CrawlEngine
+from common.scoring import KeywordScorer
+from common.search import search_page, year_query
+from common.store import PaperRow
+from common.venues import VenueMatcher, batch_units
+
+logger = logging.getLogger("dblp crawl")
+
+# Record type, stream prefix and venue name check of each category;
+# the journal crawler does not filter on the isPartOf name, only on the stream
+Category = namedtuple("Category", ["record_class", "prefix", "check_name"])
+CATEGORIES = {
+    "conference": Category("inproceedings", "conf", True),
+    "journal": Category("article", "journals", False),
+}
+
+MAX_PAGES = 50  # Set maximum pages per query unit
+
+
+# Raised by iter_unit, after its papers, when both backends failed and the unit is incomplete
+class UnitFailed(Exception):
+    pass
+
+
+# Crawl options that used to be module globals of the crawler scripts
+CrawlSettings = namedtuple("CrawlSettings", ["category", "syear", "eyear", "threshold", "strict", "backend",
+                                             "all_records", "incremental", "html_parser"],
+                           defaults=("conference", 2015, None, 0.4, False, "json", False, False, "html.parser"))
+
+
+def intern(name):
+    return sys.intern(name) if name is not None else None
+
+
+def settings_from_args(args, category):
+    return CrawlSettings(category, args.syear, args.eyear, args.sthreshod, args.strictmatch, args.backend,
+                         args.all_records, args.incremental, args.html_parser)
+
+
+# Paper class; slotted, without a __dict__ per paper
+class Paper:
+    __slots__ = ("title", "venue", "year", "pages", "authors", "score", "bibtex_url", "bibtex_data", "key", "target")
+
+    def __init__(self, title=None, venue=None, year=None, pages=None, bibtex_url=None, key=None, target=None):
+        self.title = title
+        self.venue = venue
+        self.year = year
+        self.pages = pages
+        self.authors = []
+        self.score = None
+        self.bibtex_url = bibtex_url
+        self.bibtex_data = None
+        self.key = key  # dblp record key
+        self.target = target  # venue_set name the paper was crawled for
+
+    # The journal crawler's name for the venue column
+    @property
+    def journal(self):
+        return self.venue
+
+    def row(self, threshold):
+        return PaperRow(self.key, self.target, self.venue, self.title, self.year, self.pages, self.authors,
+                        self.bibtex_url, self.score, self.score >= threshold)
+
+    def __str__(self):
+        # Return string representation of the paper
+        return "{} {}, {} {}, BibTeX URL: {}".format(
+            self.title, self.pages, self.venue, self.year, self.bibtex_url
+        )
+
+
+# Search one query unit, a venue or a batch (tuple) of venues, and yield its new accepted papers page by page.
+# With a store, every record of a page is stored in one transaction before the page is checkpointed and its
+# papers are yielded; without one, `seen` drops papers already yielded in this run.
+async def iter_unit(unit, keywords, scorer, settings, store=None, checkpoint=None, seen=None, log=logger,
+                    engine=None):
+    category = CATEGORIES[settings.category]
+    noun = settings.category
+    backend = settings.backend
+    matcher = VenueMatcher((unit,) if isinstance(unit, str) else unit, category.prefix, strict=settings.strict,
+                           check_name=category.check_name)
+    name = ", ".join(matcher.venues)
+    # Incremental runs only ask for the years since the newest one seen last time
+    start_year = settings.syear
+    if settings.incremental and checkpoint is not None:
+        start_year = max(start_year, checkpoint.newest_year(matcher.venues) or start_year)
+    # Year bounds are part of the query, records outside them are never downloaded.
+    # With all_records the keywords stay out of the query, and any keyword set can be applied by rescore.py
+    terms = "" if settings.all_records else "|".join(keywords) + " "
+    search_word = terms + matcher.query() + " " + year_query(start_year, settings.eyear)
+    # Every record is stored, so the threshold and score mode do not change what a unit fetches
+    sig = signature(search_word, settings.strict)
+
+    state = checkpoint.state(name, sig) if checkpoint is not None else FRESH
+    if state.complete and not settings.incremental:
+        log.info(f"Already complete, skipping {noun}: {name}")
+        return
+
+    # Resume after the last page written, if the crash happened on the same backend
+    page = state.next_page if state.backend == backend else 0
+    if page:
+        log.info(f"Resuming {noun} {name} at page {page}")
+    year_smaller_bool = False
+    failed = False
+    found = dict.fromkeys(matcher.venues, 0)
+    returned = routed = keyless = 0
+    seen = set() if seen is None else seen
+
+    metrics = engine.metrics
+    while not year_smaller_bool and page < MAX_PAGES:
+        # 重试和请求间隔由共享的 engine 负责
+        try:
+            with metrics.time("page", venue=name):
+                record_list, done, sorted_by_year = await search_page(engine, search_word, page,
+                                                                      category.record_class, backend,
+                                                                      html_parser=settings.html_parser)
+            metrics.count("pages", venue=name)
+        except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as e:
+            log.error(f"Request to the {backend} backend failed for {noun} {name}: {e}")
+            if backend == "html":
+                failed = True
+                break
+            # Fall back to the HTML endpoint and start the unit over
+            log.warning(f"Falling back to the html backend for {noun}: {name}")
+            backend = "html"
+            page = 0
+            continue
+
+        if not record_list and done:
+            log.warning("No more papers found!")
+            break
+
+        papers = []
+        returned += len(record_list)
+        for record in record_list:
+            if record.year is None or record.year < start_year:
+                if sorted_by_year:
+                    year_smaller_bool = True
+                    break
+                continue
+            if settings.eyear is not None and record.year > settings.eyear:
+                continue
+
+            # Route the record back to its venue of the batch
+            target = matcher.route(record.key, record.venue)
+            if target is None:
+                continue
+            routed += 1
+
+            # Papers are deduplicated by key, and the store would keep every NULL key as a new row
+            key = record.key or record.bibtex_url
+            if not key:
+                keyless += 1
+                continue
+
+            # Venue and author names repeat across papers and are interned, one string each
+            pp = Paper(title=record.title, venue=intern(record.venue), year=record.year, pages=record.pages,
+                       bibtex_url=record.bibtex_url, key=key, target=target)
+            pp.authors.extend(map(intern, record.authors))
+            papers.append(pp)
+
+        # Score the whole page in one pass
+        with metrics.time("score"):
+            for pp, score in zip(papers, scorer.score_many([pp.title for pp in papers])):
+                pp.score = score
+        accepted = [pp for pp in papers if pp.score >= settings.threshold]
+        for venue, count in Counter(pp.target for pp in papers).items():
+            metrics.count("records_seen", count, venue=venue)
+        for venue, count in Counter(pp.target for pp in accepted).items():
+            metrics.count("records_accepted", count, venue=venue)
+
+        # Store every record of the page in one transaction, below the threshold too, so the corpus
+        # can be re-scored offline; duplicates are dropped by record key. Then checkpoint the page.
+        start = time.perf_counter()
+        if store is not None:
+            added = {row.key for row in store.add_page([pp.row(settings.threshold) for pp in papers])}
+            new = [pp for pp in accepted if pp.key in added]
+        else:
+            new = [pp for pp in accepted if pp.key not in seen]
+            seen.update(pp.key for pp in new)
+        if checkpoint is not None:
+            newest = {}
+            for pp in papers:
+                newest[pp.target] = max(newest.get(pp.target, pp.year), pp.year)
+            checkpoint.page_done(name, sig, backend, page, newest)
+        metrics.add_time("write", time.perf_counter() - start)
+
+        for pp in new:
+            found[pp.target] += 1
+            yield pp
+
+        if done:
+            break
+        page += 1
+
+    if not failed and checkpoint is not None:
+        checkpoint.unit_done(name, sig, backend, matcher.venues, start_year,
+                             settings.eyear or datetime.date.today().year)
+    for target, count in found.items():
+        log.info(f"Found {count} papers for {noun}: {target}")
+    if keyless:
+        log.warning(f"Skipped {keyless} records of {noun} {name} without a dblp record key or BibTeX url")
+    if len(matcher.venues) > 1 and not routed and not failed:
+        # Every venue of the batch comes back empty, most likely a stream id dblp does not know
+        log.warning(f"None of the {returned} records returned for the {noun} batch {name} could be routed "
+                    f"to its venues, check their stream ids")
+    if failed:
+        raise UnitFailed(f"Both backends failed for {noun} {name}")
+
+
+# New accepted papers of the venues, as their pages are parsed; batch_size venues are packed into one query
+async def aiter_papers(venues, keywords, scorer=None, settings=None, engine=None, store=None, checkpoint=None,
+                       batch_size=1, log=logger):
+    settings = settings or CrawlSettings()
+    scorer = scorer or KeywordScorer(keywords)
+    prefix = CATEGORIES[settings.category].prefix
+    units = [venues] if isinstance(venues, str) else batch_units(venues, batch_size, prefix)
+    own_engine = engine is None
+    engine = engine or CrawlEngine(log=log)
+    try:
+        async for paper in engine.stream(units, iter_unit, keywords, scorer, settings, store, checkpoint, set(), log):
+            yield paper
+    finally:
+        if own_engine:
+            engine.close()
+
+
+# Blocking generator over aiter_papers, for use as a library:
+#     for paper in iter_papers(["ccs", "ndss"], {"attack": 0.5, "detection": 0.3}, syear=2020): ...
+# keywords is {keyword: weight}, or a list of keywords weighing 1 each. The crawl runs on an event loop
+# in a background thread; at most `buffer` papers wait for the caller, then the crawl pauses.
+def iter_papers(venues, keywords, syear=2015, eyear=None, category="conference", threshold=0.4,
+                scoremode="substring", backend="json", strict=False, all_records=False, batch_size=1,
+                concurrency=4, client=None, buffer=1000, html_parser="html.parser", parse_workers=0, log=logger):
+    if not isinstance(keywords, dict):
+        keywords = dict.fromkeys(keywords, 1.0)
+    settings = CrawlSettings(category, syear, eyear, threshold, strict, backend, all_records, False, html_parser)
+    scorer = KeywordScorer(keywords, mode=scoremode)
+    papers = queue.Queue(maxsize=buffer)
+    stop = threading.Event()
+    errors = []
+    end = object()
+
+    async def produce():
+        engine = CrawlEngine(client, concurrency=concurrency, log=log, parse_workers=parse_workers)
+        try:
+            async for paper in aiter_papers(venues, keywords, scorer, settings, engine, batch_size=batch_size, log=log):
+                while not stop.is_set():
+                    try:
+                        papers.put(paper, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            if client is None:
+                engine.close()
+            elif engine.parse_pool is not None:
+                # The caller's client stays open, only the parse workers are ours
+                engine.parse_pool.shutdown(cancel_futures=True)
+            while not stop.is_set():
+                try:
+                    papers.put(end, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    thread = threading.Thread(target=asyncio.run, args=(produce(),), daemon=True)
+    thread.start()
+    try:
+        while (paper := papers.get()) is not end:
+            yield paper
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,116 @@
+import gzip
+import html.entities
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+# Fields kept from a dump record; repeated <author> tags are collected into a list
+DumpRecord = namedtuple("DumpRecord", ["type", "key", "title", "authors", "venue", "year",
+                                       "pages", "volume", "number", "ee", "url"])
+
+FIELDS = ("author", "title", "booktitle", "journal", "year", "pages", "volume", "number", "ee", "url")
+
+# dblp.xml references dblp.dtd for its character entities; they are the HTML Latin-1 set
+DBLP_ENTITIES = {name: chr(codepoint) for name, codepoint in html.entities.name2codepoint.items()}
+
+# SAX-style target: keeps only the fields of the current record, never builds a tree
+class _RecordTarget:
+    def __init__(self, record_types, emit, streams=None):
+        self.record_types = record_types
+        self.streams = streams
+        self.emit = emit
+        self.depth = 0
+        self.record = None
+        self.field = None
+        self.buffer = []
+
+    def start(self, tag, attrib):
+        self.depth += 1
+        if self.depth == 2 and tag in self.record_types:
+            key = attrib.get("key")
+            # Records outside the wanted streams are skipped without collecting any field
+            if self.streams is not None and (not key or key.rsplit("/", 1)[0] not in self.streams):
+                return
+            self.record = {"type": tag, "key": key, "author": []}
+        elif self.depth == 3 and self.record is not None and tag in FIELDS:
+            self.field = tag
+            self.buffer = []
+
+    def data(self, text):
+        # Text of nested markup (<i>, <sub>, ...) inside a field is kept
+        if self.field is not None:
+            self.buffer.append(text)
+
+    def end(self, tag):
+        if self.depth == 3 and self.field == tag:
+            value = "".join(self.buffer).strip()
+            if tag == "author":
+                self.record["author"].append(value)
+            elif tag == "ee":
+                self.record.setdefault("ee", value)  # first electronic edition, usually the DOI
+            else:
+                self.record[tag] = value
+            self.field = None
+        elif self.depth == 2 and self.record is not None:
+            rec = self.record
+            year = rec.get("year")
+            self.emit(DumpRecord(
+                type=rec["type"],
+                key=rec["key"],
+                title=rec.get("title", ""),
+                authors=rec["author"],
+                venue=rec.get("booktitle") or rec.get("journal"),
+                year=int(year) if year and year.isdigit() else None,
+                pages=rec.get("pages"),
+                volume=rec.get("volume"),
+                number=rec.get("number"),
+                ee=rec.get("ee"),
+                url=rec.get("url"),
+            ))
+            self.record = None
+        self.depth -= 1
+
+    def close(self):
+        pass
+
+
+# Stream records of the given types from dblp.xml or dblp.xml.gz in bounded memory.
+# streams optionally restricts the output to keys under those stream ids, e.g. {"conf/ccs"}.
+def iter_dump(path, record_types=("inproceedings", "article"), streams=None, chunk_size=1 << 20):
+    records = []
+    streams = frozenset(streams) if streams is not None else None
+    parser = ET.XMLParser(target=_RecordTarget(frozenset(record_types), records.append, streams))
+    parser.entity.update(DBLP_ENTITIES)
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            yield from records
+            records.clear()
+    parser.close()
+    yield from records
+
+
+def record_bibtex_url(record):
+    return f"https://dblp.org/rec/{record.key}.html?view=bibtex"
+
+
+# Build a dblp-style BibTeX entry from the record itself
+def record_bibtex(record):
+    fields = [("author", " and\n               ".join(record.authors)),
+              ("title", record.title.rstrip("."))]
+    if record.type == "article":
+        fields += [("journal", record.venue), ("volume", record.volume), ("number", record.number)]
+    else:
+        fields.append(("booktitle", record.venue))
+    fields += [("pages", record.pages), ("year", str(record.year) if record.year else None)]
+    if record.ee:
+        fields.append(("url", record.ee))
+        if record.ee.startswith("https://doi.org/"):
+            fields.append(("doi", record.ee[len("https://doi.org/"):]))
+    fields += [("biburl", f"https://dblp.org/rec/{record.key}.bib"),
+               ("bibsource", "dblp computer science bibliography, https://dblp.org")]
+    body = ",\n".join(f"  {name:<9} = {{{value}}}" for name, value in fields if value)
+    return f"@{record.type}{{DBLP:{record.key},\n{body}\n}}"
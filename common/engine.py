@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from common.client import DblpClient
+
+logger = logging.getLogger("dblp crawl engine")
+
+
+# Runs in a parse worker: the result and the time of the parse itself, without the wait for a free worker
+def timed_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+# Runs one search generator per venue with a bounded number in flight, started in the order given.
+# With parse_workers, result pages are parsed in a process pool while other pages download.
+# With a budget (common.schedule.Budget), no venue starts once it is exhausted; running ones finish.
+class CrawlEngine:
+    def __init__(self, client=None, concurrency=4, log=None, parse_workers=0, budget=None):
+        self.logger = log or logger
+        self.client = client or DblpClient(pool_size=max(concurrency, 1), log=self.logger)
+        self.concurrency = concurrency
+        self.budget = budget
+        self.skipped = 0
+        self.metrics = self.client.metrics
+        self.parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else None
+
+    def _over_budget(self, venue):
+        if self.budget is None or not self.budget.exhausted():
+            return False
+        if not self.skipped:
+            self.logger.warning(f"Budget spent ({self.budget}), not starting {venue} and the rest")
+        self.skipped += 1
+        return True
+
+    async def fetch(self, url, params=None):
+        # The pooled session is blocking, so run it off the event loop
+        return await asyncio.to_thread(self.client.get, url, params)
+
+    async def parse(self, func, *args):
+        # func and its arguments are pickled to the worker, so func must be a module-level function
+        if self.parse_pool is None:
+            with self.metrics.time("parse"), self.metrics.profile():
+                return func(*args)
+        # Time spent queued for a worker and shipping the page and records is parse_wait, not parse
+        start = time.perf_counter()
+        result, seconds = await asyncio.get_running_loop().run_in_executor(self.parse_pool, timed_call, func, *args)
+        self.metrics.add_time("parse", seconds)
+        self.metrics.add_time("parse_wait", time.perf_counter() - start - seconds)
+        return result
+
+    async def stream(self, venues, search, *search_args, buffer=1024):
+        # search is an async generator per venue; its items are yielded as soon as they are produced.
+        # At most `buffer` items wait for the consumer; searches pause while it is full.
+        semaphore = asyncio.Semaphore(self.concurrency)
+        items = asyncio.Queue(maxsize=buffer)
+        end = object()
+
+        async def bounded(venue):
+            async with semaphore:
+                if self._over_budget(venue):
+                    return
+                self.logger.info(f"Starting search for: {venue}")
+                try:
+                    async for item in search(venue, *search_args, engine=self):
+                        await items.put(item)
+                except Exception as e:
+                    self.logger.error(f"Search failed for {venue}: {e}")
+                    return
+                self.logger.info(f"Completed search for: {venue}")
+
+        async def produce():
+            await asyncio.gather(*(bounded(venue) for venue in venues))
+            await items.put(end)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (item := await items.get()) is not end:
+                yield item
+        finally:
+            # The consumer may stop early; do not leave searches running behind it
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+
+    def close(self):
+        self.client.close()
+        if self.parse_pool is not None:
+            self.parse_pool.shutdown(cancel_futures=True)
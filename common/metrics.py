@@ -0,0 +1,136 @@
+import cProfile
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+# Stages timed across the crawlers and fetchers. Network and rate limit waits are summed over the threads
+# running requests, so they can exceed the run time; so is parse with --parse-workers, summed over the workers,
+# whose queueing is reported apart as parse_wait. Score and write run one at a time per process.
+STAGES = ("network", "ratelimit", "parse", "score", "write")
+
+FORMATS = ("json", "prometheus")
+
+
+# Time per stage, counters, and per-venue counters of one run; shared by every thread of the process.
+# With profile=True, the sections wrapped in profile() (page parsing on the event loop) are recorded by cProfile.
+class Metrics:
+    def __init__(self, profile=False):
+        self.started = time.monotonic()
+        self.seconds = Counter()
+        self.counts = Counter()
+        self.venues = defaultdict(Counter)
+        self.profiler = cProfile.Profile() if profile else None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def time(self, stage, venue=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start, venue)
+
+    def add_time(self, stage, seconds, venue=None):
+        with self._lock:
+            self.seconds[stage] += seconds
+            if venue is not None:
+                self.venues[venue][f"{stage}_seconds"] += seconds
+
+    def count(self, name, value=1, venue=None):
+        with self._lock:
+            self.counts[name] += value
+            if venue is not None:
+                self.venues[venue][name] += value
+
+    @contextmanager
+    def profile(self):
+        # cProfile only sees the thread it is enabled on; use it from one thread only
+        if self.profiler is None:
+            yield
+            return
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+
+    def snapshot(self, client=None):
+        with self._lock:
+            counts = dict(self.counts)
+            if client is not None:
+                counts.update(retries=client.retries, throttled=client.throttled)
+                if client.cache is not None:
+                    counts.update(cache_hits=client.cache.hits, cache_misses=client.cache.misses)
+            return {
+                "elapsed_seconds": time.monotonic() - self.started,
+                "stage_seconds": {stage: self.seconds.get(stage, 0.0) for stage in (*STAGES, *self.seconds)},
+                "counters": counts,
+                "venues": {venue: dict(counters) for venue, counters in sorted(self.venues.items())},
+            }
+
+    def summary(self, client=None):
+        data = self.snapshot(client)
+        stages = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in data["stage_seconds"].items())
+        return (f"Time: {stages} in {data['elapsed_seconds']:.1f}s; "
+                f"{data['counters'].get('bytes', 0) / 1024 / 1024:.1f} MB in {data['counters'].get('requests', 0)} requests")
+
+    def write(self, path, fmt=None, client=None):
+        # The format follows the extension unless given: .prom/.txt for Prometheus text, JSON otherwise
+        fmt = fmt or ("prometheus" if path.endswith((".prom", ".txt")) else "json")
+        data = self.snapshot(client)
+        with open(path, "w", encoding="utf-8") as f:
+            if fmt == "json":
+                json.dump(data, f, indent=2)
+            else:
+                f.write(prometheus_text(data))
+
+    def dump_profile(self, path):
+        # Read with: python -m pstats FILE
+        if self.profiler is not None:
+            self.profiler.dump_stats(path)
+
+
+def prometheus_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Prometheus text exposition format, e.g. for the node exporter's textfile collector
+def prometheus_text(data):
+    lines = ["# TYPE dblp_run_seconds gauge", f"dblp_run_seconds {data['elapsed_seconds']:.6f}",
+             "# TYPE dblp_stage_seconds_total counter"]
+    lines += [f'dblp_stage_seconds_total{{stage="{stage}"}} {seconds:.6f}'
+              for stage, seconds in data["stage_seconds"].items()]
+    for name, value in sorted(data["counters"].items()):
+        lines += [f"# TYPE dblp_{name}_total counter", f"dblp_{name}_total {value}"]
+    names = sorted({name for counters in data["venues"].values() for name in counters})
+    for name in names:
+        lines.append(f"# TYPE dblp_venue_{name}_total counter")
+        lines += [f'dblp_venue_{name}_total{{venue="{prometheus_label(venue)}"}} {counters[name]}'
+                  for venue, counters in data["venues"].items() if name in counters]
+    return "\n".join(lines) + "\n"
+
+
+def add_metrics_arguments(parser, profile=True):
+    parser.add_argument("--metrics", default=None, metavar="FILE",
+                        help="Write run metrics: time per stage, bytes, requests, retries, cache hits and records "
+                             "per venue. *.prom or *.txt for Prometheus text format, JSON otherwise.")
+    parser.add_argument("--metrics-format", choices=FORMATS, default=None,
+                        help="Format of --metrics, instead of the one of its extension.")
+    if profile:
+        parser.add_argument("--profile", default=None, metavar="FILE",
+                            help="cProfile the parsing of result pages and write the stats to FILE "
+                                 "(python -m pstats FILE). Parsing done by --parse-workers is not included.")
+
+
+def metrics_from_args(args):
+    return Metrics(profile=bool(getattr(args, "profile", None)))
+
+
+# Write what was asked for on the command line; called once at the end of a run
+def write_metrics(metrics, args, client=None):
+    if args.metrics:
+        metrics.write(args.metrics, args.metrics_format, client)
+    if getattr(args, "profile", None):
+        metrics.dump_profile(args.profile)
@@ -0,0 +1,119 @@
+import re
+import sqlite3
+import unicodedata
+from collections import Counter
+
+from common.store import PaperRow, PaperStore, name_token
+
+# Phrases, parentheses and bare words of a title query
+QUERY_TOKEN = re.compile(r'"[^"]*"\*?|[()]|[^\s()"]+')
+OPERATORS = {"AND", "OR", "NOT"}
+# Fetching a matched paper to sort it by year costs about this many steps of a scan of the year index
+FETCH_COST = 16
+
+
+# Title query as an FTS5 expression: AND, OR, NOT and parentheses are kept, a word ending in * is a prefix,
+# "quoted words" a phrase, and words side by side must all be there. Every word is quoted, so hyphens,
+# dots and other punctuation in a word are searched for instead of being read as FTS5 syntax.
+def fts_query(text):
+    terms = []
+    for token in QUERY_TOKEN.findall(text):
+        if token in OPERATORS or token in "()" or token.startswith('"'):
+            terms.append(token)
+        else:
+            word = token.rstrip("*")
+            terms.append('"' + word.replace('"', '""') + '"' + ("*" if word != token else ""))
+    return " ".join(terms)
+
+
+# Author and venue names are matched whole, in any case and with or without accents; NAME* matches every
+# name starting with NAME, e.g. "Wei Wang*" also finds dblp's "Wei Wang 0001"
+def _name_query(name):
+    word = name.rstrip("*")
+    return '"' + name_token(word).replace('"', '""') + '"' + ("*" if word != name else "")
+
+
+def _fold(name):
+    return "".join(c for c in unicodedata.normalize("NFKD", name_token(name)) if not unicodedata.combining(c)).lower()
+
+
+# Queries over the search index of a paper store (PaperStore.create_index), which is built or brought up
+# to date when the store is opened. The title query, authors and venues become one FTS5 expression, which
+# FTS5 evaluates on its own postings; only the papers matching all of them are read.
+class PaperIndex(PaperStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.added = self.create_index()
+
+    def _expression(self, title=None, authors=(), venues=()):
+        parts = [f"title : ({fts_query(title)})"] if title else []
+        parts.extend(f"authors : {_name_query(name)}" for name in authors)
+        if venues:
+            parts.append(f"venue : ({' OR '.join(map(_name_query, venues))})")
+        return " AND ".join(parts)
+
+    def _where(self, expression, syear=None, eyear=None, accepted=False):
+        where, params = [], []
+        if expression:
+            where.append("papers.rowid IN (SELECT rowid FROM index_papers WHERE index_papers MATCH ?)")
+            params.append(expression)
+        if syear is not None:
+            where.append("year >= ?")
+            params.append(syear)
+        if eyear is not None:
+            where.append("year <= ?")
+            params.append(eyear)
+        if accepted:
+            where.append("accepted = 1")
+        return " AND ".join(where) or "1", params
+
+    def _execute(self, query, params):
+        try:
+            return self._db.execute(query, params)
+        except sqlite3.OperationalError as e:
+            # A malformed title query, e.g. an operator without a term on both sides
+            raise ValueError(f"Invalid query: {e}") from None
+
+    def _count(self, expression):
+        return self._execute("SELECT COUNT(*) FROM index_papers WHERE index_papers MATCH ?",
+                             (expression,)).fetchone()[0]
+
+    def search(self, title=None, authors=(), venues=(), syear=None, eyear=None, accepted=False, limit=20):
+        # Matching papers as PaperRows, newest first; authors must all be on a paper, any of the venues will do.
+        # Every match is fetched to be sorted by year, unless matches are so common that walking the year
+        # index from the newest paper finds the first `limit` of them sooner: when M of N papers match,
+        # that walk takes about limit * N / M steps.
+        expression = self._expression(title, authors, venues)
+        where, params = self._where(expression, syear, eyear, accepted)
+        source = "papers"
+        if expression and limit is not None:
+            papers = self._db.execute("SELECT MAX(rowid) FROM papers").fetchone()[0] or 0
+            matches = self._count(expression)
+            if matches * matches * FETCH_COST > limit * papers:
+                source = "papers INDEXED BY papers_year"
+        query = (f"SELECT key, venue, published_in, title, year, pages, authors, bibtex_url, score, accepted "
+                 f"FROM {source} WHERE {where} ORDER BY year DESC, papers.rowid DESC")
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [PaperRow(*row[:6], row[6].split(", ") if row[6] else [], *row[7:9], bool(row[9]))
+                for row in self._execute(query, params)]
+
+    def count_matches(self, title=None, authors=(), venues=(), syear=None, eyear=None, accepted=False):
+        expression = self._expression(title, authors, venues)
+        if expression and syear is None and eyear is None and not accepted:
+            return self._count(expression)
+        where, params = self._where(expression, syear, eyear, accepted)
+        return self._execute(f"SELECT COUNT(*) FROM papers WHERE {where}", params).fetchone()[0]
+
+    def coauthors(self, name, title=None, venues=(), syear=None, eyear=None, accepted=False, limit=20):
+        # (coauthor, papers together) of an author, most frequent first, over the papers matching the filters;
+        # with NAME* the names it matches are not each other's coauthors
+        where, params = self._where(self._expression(title, [name], venues), syear, eyear, accepted)
+        word = _fold(name.rstrip("*"))
+        counts = Counter()
+        for authors, in self._execute(f"SELECT authors FROM papers WHERE {where}", params):
+            counts.update({author for author in authors.split(", ")
+                           if not (_fold(author).startswith(word) if name.endswith("*") else _fold(author) == word)})
+        rows = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        return rows[:limit] if limit is not None else rows
@@ -0,0 +1,136 @@
+import math
+import re
+from array import array
+from collections import Counter
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from common.scoring import RANKINGS, SEPARATOR, TOKEN, KeywordScorer, stem
+
+# Tokens of a page of titles joined by SEPARATOR, with a separator token after each title
+PAGE_TOKEN = re.compile(f"{TOKEN.pattern}|{SEPARATOR}")
+
+
+# Column of each title token: the stemmed token's query term, or -1 (-2 for the title separator);
+# filled on first sight of a token
+class _Columns(dict):
+    def __init__(self, terms):
+        super().__init__({SEPARATOR: -2})
+        self.terms = {term: i for i, term in enumerate(terms)}
+
+    def __missing__(self, token):
+        column = self[token] = self.terms.get(stem(token), -1)
+        return column
+
+
+# BM25 or TF-IDF ranking of titles against the keyword profile, instead of summed substring weights.
+# Titles are tokenized and stemmed like the "stem" mode, so "users" counts as "user" and "superuser" does not.
+# Ranking takes two passes over a fixed set of titles (rescore.py): add() collects the corpus statistics, i.e.
+# the document frequency of each query term, the number of titles and their total length; score_many() then
+# scores titles against them. Only the statistics are kept, so memory does not grow with the corpus.
+# Keyword phrases are split into terms sharing the phrase's weight. Scores are not on the substring scale:
+# a term weighs weight * idf, so thresholds are best picked with `rescore.py --top`.
+class RankingScorer:
+    def __init__(self, keywords, mode="bm25", k1=1.2, b=0.75):
+        if mode not in RANKINGS:
+            raise ValueError(f"Unknown ranking mode: {mode}")
+        self.mode = mode
+        self.k1 = k1
+        self.b = b
+        profile = Counter()
+        for keyword, weight in keywords.items():
+            tokens = [stem(token) for token in TOKEN.findall(keyword.lower())]
+            for token in tokens:
+                profile[token] += weight / len(tokens)
+        self.terms = list(profile)
+        self.weights = [profile[term] for term in self.terms]
+        self._columns = _Columns(self.terms)
+        self.df = array("q", [0] * len(self.terms))
+        self.titles = 0
+        self.total_length = 0
+
+    def _page(self, titles):
+        # Sparse title x query-term counts of a page: (rows, cols, counts, lengths)
+        if HAS_NUMPY:
+            return self._page_numpy(titles)
+        lookup = self._columns.__getitem__
+        rows, cols, counts, lengths = [], [], [], []
+        for row, title in enumerate(titles):
+            tokens = TOKEN.findall(title.lower())
+            lengths.append(len(tokens))
+            for column, count in Counter(column for column in map(lookup, tokens) if column >= 0).items():
+                rows.append(row)
+                cols.append(column)
+                counts.append(count)
+        return rows, cols, counts, lengths
+
+    def _page_numpy(self, titles):
+        # One regex pass and one dict lookup per token for the whole page; the counts per (title, term)
+        # come from numpy. Title ends are the separator tokens.
+        tokens = PAGE_TOKEN.findall(SEPARATOR.join(titles).lower() + SEPARATOR) if titles else []
+        columns = np.fromiter(map(self._columns.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+        ends = np.flatnonzero(columns == -2)
+        lengths = np.diff(ends, prepend=-1) - 1
+        hits = np.flatnonzero(columns >= 0)
+        width = max(len(self.terms), 1)
+        pairs, counts = np.unique(np.searchsorted(ends, hits) * width + columns[hits], return_counts=True)
+        rows, cols = np.divmod(pairs, width)
+        return rows, cols, counts, lengths
+
+    def add(self, titles):
+        # First pass: count the titles into the corpus statistics
+        rows, cols, counts, lengths = self._page(titles)
+        self.titles += len(titles)
+        if HAS_NUMPY:
+            self.total_length += int(lengths.sum())
+            np.frombuffer(self.df, dtype=np.int64)[:] += np.bincount(cols, minlength=len(self.terms))
+            return
+        self.total_length += sum(lengths)
+        for column in cols:
+            self.df[column] += 1
+
+    def _idf(self):
+        n = self.titles
+        if self.mode == "bm25":
+            return [math.log(1 + (n - df + 0.5) / (df + 0.5)) for df in self.df]
+        return [math.log((1 + n) / (1 + df)) + 1 for df in self.df]
+
+    def score_many(self, titles):
+        # Second pass: scores of titles against the statistics of every title added, in one vectorized pass
+        # when numpy is installed. BM25 saturates the term count and normalizes by title length; TF-IDF
+        # weighs 1 + log(count).
+        rows, cols, counts, lengths = self._page(titles)
+        k1, b = self.k1, self.b
+        avgdl = self.total_length / self.titles if self.titles else 0
+        weights = [w * idf for w, idf in zip(self.weights, self._idf())]
+        if not HAS_NUMPY:
+            scores = [0.0] * len(titles)
+            for row, column, count in zip(rows, cols, counts):
+                if self.mode == "bm25":
+                    norm = k1 * (1 - b + b * lengths[row] / avgdl) if avgdl else k1
+                    scores[row] += weights[column] * count * (k1 + 1) / (count + norm)
+                else:
+                    scores[row] += weights[column] * (1 + math.log(count))
+            return scores
+        counts = counts.astype(np.float64)
+        weights = np.asarray(weights)[cols]
+        if self.mode == "bm25":
+            norm = k1 * (1 - b + b * lengths[rows] / avgdl) if avgdl else k1
+            values = weights * counts * (k1 + 1) / (counts + norm)
+        else:
+            values = weights * (1 + np.log(counts))
+        return np.bincount(rows, weights=values, minlength=len(titles)).tolist()
+
+    def score(self, title):
+        return self.score_many([title])[0]
+
+
+# Scorer of any mode of common.scoring.MODES; a ranking scorer needs its corpus added first (see RankingScorer)
+def new_scorer(keywords, mode="substring"):
+    if mode in RANKINGS:
+        return RankingScorer(keywords, mode)
+    return KeywordScorer(keywords, mode=mode)
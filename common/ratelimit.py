@@ -0,0 +1,244 @@
+import email.utils
+import random
+import sqlite3
+import threading
+import time
+
+import requests
+
+# Statuses worth retrying; anything else >= 400 fails at once
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+# Raised instead of sending a request while a host's circuit is open
+class CircuitOpenError(requests.exceptions.RequestException):
+    pass
+
+
+# Token bucket; callers past the available tokens reserve a future slot and sleep until it
+class TokenBucket:
+    def __init__(self, rate, burst=1.0, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = burst
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(self.clock())
+            self.rate = rate
+
+    def acquire(self, sleep=None):
+        with self._lock:
+            now = self.clock()
+            self._refill(now)
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            (sleep or self.sleep)(wait)
+
+
+# AIMD rate control: creep up while responses stay fast, cut back on errors, pause on Retry-After
+class AdaptiveRateLimiter:
+    def __init__(self, rate=1.0, min_rate=0.1, max_rate=5.0, target_latency=2.0,
+                 increase=0.05, decrease=0.5, clock=time.monotonic, sleep=time.sleep):
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.clock = clock
+        self.sleep = sleep
+        self.bucket = TokenBucket(rate, clock=clock, sleep=sleep)
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def _set_rate(self, rate):
+        self.bucket.set_rate(min(self.max_rate, max(self.min_rate, rate)))
+
+    # sleep overrides the limiter's for one call, e.g. a wait that a cancelled client cuts short
+    def acquire(self, sleep=None):
+        wait = self.paused_until - self.clock()
+        if wait > 0:
+            (sleep or self.sleep)(wait)
+        self.bucket.acquire(sleep)
+
+    def on_success(self, latency):
+        with self._lock:
+            if latency <= self.target_latency:
+                self._set_rate(self.rate + self.increase)
+            else:
+                self._set_rate(self.rate * 0.9)
+
+    def on_error(self):
+        with self._lock:
+            self._set_rate(self.rate * self.decrease)
+
+    def on_throttle(self, retry_after=None):
+        with self._lock:
+            self._set_rate(self.rate * self.decrease)
+            if retry_after:
+                self.paused_until = max(self.paused_until, self.clock() + retry_after)
+
+
+# Opens after `threshold` consecutive failures; after `cooldown` seconds exactly one probe request is let
+# through (half-open) while the others keep failing fast. 429 answers are not failures: the host is up and
+# the rate limiter already backs off on them.
+class CircuitBreaker:
+    def __init__(self, threshold=5, cooldown=60.0, clock=time.monotonic):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started = None
+        self._lock = threading.Lock()
+
+    def before_request(self, host=""):
+        with self._lock:
+            now = self.clock()
+            if self.probe_started is not None:
+                # A probe that never reported back (e.g. an unexpected exception) is replaced after a cooldown
+                if now - self.probe_started < self.cooldown:
+                    raise CircuitOpenError(f"Circuit half-open for {host}, waiting for the probe request")
+                self.probe_started = now
+                return
+            if self.opened_at is None:
+                return
+            if now - self.opened_at < self.cooldown:
+                raise CircuitOpenError(f"Circuit open for {host}, too many consecutive failures")
+            # Half-open: this request is the probe, the circuit re-opens at once if it fails
+            self.opened_at = None
+            self.probe_started = now
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probe_started = None
+
+    def record_throttle(self):
+        # The host answered; a probe ends without changing the failure count
+        with self._lock:
+            self.probe_started = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probe_started is not None or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+                self.probe_started = None
+
+
+# Jittered exponential backoff ("full jitter")
+class RetryPolicy:
+    def __init__(self, max_retries=4, base=1.0, cap=60.0):
+        self.max_retries = max_retries
+        self.base = base
+        self.cap = cap
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+
+def parse_retry_after(value):
+    # Retry-After is either delta-seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Request schedule shared by every process opening the same SQLite file, on one machine or on several
+# sharing a filesystem: each request takes the next free slot of its host, so together they send at most
+# `rate` requests per second. Slots are wall-clock times, so the machines' clocks must be in sync (NTP).
+class SharedRate:
+    def __init__(self, path, rate, clock=time.time, sleep=time.sleep):
+        self.path = path
+        self.interval = 1.0 / rate
+        self.clock = clock
+        self.sleep = sleep
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS rate_slots (host TEXT PRIMARY KEY, next_slot REAL NOT NULL)")
+        self._lock = threading.Lock()
+
+    def _take(self, host, delay):
+        # next_slot moves to max(next_slot, now + delay); returns the slot taken
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT next_slot FROM rate_slots WHERE host = ?", (host,)).fetchone()
+                now = self.clock()
+                slot = max(now, row[0] if row else now)
+                self._db.execute("INSERT OR REPLACE INTO rate_slots VALUES (?, ?)",
+                                 (host, max(slot + self.interval, now + delay)))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return slot
+
+    def acquire(self, host, sleep=None):
+        wait = self._take(host, 0.0) - self.clock()
+        if wait > 0:
+            (sleep or self.sleep)(wait)
+
+    def pause(self, host, seconds):
+        # A Retry-After seen by one process holds back all of them
+        self._take(host, seconds)
+
+    def close(self):
+        self._db.close()
+
+
+# One limiter and one breaker per host, shared by every thread and coroutine of the process.
+# With `shared`, requests also wait for their slot in the schedule shared with other processes.
+class HostLimits:
+    def __init__(self, rate=1.0, min_rate=0.1, max_rate=5.0, threshold=5, cooldown=60.0, shared=None):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.shared = shared
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def for_host(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (
+                    AdaptiveRateLimiter(self.rate, min_rate=min(self.min_rate, self.rate), max_rate=self.max_rate),
+                    CircuitBreaker(self.threshold, self.cooldown),
+                )
+            return self._hosts[host]
+
+
+def add_ratelimit_arguments(parser, rate=1.0, max_rate=5.0):
+    parser.add_argument("--rate", type=float, default=rate, metavar="FLOAT",
+                        help=f"Initial requests per second to each host, adapted while crawling. Default: {rate}")
+    parser.add_argument("--max-rate", type=float, default=max_rate, metavar="FLOAT",
+                        help=f"Upper bound for the adaptive request rate. Default: {max_rate}")
+    parser.add_argument("--retries", type=int, default=4, metavar="INT",
+                        help="Retries per request, with jittered exponential backoff. Default: 4")
+
+
+def limits_from_args(args):
+    return HostLimits(rate=args.rate, max_rate=args.max_rate), RetryPolicy(max_retries=args.retries)
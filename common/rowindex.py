@@ -0,0 +1,76 @@
+import csv
+import os
+import sqlite3
+
+
+# Rows of a CSV file opened in binary mode, with the byte offset each row starts at.
+# csv.reader pulls exactly the lines of one row, so the offset before each next() is the row's start.
+def iter_csv_rows(f):
+    position = [f.tell()]
+
+    def lines():
+        for line in iter(f.readline, b""):
+            position[0] += len(line)
+            yield line.decode("utf-8")
+
+    reader = csv.reader(lines())
+    while True:
+        offset = position[0]
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        yield offset, row
+
+
+# On-disk index of CSV rows: key -> (file, byte offset). Only keys and offsets are kept, never the rows,
+# so memory does not grow with the files; a row is read back from its file when it is looked up.
+class RowIndex:
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        if os.path.exists(path):
+            os.remove(path)
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE rows (key TEXT PRIMARY KEY, source INTEGER NOT NULL, offset INTEGER NOT NULL)")
+        self._files = []
+        self._headers = []
+
+    def add_file(self, filename, keep=None):
+        # Index the rows of filename (later files win on equal keys); returns the number of rows indexed
+        f = open(filename, "rb")
+        rows = iter_csv_rows(f)
+        header = next(rows, (0, []))[1]
+        source = len(self._files)
+        self._files.append(f)
+        self._headers.append(header)
+
+        count = 0
+
+        def entries():
+            nonlocal count
+            for offset, values in rows:
+                row = dict(zip(header, values))
+                key = self.key(row)
+                if key and (keep is None or keep(row)):
+                    count += 1
+                    yield key, source, offset
+
+        with self._db:
+            self._db.executemany("INSERT OR REPLACE INTO rows VALUES (?, ?, ?)", entries())
+        return count
+
+    def get(self, key):
+        found = self._db.execute("SELECT source, offset FROM rows WHERE key = ?", (key,)).fetchone()
+        if found is None:
+            return None
+        f = self._files[found[0]]
+        f.seek(found[1])
+        _, values = next(iter_csv_rows(f))
+        return dict(zip(self._headers[found[0]], values))
+
+    def close(self):
+        for f in self._files:
+            f.close()
+        self._db.close()
+        os.remove(self.path)
@@ -0,0 +1,139 @@
+import datetime
+import logging
+import math
+import time
+from collections import defaultdict, namedtuple
+
+from common.crawl import iter_unit
+from common.scoring import load_keywords
+from common.search import HITS_PER_PAGE
+
+logger = logging.getLogger("dblp crawl")
+
+
+# Consecutive years of one venue crawled by one query, and the accepted papers and requests it is expected to cost
+class ScheduledItem(namedtuple("ScheduledItem", ["venue", "syear", "eyear", "value", "requests"])):
+    def __str__(self):
+        years = str(self.syear) if self.syear == self.eyear else f"{self.syear}-{self.eyear}"
+        return f"{self.venue} {years}"
+
+
+# Stops new items from starting once the requests sent (cache hits are free) or the time are spent
+class Budget:
+    def __init__(self, metrics, requests=None, seconds=None, clock=time.monotonic):
+        self.metrics = metrics
+        self.requests = requests
+        self.seconds = seconds
+        self.clock = clock
+        self.started = clock()
+
+    def exhausted(self):
+        if self.requests is not None and self.metrics.counts["requests"] >= self.requests:
+            return True
+        return self.seconds is not None and self.clock() - self.started >= self.seconds
+
+    def __str__(self):
+        return f"{self.metrics.counts['requests']} requests in {self.clock() - self.started:.0f}s"
+
+
+def _mean(values, default):
+    values = list(values)
+    return sum(values) / len(values) if values else default
+
+
+# Order the (venue, year) work of venues x [syear, eyear], most accepted papers per request first.
+# stored is PaperStore.yields(): records and accepted papers per venue year found by earlier runs; years not
+# crawled yet are expected to yield the mean of their venue, or of every venue. crawled is
+# CheckpointStore.crawled(): recently crawled years are worth less, by staleness age / (age + half_life), and
+# years crawled after the end of the following year are settled and left out, dblp hardly adds to them.
+# Priorities multiply a venue's value. One query returns HITS_PER_PAGE records a request, so a venue's years
+# are packed newest first into items of about one page: a small venue is one item, a large one an item per year.
+def plan(venues, syear, eyear, stored, crawled=None, priorities=None, half_life=30.0, now=None,
+         page_size=HITS_PER_PAGE):
+    now = now or time.time()
+    crawled = crawled or {}
+    priorities = priorities or {}
+    eyear = eyear or datetime.date.today().year
+    per_venue = defaultdict(list)
+    for (venue, _), outcome in stored.items():
+        per_venue[venue].append(outcome)
+    overall = (_mean((records for records, _ in stored.values()), 0.0),
+               _mean((accepted for _, accepted in stored.values()), 1.0))
+
+    ranked = []
+    for index, venue in enumerate(dict.fromkeys(venues)):
+        outcomes = per_venue.get(venue)
+        expected = (_mean((r for r, _ in outcomes), 0.0), _mean((a for _, a in outcomes), 0.0)) if outcomes else overall
+        chunk = []
+
+        def close_chunk():
+            if chunk:
+                records = sum(records for _, records, _ in chunk)
+                value = sum(value for _, _, value in chunk)
+                requests = max(1, math.ceil(records / page_size))
+                ranked.append((-value / requests, -chunk[0][0], index,
+                               ScheduledItem(venue, chunk[-1][0], chunk[0][0], value, requests)))
+                chunk.clear()
+
+        for year in range(eyear, syear - 1, -1):
+            crawled_at = crawled.get((venue, year))
+            if crawled_at is not None and crawled_at >= datetime.datetime(year + 2, 1, 1).timestamp():
+                close_chunk()
+                continue
+            records, accepted = stored.get((venue, year), expected)
+            age = (now - crawled_at) / 86400 if crawled_at is not None else None
+            staleness = 1.0 if age is None else age / (age + half_life)
+            if chunk and sum(r for _, r, _ in chunk) + records > page_size:
+                close_chunk()
+            chunk.append((year, records, priorities.get(venue, 1.0) * accepted * staleness))
+        close_chunk()
+    ranked.sort()
+    return [item for *_, item in ranked]
+
+
+# Crawl one item, its venue over its years. Items are small, so an interrupted item is crawled again
+# rather than resumed; the years of a finished one are checkpointed for the staleness of the next plan.
+async def iter_item(item, keywords, scorer, settings, store=None, checkpoint=None, seen=None, log=logger,
+                    engine=None):
+    settings = settings._replace(syear=item.syear, eyear=item.eyear, incremental=False)
+    async for paper in iter_unit(item.venue, keywords, scorer, settings, store, None, seen, log, engine):
+        yield paper
+    if checkpoint is not None:
+        checkpoint.items_done(item.venue, range(item.syear, item.eyear + 1))
+
+
+# New accepted papers of the planned items, started in plan order until the engine's budget is spent
+async def aiter_items(items, keywords, scorer, settings, engine, store=None, checkpoint=None, log=logger):
+    async for paper in engine.stream(items, iter_item, keywords, scorer, settings, store, checkpoint, set(), log):
+        yield paper
+
+
+def add_schedule_arguments(parser):
+    parser.add_argument("--schedule", action="store_true",
+                        help="Crawl (venue, years) items, most expected accepted papers per request first: the yield "
+                             "of earlier runs, times priority and staleness. Implied by the budgets.")
+    parser.add_argument("--request-budget", type=int, default=None, metavar="INT",
+                        help="Start no new item after this many requests (cache hits are free).")
+    parser.add_argument("--time-budget", type=float, default=None, metavar="SECONDS",
+                        help="Start no new item after this many seconds.")
+    parser.add_argument("--priorities", default=None, metavar="FILE",
+                        help="Venue priorities multiplying the expected yield, 'venue weight' lines or a JSON object. "
+                             "Default: 1 for every venue")
+    parser.add_argument("--half-life", type=float, default=30.0, metavar="DAYS",
+                        help="Age at which a crawled year is worth half of a new one. Default: 30")
+
+
+def scheduled(args):
+    return args.schedule or args.request_budget is not None or args.time_budget is not None
+
+
+def plan_from_args(args, venues, checkpoint, store):
+    # Priorities have the keyword file format
+    priorities = load_keywords(args.priorities) if args.priorities else None
+    return plan(venues, args.syear, args.eyear, store.yields(), checkpoint.crawled(), priorities, args.half_life)
+
+
+def budget_from_args(args, metrics):
+    if args.request_budget is None and args.time_budget is None:
+        return None
+    return Budget(metrics, args.request_budget, args.time_budget)
@@ -0,0 +1,134 @@
+import json
+import re
+from functools import lru_cache
+
+# Keyword automaton modes, and the ranking modes of common/ranking.py
+MATCH_MODES = ("substring", "word", "stem")
+RANKINGS = ("bm25", "tfidf")
+MODES = MATCH_MODES + RANKINGS
+
+TOKEN = re.compile(r"[a-z0-9]+")
+# Separator between titles when a page is scanned in one pass; never part of a keyword
+SEPARATOR = "\x00"
+
+# Light English suffix stripping, longest suffix first
+_SUFFIXES = ("ations", "ation", "ings", "ing", "ies", "ers", "er", "ed", "es", "ly", "s")
+
+
+@lru_cache(maxsize=1 << 16)
+def stem(word):
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+# Load {keyword: weight} from a JSON object, or from text lines "keyword weight" ('#' starts a comment)
+def load_keywords(path):
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".json"):
+            return {str(k).lower(): float(v) for k, v in json.load(f).items()}
+        keywords = {}
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            term, _, weight = line.rpartition(" ")
+            keywords[term.strip().lower()] = float(weight)
+        return keywords
+
+
+# Aho-Corasick automaton compiled into a full transition table, over characters or word tokens
+class _Automaton:
+    def __init__(self, patterns):
+        goto = [{}]
+        output = [set()]
+        for index, pattern in enumerate(patterns):
+            node = 0
+            for symbol in pattern:
+                if symbol not in goto[node]:
+                    goto.append({})
+                    output.append(set())
+                    goto[node][symbol] = len(goto) - 1
+                node = goto[node][symbol]
+            output[node].add(index)
+
+        # Breadth-first fail links, then fold them into the transitions
+        fail = [0] * len(goto)
+        delta = [dict(edges) for edges in goto]
+        queue = list(goto[0].values())
+        for node in queue:
+            for symbol, child in goto[node].items():
+                queue.append(child)
+                f = fail[node]
+                while f and symbol not in goto[f]:
+                    f = fail[f]
+                fail[child] = goto[f].get(symbol, 0) if goto[f].get(symbol, 0) != child else 0
+                output[child] |= output[fail[child]]
+        for node in queue:
+            # Missing transitions inherit the fail state's, so scanning never backtracks
+            for symbol, target in delta[fail[node]].items():
+                delta[node].setdefault(symbol, target)
+
+        self.delta = delta
+        self.step = [edges.get for edges in delta]  # bound lookups, the hot path of the scan
+        self.output = [tuple(sorted(out)) for out in output]
+
+
+# Keyword scorer compiled once; a title scores the sum of the weights of the keywords it contains.
+# mode "substring" matches like Paper.calScore did, "word" only matches whole words,
+# "stem" matches whole words after suffix stripping (so "attacks" matches "attack").
+class KeywordScorer:
+    def __init__(self, keywords, mode="substring"):
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Unknown scoring mode: {mode}")
+        self.mode = mode
+        self.keywords = {k.lower(): w for k, w in keywords.items()}
+        self.terms = list(self.keywords)
+        self.weights = [self.keywords[term] for term in self.terms]
+        if mode == "substring":
+            patterns = self.terms
+        else:
+            patterns = [tuple(self._tokens(term)) for term in self.terms]
+        self.automaton = _Automaton(patterns)
+
+    def _tokens(self, text):
+        tokens = TOKEN.findall(text.lower())
+        if self.mode == "stem":
+            tokens = [stem(token) for token in tokens]
+        return tokens
+
+    def _scan(self, symbols, boundary):
+        # Walk the automaton once; emits one score each time the boundary symbol is reached
+        step = self.automaton.step
+        output = self.automaton.output
+        weights = self.weights
+        node = 0
+        matched = set()
+        scores = []
+        for symbol in symbols:
+            if symbol == boundary:
+                scores.append(sum(weights[i] for i in matched))
+                matched.clear()
+                node = 0
+                continue
+            node = step[node](symbol, 0)
+            if output[node]:
+                matched.update(output[node])
+        scores.append(sum(weights[i] for i in matched))
+        return scores
+
+    def score(self, title):
+        return self.score_many([title])[0]
+
+    def score_many(self, titles):
+        if not titles:
+            return []
+        if self.mode == "substring":
+            return self._scan(SEPARATOR.join(title.lower() for title in titles), SEPARATOR)
+        symbols = []
+        for title in titles:
+            symbols.extend(self._tokens(title))
+            symbols.append(None)
+        symbols.pop()
+        return self._scan(symbols, None)
@@ -0,0 +1,342 @@
+import datetime
+import json
+import os
+import re
+from collections import namedtuple
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+# Base url of every dblp request; DBLP_URL points the crawlers at a mirror or at benchmarks/dblp_stub.py
+DBLP_URL = os.environ.get("DBLP_URL", "https://dblp.org").rstrip("/")
+DBLP_SEARCH_URL = f"{DBLP_URL}/search/publ/inc"
+DBLP_API_URL = f"{DBLP_URL}/search/publ/api"
+
+BACKENDS = ("json", "html")
+HITS_PER_PAGE = 1000
+
+# Parsers of the HTML backend: BeautifulSoup on the stdlib parser or on lxml (optional dependency),
+# or "selective", a streaming parser that builds no tree and only keeps the fields of a Record
+HTML_PARSERS = ("html.parser", "lxml", "selective")
+
+# dblp entry class in the HTML fragment -> publication type in the JSON API
+API_TYPES = {
+    "inproceedings": "Conference and Workshop Papers",
+    "article": "Journal Articles",
+}
+
+# One parsed search hit, the same for both backends
+Record = namedtuple("Record", ["key", "year", "title", "venue", "pages", "authors", "bibtex_url"])
+
+BIBTEX_HREF = re.compile(".*view=bibtex.*")
+RECORD_URL = re.compile(r"/rec/(.+?)(?:\.html|\.bib|\.xml|\?|$)")
+LI_CLASS = re.compile("year|entry")
+
+# Elements without an end tag, never pushed on the selective parser's stack
+VOID_ELEMENTS = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+                           "source", "track", "wbr"))
+
+
+# dblp record key from a record or BibTeX url, e.g. https://dblp.org/rec/conf/ccs/X20.html?view=bibtex -> conf/ccs/X20
+def key_from_url(url):
+    match = RECORD_URL.search(url) if url else None
+    return match.group(1) if match else None
+
+
+# Extract content from HTML tag
+def getContentStrings(tag):
+    return "".join([getContentStrings(c) if hasattr(c, 'contents') else c.string for c in tag.contents])
+
+
+# A NavigableString keeps its whole soup alive, and pickles it along with it; records only hold plain str
+def plain(string):
+    return None if string is None else str(string)
+
+
+# Author name as dblp knows it, with the number of a homonym (e.g. "Wei Wang 0001"), the same as the API's:
+# the link text drops the number, the title of the name span keeps it
+def author_name(author):
+    name = author.find(itemprop="name", title=True)
+    if name is not None:
+        return plain(name["title"])
+    return plain(author.a.string if author.a else author.string)
+
+
+# Year bounds pushed into the query as OR'ed year facets, so older records are never sent
+def year_query(syear, eyear=None):
+    eyear = eyear or datetime.date.today().year + 1
+    return "|".join(f"year:{year}:" for year in range(syear, eyear + 1))
+
+
+def html_payload(query, page, hits=HITS_PER_PAGE):
+    return {"q": query, "s": "ydvspc", "h": str(hits), "b": f"{page}"}
+
+
+def api_payload(query, page, hits=HITS_PER_PAGE):
+    return {"q": query, "format": "json", "h": str(hits), "f": str(page * hits)}
+
+
+# Parse an HTML result fragment; records follow their "li.year" header, newest year first.
+# Returns the records of record_class and the number of hits of any type on the page.
+def parse_html_page(text, record_class, parser="html.parser"):
+    if parser == "selective":
+        return SelectiveParser(record_class).parse(text)
+    soup = BeautifulSoup(text, parser)
+    records = []
+    hits = 0
+    year = None
+    for record in soup.find_all("li", class_=LI_CLASS):
+        if "year" in record["class"]:
+            try:
+                year = int(record.string)
+            except (ValueError, TypeError):
+                pass
+            continue
+        hits += 1
+        if record_class in record["class"]:
+            title_tag = record.cite.find(class_="title")
+            venue_tag = record.cite.find(itemprop="isPartOf")
+            pagination_tag = record.cite.find(itemprop="pagination")
+            bibtex_tag = record.find("a", href=BIBTEX_HREF)
+            bibtex_url = bibtex_tag["href"] if bibtex_tag else None
+            authors = [author_name(author) for author in record.cite.find_all(itemprop="author")]
+            records.append(Record(
+                key=record.get("id") or key_from_url(bibtex_url),
+                year=year,
+                title=getContentStrings(title_tag),
+                venue=plain(venue_tag.string) if venue_tag else None,
+                pages=plain(pagination_tag.string) if pagination_tag else None,
+                authors=authors,
+                bibtex_url=bibtex_url,
+            ))
+    return records, hits
+
+
+# Element kept by the selective parser: its name, its title attribute and children, strings or _Node
+class _Node:
+    __slots__ = ("name", "title", "children")
+
+    def __init__(self, name, title=None):
+        self.name = name
+        self.title = title
+        self.children = []
+
+    # BeautifulSoup's Tag.string: the string of the only child, None for zero or several children
+    @property
+    def string(self):
+        if len(self.children) != 1:
+            return None
+        child = self.children[0]
+        return child if isinstance(child, str) else child.string
+
+    def find(self, name):
+        for child in self.children:
+            if isinstance(child, _Node):
+                if child.name == name:
+                    return child
+                found = child.find(name)
+                if found is not None:
+                    return found
+        return None
+
+    def find_title(self):
+        for child in self.children:
+            if isinstance(child, _Node):
+                found = child.title or child.find_title()
+                if found:
+                    return found
+        return None
+
+    def text(self):
+        return "".join(child if isinstance(child, str) else child.text() for child in self.children)
+
+
+# Streaming parser of the HTML fragment, with the results of parse_html_page on BeautifulSoup.
+# Only a stack of open tag names is kept for the page; elements are built only for the year headers and,
+# inside the <cite> of a wanted entry, for its title, authors, venue and pagination.
+class SelectiveParser(HTMLParser):
+    def __init__(self, record_class):
+        super().__init__(convert_charrefs=True)
+        self.record_class = record_class
+
+    def parse(self, text):
+        self.records = []
+        self.hits = 0
+        self.year = None
+        self.stack = []  # [tag name, role, node] of every open element
+        self.entry = None  # fields of the wanted entry being parsed
+        self.in_cite = False
+        self.node = None  # innermost kept element
+        self.feed(text)
+        self.close()
+        return self.records, self.hits
+
+    def handle_starttag(self, tag, attrs):
+        role = None
+        node = None
+        attrs = dict(attrs)
+        if tag == "li" and attrs.get("class") and any(LI_CLASS.search(c) for c in attrs["class"].split()):
+            classes = attrs["class"].split()
+            if "year" in classes:
+                role = "year"
+                node = _Node(tag)
+            else:
+                self.hits += 1
+                if self.record_class in classes:
+                    role = "entry"
+                    self.entry = {"key": attrs.get("id"), "title": None, "venue": None, "pages": None,
+                                  "authors": [], "bibtex_url": None, "cite": False}
+        elif self.entry is not None:
+            if tag == "a" and self.entry["bibtex_url"] is None and BIBTEX_HREF.search(attrs.get("href") or ""):
+                self.entry["bibtex_url"] = attrs["href"]
+            if tag == "cite" and not self.entry["cite"]:
+                self.entry["cite"] = True
+                self.in_cite = True
+                role = "cite"
+            elif self.in_cite:
+                itemprop = attrs.get("itemprop")
+                node = _Node(tag) if self.node is not None else None
+                if "title" in (attrs.get("class") or "").split() and self.entry["title"] is None:
+                    node = self.entry["title"] = node or _Node(tag)
+                if itemprop == "author":
+                    node = node or _Node(tag)
+                    self.entry["authors"].append(node)
+                elif itemprop == "isPartOf" and self.entry["venue"] is None:
+                    node = self.entry["venue"] = node or _Node(tag)
+                elif itemprop == "pagination" and self.entry["pages"] is None:
+                    node = self.entry["pages"] = node or _Node(tag)
+                elif itemprop == "name" and node is not None:
+                    node.title = attrs.get("title")
+        if node is not None:
+            if self.node is not None:
+                self.node.children.append(node)
+            self.node = node
+        if tag not in VOID_ELEMENTS:
+            self.stack.append((tag, role, node))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        # Like BeautifulSoup, close the innermost open element of that name, and any left open inside it
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                break
+        else:
+            return
+        while len(self.stack) > i:
+            self.close_element(*self.stack.pop())
+
+    def close_element(self, tag, role, node):
+        if node is not None:
+            self.node = self.parent_node()
+        if role == "year":
+            try:
+                self.year = int(node.string)
+            except (ValueError, TypeError):
+                pass
+        elif role == "cite":
+            self.in_cite = False
+        elif role == "entry":
+            self.add_entry()
+
+    def parent_node(self):
+        for _, _, node in reversed(self.stack):
+            if node is not None:
+                return node
+        return None
+
+    def add_entry(self):
+        entry = self.entry
+        self.entry = None
+        self.in_cite = False
+        bibtex_url = entry["bibtex_url"]
+        venue = entry["venue"]
+        pages = entry["pages"]
+        self.records.append(Record(
+            key=entry["key"] or key_from_url(bibtex_url),
+            year=self.year,
+            title=entry["title"].text(),
+            venue=venue.string if venue is not None else None,
+            pages=pages.string if pages is not None else None,
+            authors=[author.find_title() or (author.find("a").string if author.find("a") else author.string)
+                     for author in entry["authors"]],
+            bibtex_url=bibtex_url,
+        ))
+
+    def handle_data(self, data):
+        if self.node is not None:
+            self.node.children.append(data)
+
+    def close(self):
+        super().close()
+        while self.stack:
+            self.close_element(*self.stack.pop())
+
+
+# Parse a JSON API result; returns the records, the hits sent on this page and the total for the query
+def parse_api_page(data, record_class):
+    hits = data["result"]["hits"]
+    total = int(hits.get("@total", 0))
+    sent = int(hits.get("@sent", len(hits.get("hit", []))))
+    wanted = API_TYPES[record_class]
+    records = []
+    for hit in hits.get("hit", []):
+        info = hit["info"]
+        if info.get("type") != wanted:
+            continue
+        authors = info.get("authors", {}).get("author", [])
+        if isinstance(authors, dict):
+            authors = [authors]
+        venue = info.get("venue")
+        if isinstance(venue, list):
+            venue = venue[0]
+        url = info.get("url")
+        records.append(Record(
+            key=info.get("key"),
+            year=int(info["year"]) if info.get("year") else None,
+            title=info.get("title", ""),
+            venue=venue,
+            pages=info.get("pages"),
+            authors=[a["text"] if isinstance(a, dict) else a for a in authors],
+            bibtex_url=f"{url}.html?view=bibtex" if url else None,
+        ))
+    return records, sent, total
+
+
+# parse_api_page on the response body, so decoding can run in a parse worker too
+def parse_api_text(text, record_class):
+    return parse_api_page(json.loads(text), record_class)
+
+
+# Fetch and parse one result page.
+# Returns (records, done, sorted_by_year); done is True when there is no further page:
+# the page came back short, or the hit count shows nothing is left.
+# Parsing goes through engine.parse, which runs it in the engine's parse workers if it has any.
+async def search_page(engine, query, page, record_class, backend="json", hits=HITS_PER_PAGE,
+                      html_parser="html.parser"):
+    if backend == "json":
+        r = await engine.fetch(DBLP_API_URL, api_payload(query, page, hits))
+        records, sent, total = await engine.parse(parse_api_text, r.text, record_class)
+        return records, sent < hits or (page + 1) * hits >= total, False
+
+    r = await engine.fetch(DBLP_SEARCH_URL, html_payload(query, page, hits))
+    records, sent = await engine.parse(parse_html_page, r.text, record_class, html_parser)
+    return records, sent < hits, True
+
+
+def add_parser_arguments(parser):
+    parser.add_argument("--html-parser", choices=HTML_PARSERS, default="html.parser",
+                        help="Parser of the html backend: BeautifulSoup on html.parser or lxml (needs lxml installed), "
+                             "or selective, a streaming parser that only keeps the record fields. Default: html.parser")
+    parser.add_argument("--parse-workers", type=int, default=0, metavar="INT",
+                        help="Processes parsing result pages while the next ones download. "
+                             "Default: 0, parse on the crawler's event loop")
@@ -0,0 +1,222 @@
+import csv
+import os
+import re
+import sqlite3
+import time
+from collections import namedtuple
+
+from common.batch import columnar_format, rows_to_arrow, write_batches
+
+# One crawled paper; venue is the venue_set name it was crawled for, published_in the name dblp gives
+PaperRow = namedtuple("PaperRow", ["key", "venue", "published_in", "title", "year", "pages", "authors",
+                                   "bibtex_url", "score", "accepted"])
+
+CSV_FIELDS = ["title", "venue", "year", "pages", "authors", "bibtex_url"]
+
+
+# An author or venue name as one search index token: "Jean-Luc Picard 0001" is jean_luc_picard_0001 once
+# FTS5 has folded case and accents
+def name_token(name):
+    return re.sub(r"\W+", "_", name.strip())
+
+
+def store_path(args):
+    return args.store or f"{os.path.splitext(args.filename)[0]}.sqlite"
+
+
+# Papers keyed by dblp record key, so a paper matched by several venues or crawled twice is stored once.
+# Every parsed record is kept, accepted or not, so the corpus can be re-scored offline;
+# the CSV (or Parquet/Arrow) files are exports of the accepted rows.
+class PaperStore:
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS papers (
+            key TEXT PRIMARY KEY, venue TEXT, published_in TEXT, title TEXT NOT NULL, year INTEGER,
+            pages TEXT, authors TEXT, bibtex_url TEXT, score REAL, bibtex_data TEXT, added_at REAL NOT NULL,
+            accepted INTEGER NOT NULL DEFAULT 1)""")
+        # Stores written before every record was kept only hold accepted papers
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(papers)")}
+        if "accepted" not in columns:
+            self._db.execute("ALTER TABLE papers ADD COLUMN accepted INTEGER NOT NULL DEFAULT 1")
+        self._db.execute("CREATE INDEX IF NOT EXISTS papers_venue ON papers (venue)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS papers_year ON papers (year)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS papers_score ON papers (score)")
+        self._db.commit()
+        self._indexed = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'index_state'").fetchone() is not None
+
+    def add_page(self, rows):
+        # One transaction per result page; returns the rows that were not stored yet.
+        # Papers already stored keep their row, score and accepted flag included, so a re-crawl does not undo
+        # a selection made with rescore.py; new keywords are applied to stored papers by rescore.py.
+        added = []
+        now = time.time()
+        with self._db:
+            for row in rows:
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO papers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, ?, ?)",
+                    (*row[:6], ", ".join(row.authors), row.bibtex_url, row.score, now, int(row.accepted)))
+                if cursor.rowcount:
+                    added.append(row)
+            if self._indexed:
+                self.update_index()
+        return added
+
+    def count(self):
+        return self._db.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def yields(self):
+        # {(venue, year): (records, accepted papers)}, what earlier crawls found per venue year
+        return {(venue, year): (records, accepted) for venue, year, records, accepted in self._db.execute(
+            "SELECT venue, year, COUNT(*), SUM(accepted) FROM papers WHERE year IS NOT NULL GROUP BY venue, year")}
+
+    def missing_bibtex(self, before=None):
+        # Accepted papers with a BibTeX url whose BibTeX has not been fetched yet, in crawl order;
+        # with `before`, only those stored before that time
+        query = ("SELECT key, bibtex_url, year FROM papers WHERE accepted = 1 AND bibtex_data IS NULL "
+                 "AND bibtex_url IS NOT NULL AND bibtex_url != ''")
+        params = []
+        if before is not None:
+            query += " AND added_at < ?"
+            params.append(before)
+        return self._db.execute(query + " ORDER BY rowid", params).fetchall()
+
+    def iter_titles(self, chunk_size=100000, syear=None, eyear=None):
+        # (rowid, title) lists of up to chunk_size rows, for scoring the corpus in bulk
+        query, params = "SELECT rowid, title FROM papers", []
+        if syear is not None or eyear is not None:
+            query += " WHERE year BETWEEN ? AND ?"
+            params = [syear if syear is not None else -1, eyear if eyear is not None else 1 << 31]
+        cursor = self._db.execute(query + " ORDER BY rowid", params)
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def rescore(self, scored, threshold, syear=None, eyear=None):
+        # scored yields (rowid, score) pairs for the papers of the year window, the others are no longer accepted.
+        # Everything is applied in one transaction, returns the number of accepted papers.
+        with self._db:
+            self._db.executemany("UPDATE papers SET score = ?, accepted = ? WHERE rowid = ?",
+                                 ((score, int(score >= threshold), rowid) for rowid, score in scored))
+            if syear is not None or eyear is not None:
+                self._db.execute("UPDATE papers SET accepted = 0 WHERE year IS NULL OR year NOT BETWEEN ? AND ?",
+                                 (syear if syear is not None else -1, eyear if eyear is not None else 1 << 31))
+        return self._db.execute("SELECT COUNT(*) FROM papers WHERE accepted = 1").fetchone()[0]
+
+    def set_bibtex(self, key, bibtex_data):
+        with self._db:
+            self._db.execute("UPDATE papers SET bibtex_data = ? WHERE key = ?", (bibtex_data, key))
+
+    def _accepted(self, columns, min_score=None, syear=None, eyear=None):
+        # Cursor over the accepted papers in crawl order
+        where, params = ["accepted = 1"], []
+        if min_score is not None:
+            where.append("score >= ?")
+            params.append(min_score)
+        if syear is not None:
+            where.append("year >= ?")
+            params.append(syear)
+        if eyear is not None:
+            where.append("year <= ?")
+            params.append(eyear)
+        return self._db.execute(f"SELECT {columns} FROM papers WHERE {' AND '.join(where)} ORDER BY rowid", params)
+
+    def export_csv(self, filename, venue_column="venue", bibtex=False, min_score=None, syear=None, eyear=None):
+        # Write the accepted papers in crawl order; the venue column holds dblp's venue name
+        fields = [venue_column if field == "venue" else field for field in CSV_FIELDS]
+        count = 0
+        with open(filename, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(fields + ["bibtex_data"] if bibtex else fields)
+            for row in self._accepted("title, published_in, year, pages, authors, bibtex_url, bibtex_data",
+                                      min_score, syear, eyear):
+                if bibtex:
+                    bibtex_data = row[6] or ("Not Available" if row[5] else "No URL")
+                    writer.writerow(row[:6] + (bibtex_data,))
+                else:
+                    writer.writerow(row[:6])
+                count += 1
+        return count
+
+    def export_columnar(self, filename, venue_column="venue", bibtex=False, min_score=None, syear=None, eyear=None,
+                        chunk_size=100000):
+        # Parquet or Arrow IPC export of the accepted papers, chunk_size rows per record batch.
+        # Authors are a list column; BibTeX not fetched yet is null.
+        cursor = self._accepted("key, venue, published_in, title, year, pages, authors, bibtex_url, score, bibtex_data",
+                                min_score, syear, eyear)
+        chunks = iter(lambda: cursor.fetchmany(chunk_size), [])
+        return write_batches(filename, (rows_to_arrow(chunk, venue_column, bibtex) for chunk in chunks),
+                             venue_column, bibtex)
+
+    def export(self, filename, venue_column="venue", bibtex=False, min_score=None, syear=None, eyear=None):
+        # By extension: .parquet, .arrow or .feather need pyarrow, anything else is CSV
+        if columnar_format(filename):
+            return self.export_columnar(filename, venue_column, bibtex, min_score, syear, eyear)
+        return self.export_csv(filename, venue_column, bibtex, min_score, syear, eyear)
+
+    def merge(self, path):
+        # Add the papers of another store, e.g. a crawl worker's shard, and return how many were new.
+        # Papers already here keep their row; BibTeX the shard has and this store lacks is taken over.
+        columns = ", ".join(row[1] for row in self._db.execute("PRAGMA table_info(papers)"))
+        self._db.execute("ATTACH DATABASE ? AS shard", (path,))
+        try:
+            with self._db:
+                added = self._db.execute(f"INSERT OR IGNORE INTO papers ({columns}) "
+                                         f"SELECT {columns} FROM shard.papers ORDER BY rowid").rowcount
+                self._db.execute("""UPDATE papers SET bibtex_data = (
+                    SELECT bibtex_data FROM shard.papers WHERE shard.papers.key = papers.key)
+                    WHERE bibtex_data IS NULL AND key IN (
+                    SELECT key FROM shard.papers WHERE bibtex_data IS NOT NULL)""")
+                if self._indexed:
+                    self.update_index()
+        finally:
+            self._db.execute("DETACH DATABASE shard")
+        return added
+
+    # Search index of the titles, authors and venues, kept in the store (common/paperindex.py queries it):
+    # one FTS5 table with a row per paper, whose author and venue names are single tokens, so a query on
+    # all three is one FTS5 expression, intersected inside FTS5. It is contentless, the text stays in the
+    # papers table. Once the index exists, every page added and every merged shard is indexed in its own
+    # transaction.
+    def create_index(self):
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS index_state ("
+                             "id INTEGER PRIMARY KEY, indexed INTEGER NOT NULL)")
+            self._db.execute("INSERT OR IGNORE INTO index_state VALUES (0, 0)")
+            self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS index_papers USING fts5(title, authors, venue, "
+                             "content='', prefix='2 3', tokenize=\"unicode61 remove_diacritics 2 tokenchars '_'\")")
+            self._indexed = True
+            return self.update_index()
+
+    def update_index(self, chunk_size=10000):
+        # Index the papers added since the last update, in the caller's transaction; returns how many.
+        # Papers keep their rowid, so the last indexed rowid is all the state there is.
+        indexed = self._db.execute("SELECT indexed FROM index_state WHERE id = 0").fetchone()[0]
+        count = 0
+        cursor = self._db.execute("SELECT rowid, title, authors, published_in FROM papers WHERE rowid > ? "
+                                  "ORDER BY rowid", (indexed,))
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            self._db.executemany("INSERT INTO index_papers (rowid, title, authors, venue) VALUES (?, ?, ?, ?)",
+                                 [(rowid, title, " ".join(map(name_token, authors.split(", "))) if authors else "",
+                                   name_token(published_in or "")) for rowid, title, authors, published_in in chunk])
+            indexed = chunk[-1][0]
+            count += len(chunk)
+        self._db.execute("UPDATE index_state SET indexed = ? WHERE id = 0", (indexed,))
+        return count
+
+    def close(self):
+        self._db.close()
+
+
+def add_store_arguments(parser):
+    parser.add_argument("--store", default=None, metavar="FILE",
+                        help="SQLite paper store the export is written from. Default: <filename>.sqlite")
+    parser.add_argument("--index", action="store_true",
+                        help="Keep a search index of titles and authors in the store, updated with every page, "
+                             "for index.py queries. Stores that have one keep updating it without this option.")
@@ -0,0 +1,71 @@
+import re
+
+# Venues crawled by default, keyed by category; names are dblp stream ids (conf/<name>, journals/<name>)
+venue_set = {
+    "conference": ["ppopp", "fast", "dac", "hpca", "micro", "sc", "asplos", "isca", "usenix atc", "eurosys", "socc", "spaa", "podc", "fpga", "cgo", "date", "hot chips", "cluster", "iccd", "iccad", "icdcs", "codes+isss", "hipeac", "sigmetrics", "pact", "icpp", "ics", "vee", "ipdps", "performance", "hpdc", "itc", "lisa", "msst", "rtas", "euro-par", "sigcomm", "mobicom", "infocom", "nsdi", "sensys", "conext", "secon", "ipsn", "mobisys", "icnp", "mobihoc", "nossdav", "iwqos", "imc", "ccs", "eurocrypt", "s&p", "crypto", "usenix security", "ndss", "acsac", "asiacrypt", "esorics", "fse", "csfw", "srds", "ches", "dsn", "raid", "pkc", "tcc", "pldi", "popl", "fse", "sosp", "oopsla", "ase", "icse", "issta", "osdi", "fm", "ecoop", "etaps", "icpc", "re", "caise", "icfp", "lctes", "models", "cp", "icsoc", "saner", "icsme", "vmcai", "icws", "middleware", "sas", "esem", "issre", "hotos", "sigmod", "sigkdd", "icde", "sigir", "vldb", "cikm", "wsdm", "pods", "dasfaa", "ecml-pkdd", "iswc", "icdm", "icdt", "edbt", "cidr", "sdm", "recsys", "stoc", "soda", "cav", "focs", "lics", "socg", "esa", "ccc", "icalp", "cade/ijcar", "concur", "hscc", "sat", "cocoon", "acm mm", "siggraph", "vr", "ieee vis", "icmr", "si3d", "sca", "dcc", "eg", "eurovis", "sgp", "egsr", "icassp", "icme", "ismar", "pg", "spm", "aaai", "neurips", "acl", "cvpr", "iccv", "icml", "ijcai", "colt", "emnlp", "ecai", "eccv", "icra", "icaps", "iccbr", "coling", "kr", "uai", "aamas", "ppsn", "naacl", "cscw", "chi", "ubicomp", "uist", "group", "iui", "iss", "ecscw", "percom", "mobilehci", "icwsm", "www", "rtss", "wine", "cogsci", "bibm", "emsoft", "ismb", "recomb", "miccai"],
+    "journal": ["tocs", "tos", "tcad", "tc", "tpds", "taco", "taas", "todaes", "tecs", "trets", "tvlsi", "jpdc", "jsa", "parco", "jsac", "tmc", "ton", "toit", "tomccap", "tosn", "cn", "tcom", "twc", "tdsc", "tifs",  "tissec", "jcs", "toplas", "tosem", "tse", "tsc", "ase", "ese", "iets", "ist", "jfp", "jss", "re", "scp", "sosym", "stvr", "spe", "tods", "tois", "tkde", "vldbj", "tkdd", "tweb", "aei", "dke", "dmkd", "ejis", "ipm", "is", "jasist", "jws", "kais", "tit", "iandc", "sicomp", "talg", "tocl", "toms", "algorithmica", "cc", "fac", "fmsd", "informs", "jcss", "jgo", "jsc", "mscs", "tcs", "tog", "tip", "tvcg", "tomccap", "cagd", "cgf", "cad", "gm", "tcsvt", "tmm", "jasa", "siims", "speech com", "ai", "tpami", "ijcv", "jmlr", "tap", "aamas", "cviu", "dke", "tac", "taslp", "tec", "tfs", "tnnls", "ijar", "jair", "jslhr", "pr", "tacl", "tochi", "ijhcs", "cscw", "hci", "iwc", "ijhci", "umuai", "tsmc", "jacm", "proc. ieee", "scis", "cognition", "tasae", "tgars", "tits", "tmi", "tr", "tcbb", "jcst", "jamia", "www"],
+}
+
+
+# dblp stream ids of the venue_set names that are not their own stream id, by stream prefix. Names with spaces
+# would split the OR'ed streamid filter of a batched query. The name stays the paper's venue and is still
+# checked against isPartOf, next to the stream id.
+STREAM_IDS = {
+    "conf": {"usenix atc": "usenix", "hot chips": "hotchips", "usenix security": "uss", "acm mm": "mm",
+             "ieee vis": "visualization", "s&p": "sp", "sigkdd": "kdd", "neurips": "nips", "ecml-pkdd": "pkdd",
+             "cade/ijcar": "cade", "euro-par": "europar", "codes+isss": "codes", "socg": "compgeom"},
+    "journals": {"speech com": "speech", "proc. ieee": "pieee", "vldbj": "vldb"},
+}
+# A stream id that is one token of the query and one level below the prefix
+STREAM_NAME = re.compile(r"[^\s|:/]+")
+
+
+def stream_id(venue, prefix):
+    return f"{prefix}/{STREAM_IDS.get(prefix, {}).get(venue, venue)}"
+
+
+# Venues packed batch_size to a query. A venue whose stream id cannot be written as one query token would
+# empty the result of its whole batch, so it is crawled on its own.
+def batch_units(venues, batch_size, prefix):
+    venues = list(venues)
+    if batch_size <= 1:
+        return venues
+    alone = [venue for venue in venues if not STREAM_NAME.fullmatch(stream_id(venue, prefix)[len(prefix) + 1:])]
+    batched = [venue for venue in venues if venue not in alone]
+    return [tuple(batched[i:i + batch_size]) for i in range(0, len(batched), batch_size)] + alone
+
+
+def venue_pattern(venue, strict=False, aliases=()):
+    # Loose: the venue name, or an alias, appears anywhere; strict: it starts the name and the name has no "workshop"
+    names = "|".join(map(re.escape, [venue, *aliases]))
+    if strict:
+        return re.compile("(?=^((?!workshop).)*$)(?=[^@]?(?:{})[^@]?)".format(names), re.IGNORECASE)
+    return re.compile(".*(?:{}).*".format(names), re.IGNORECASE)
+
+
+# Routes records to the venues of a (possibly batched) query by stream id, then checks the venue name.
+# All patterns are compiled once per matcher; check_name=False skips the name check (journal crawler).
+class VenueMatcher:
+    def __init__(self, venues, prefix, strict=False, check_name=True):
+        self.venues = list(dict.fromkeys(venues))
+        self.streams = {stream_id(venue, prefix): venue for venue in self.venues}
+        self.patterns = None
+        if check_name:
+            # A renamed venue's isPartOf may use the stream id instead, e.g. NIPS for neurips
+            renamed = STREAM_IDS.get(prefix, {})
+            self.patterns = {venue: venue_pattern(venue, strict, [renamed[venue]] if venue in renamed else [])
+                             for venue in self.venues}
+
+    def query(self):
+        # One OR'ed stream filter for every venue of the batch
+        return "|".join(f"streamid:{stream}:" for stream in self.streams)
+
+    def route(self, key, venue_name):
+        venue = self.streams.get(key.rsplit("/", 1)[0]) if key else None
+        if venue is None and len(self.venues) == 1:
+            venue = self.venues[0]  # a single-venue query only returns that venue's stream
+        if venue is None:
+            return None
+        if self.patterns is not None and not (venue_name and self.patterns[venue].match(venue_name)):
+            return None
+        return venue
@@ -0,0 +1,134 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+# One piece of a sweep: the venues of one query unit (one venue, or a batch) and a year window
+WorkItem = namedtuple("WorkItem", ["id", "category", "venues", "syear", "eyear", "attempts"])
+
+STATES = ("queued", "leased", "done", "failed")
+
+
+# Unique per process across the machines sharing a queue
+def worker_name():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+# [syear, eyear] cut into windows of `span` years, newest first; span 0 keeps the whole window
+def year_windows(syear, eyear, span=0):
+    if not span:
+        return [(syear, eyear)]
+    return [(max(start - span + 1, syear), start) for start in range(eyear, syear - 1, -span)]
+
+
+# Work items in an SQLite file, claimed by any number of worker processes, on one machine or on several
+# sharing a filesystem. A claimed item is leased to its worker until lease_until; the worker renews the
+# lease while it runs, and an item whose lease ran out (the worker died) goes back to the queue.
+# After max_attempts claims an item is marked failed instead.
+class WorkQueue:
+    def __init__(self, path, lease=120.0, max_attempts=3, clock=time.time):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.clock = clock
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS items (
+            id INTEGER PRIMARY KEY, category TEXT NOT NULL, venues TEXT NOT NULL, syear INTEGER NOT NULL,
+            eyear INTEGER NOT NULL, state TEXT NOT NULL DEFAULT 'queued', owner TEXT, lease_until REAL,
+            attempts INTEGER NOT NULL DEFAULT 0, papers INTEGER, error TEXT, updated_at REAL NOT NULL,
+            UNIQUE (category, venues, syear, eyear))""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS items_state ON items (state, id)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same item
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+
+    def add(self, category, units, syear, eyear, span=0):
+        # Queue every unit for every year window; items already queued are kept. Returns the number added.
+        now = self.clock()
+        added = 0
+        with self._transaction():
+            for unit in units:
+                venues = json.dumps([unit] if isinstance(unit, str) else list(unit))
+                for start, end in year_windows(syear, eyear, span):
+                    added += self._db.execute(
+                        "INSERT OR IGNORE INTO items (category, venues, syear, eyear, updated_at) VALUES (?, ?, ?, ?, ?)",
+                        (category, venues, start, end, now)).rowcount
+        return added
+
+    def set_meta(self, name, value):
+        with self._transaction():
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, json.dumps(value)))
+
+    def meta(self, name, default=None):
+        row = self._db.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _expire(self, now):
+        self._db.execute("""UPDATE items SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+            owner = NULL, lease_until = NULL, error = 'lease expired', updated_at = ?
+            WHERE state = 'leased' AND lease_until < ?""", (self.max_attempts, now, now))
+
+    def claim(self, owner):
+        # The oldest queued item, leased to owner; None if nothing is queued
+        now = self.clock()
+        with self._transaction():
+            self._expire(now)
+            row = self._db.execute("SELECT id, category, venues, syear, eyear, attempts FROM items "
+                                   "WHERE state = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            self._db.execute("""UPDATE items SET state = 'leased', owner = ?, lease_until = ?,
+                attempts = attempts + 1, updated_at = ? WHERE id = ?""", (owner, now + self.lease, now, row[0]))
+        return WorkItem(row[0], row[1], json.loads(row[2]), row[3], row[4], row[5] + 1)
+
+    def renew(self, item, owner):
+        # False once the lease is lost: it expired and the item went to another worker
+        now = self.clock()
+        return self._db.execute("UPDATE items SET lease_until = ?, updated_at = ? "
+                                "WHERE id = ? AND owner = ? AND state = 'leased'",
+                                (now + self.lease, now, item.id, owner)).rowcount == 1
+
+    def complete(self, item, owner, papers):
+        return self._db.execute("""UPDATE items SET state = 'done', lease_until = NULL, papers = ?, error = NULL,
+            updated_at = ? WHERE id = ? AND owner = ? AND state = 'leased'""",
+                                (papers, self.clock(), item.id, owner)).rowcount == 1
+
+    def fail(self, item, owner, error):
+        # Back to the queue for another try, or failed for good after max_attempts
+        return self._db.execute("""UPDATE items SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END,
+            owner = NULL, lease_until = NULL, error = ?, updated_at = ?
+            WHERE id = ? AND owner = ? AND state = 'leased'""",
+                                (self.max_attempts, error, self.clock(), item.id, owner)).rowcount == 1
+
+    def active(self):
+        # Items queued or leased; workers stop once there are none
+        return self._db.execute("SELECT COUNT(*) FROM items WHERE state IN ('queued', 'leased')").fetchone()[0]
+
+    def counts(self):
+        counts = dict.fromkeys(STATES, 0)
+        counts.update(self._db.execute("SELECT state, COUNT(*) FROM items GROUP BY state"))
+        return counts
+
+    def failures(self):
+        return self._db.execute("SELECT category, venues, syear, eyear, attempts, error FROM items "
+                                "WHERE state = 'failed' ORDER BY id").fetchall()
+
+    def retry_failed(self):
+        with self._transaction():
+            return self._db.execute("UPDATE items SET state = 'queued', attempts = 0, updated_at = ? "
+                                    "WHERE state = 'failed'", (self.clock(),)).rowcount
+
+    def close(self):
+        self._db.close()
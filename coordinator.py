@@ -0,0 +1,248 @@
+import argparse
+import asyncio
+import datetime
+import glob
+import logging
+import multiprocessing
+import os
+
+from common.batch import HAS_PYARROW, columnar_format
+from common.cache import add_cache_arguments, cache_from_args
+from common.client import DblpClient
+from common.crawl import CATEGORIES, CrawlSettings, iter_unit
+from common.engine import CrawlEngine
+from common.ratelimit import SharedRate, add_ratelimit_arguments, limits_from_args
+from common.scoring import MATCH_MODES, KeywordScorer, load_keywords
+from common.search import BACKENDS, HTML_PARSERS
+from common.store import PaperStore
+from common.venues import batch_units, venue_set
+from common.workqueue import WorkQueue, worker_name
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger("dblp coordinator log")
+
+# Keyword file, default merged store and CSV export and venue column of each category
+categories = {
+    "conference": (os.path.join(ROOT, "conference", "keywords.txt"), "conference.sqlite", "conference.csv", "venue"),
+    "journal": (os.path.join(ROOT, "journal", "keywords.txt"), "journal.sqlite", "journal.csv", "journal"),
+}
+
+
+# Argument parsing
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Spread a crawl over worker processes and machines with a shared "
+                                                 "work queue.")
+    parser.add_argument("--queue", default="sweep.queue", metavar="FILE",
+                        help="SQLite work queue, on a filesystem every worker can reach. Default: sweep.queue")
+    parser.add_argument("--shards", default=None, metavar="DIR",
+                        help="Directory of the workers' paper stores. Default: <queue>.shards")
+    parser.add_argument("--loglevel", choices=["debug", "info", "silent"], default="info",
+                        help="Logging level. Default: info")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    init = commands.add_parser("init", help="Queue the venues of a sweep and fix its crawl settings")
+    init.add_argument("--category", choices=[*categories, "all"], default="all", help="Default: all")
+    init.add_argument("--syear", type=int, default=2015, metavar="INT",
+                      help="Year to start the crawler. Default: 2015")
+    init.add_argument("--eyear", type=int, default=None, metavar="INT", help="Last year to crawl. Default: next year")
+    init.add_argument("--years-per-item", type=int, default=0, metavar="INT",
+                      help="Cut each venue's years into items of this many years. Default: 0, one item per venue")
+    init.add_argument("--batch-size", type=int, default=1, metavar="INT",
+                      help="Number of venues packed into one OR'ed query. Default: 1")
+    init.add_argument("--sthreshod", type=float, default=0.4, metavar="FLOAT",
+                      help="Threshold for paper score to add to paper list. Default: 0.4")
+    init.add_argument("--scoremode", choices=MATCH_MODES, default="substring",
+                      help="Keyword matching, as in the crawlers. Default: substring")
+    init.add_argument("--strictmatch", type=bool, default=False, help="Enable conference strict match. Default: False")
+    init.add_argument("--backend", choices=BACKENDS, default="json", help="Default: json")
+    init.add_argument("--html-parser", choices=HTML_PARSERS, default="html.parser", help="Default: html.parser")
+    init.add_argument("--all-records", action="store_true", help="Fetch every record, not only keyword matches.")
+
+    work = commands.add_parser("work", help="Claim and crawl items until the queue is empty")
+    work.add_argument("--processes", type=int, default=os.cpu_count(), metavar="INT",
+                      help="Worker processes on this machine. Default: number of cores")
+    work.add_argument("--concurrency", type=int, default=2, metavar="INT",
+                      help="Items crawled at the same time by each process. Default: 2")
+    work.add_argument("--global-rate", type=float, default=2.0, metavar="FLOAT",
+                      help="Requests per second of all workers together, on every machine. Default: 2.0")
+    work.add_argument("--lease", type=float, default=120.0, metavar="SECONDS",
+                      help="Lease of a claimed item, renewed while it runs; expired items are re-queued. Default: 120")
+    work.add_argument("--parse-workers", type=int, default=0, metavar="INT",
+                      help="Parse processes per worker. Default: 0")
+    add_ratelimit_arguments(work)
+    add_cache_arguments(work)
+
+    commands.add_parser("status", help="Show the items per state and the failed ones")
+    commands.add_parser("retry", help="Queue the failed items again")
+
+    merge = commands.add_parser("merge", help="Merge the workers' paper stores and export them")
+    merge.add_argument("--conffilename", default="conference.csv", metavar="*.csv",
+                       help="CSV, or by extension .parquet / .arrow. Default: conference.csv")
+    merge.add_argument("--journalfilename", default="journal.csv", metavar="*.csv", help="Default: journal.csv")
+    merge.add_argument("--confstore", default=categories["conference"][1], metavar="FILE",
+                       help="Store the conference shards are merged into. Default: conference.sqlite")
+    merge.add_argument("--journalstore", default=categories["journal"][1], metavar="FILE",
+                       help="Store the journal shards are merged into. Default: journal.sqlite")
+    args = parser.parse_args(argv)
+    if (args.command == "merge" and not HAS_PYARROW
+            and any(map(columnar_format, (args.conffilename, args.journalfilename)))):
+        parser.error("Parquet and Arrow exports need the pyarrow package: pip install pyarrow")
+    return args
+
+
+# Logging setup; worker processes call it again, which only adds the handler where it is missing (spawn)
+def setup_logging(args):
+    logmap = {
+        "debug": logging.DEBUG,
+        "info": logging.INFO,
+        "silent": logging.CRITICAL
+    }
+    logger.setLevel(logmap[args.loglevel])
+    if not logger.handlers:
+        sh = logging.StreamHandler()
+        sh.setLevel(logmap[args.loglevel])
+        sh.setFormatter(logging.Formatter("%(processName)s: %(message)s"))
+        logger.addHandler(sh)
+    return logger
+
+
+def shards_dir(args):
+    return args.shards or f"{args.queue}.shards"
+
+
+def queue_sweep(queue, args):
+    eyear = args.eyear or datetime.date.today().year + 1
+    names = list(categories) if args.category == "all" else [args.category]
+    keywords = {}
+    for category in names:
+        units = batch_units(venue_set[category], args.batch_size, CATEGORIES[category].prefix)
+        added = queue.add(category, units, args.syear, eyear, args.years_per_item)
+        keywords[category] = load_keywords(categories[category][0])
+        logger.info(f"Queued {added} {category} items")
+    # Workers on other machines read the keywords from the queue, not from their own checkout
+    queue.set_meta("settings", {"keywords": {**queue.meta("settings", {}).get("keywords", {}), **keywords},
+                                "threshold": args.sthreshod, "scoremode": args.scoremode,
+                                "strict": args.strictmatch, "backend": args.backend,
+                                "html_parser": args.html_parser, "all_records": args.all_records})
+
+
+# Keeps the item leased while it is crawled
+async def keep_leased(queue, item, owner):
+    while True:
+        await asyncio.sleep(queue.lease / 3)
+        if not queue.renew(item, owner):
+            logger.warning(f"Lost the lease of item {item.id}, another worker may crawl it too")
+            return
+
+
+async def crawl_items(queue, owner, engine, settings, shards, concurrency):
+    scorers = {category: KeywordScorer(keywords, mode=settings["scoremode"])
+               for category, keywords in settings["keywords"].items()}
+    stores = {}
+    os.makedirs(shards, exist_ok=True)
+
+    async def lane():
+        while True:
+            item = queue.claim(owner)
+            if item is None:
+                if not queue.active():
+                    return
+                # Other workers hold the rest; their leases may still expire
+                await asyncio.sleep(min(queue.lease / 3, 2))
+                continue
+            if item.category not in stores:
+                stores[item.category] = PaperStore(os.path.join(shards, f"{item.category}.{owner}.sqlite"))
+            unit = item.venues[0] if len(item.venues) == 1 else tuple(item.venues)
+            crawl = CrawlSettings(item.category, item.syear, item.eyear, settings["threshold"], settings["strict"],
+                                  settings["backend"], settings["all_records"], False, settings["html_parser"])
+            heartbeat = asyncio.create_task(keep_leased(queue, item, owner))
+            papers = 0
+            try:
+                async for _ in iter_unit(unit, list(settings["keywords"][item.category]), scorers[item.category],
+                                         crawl, stores[item.category], log=logger, engine=engine):
+                    papers += 1
+            except Exception as e:
+                logger.error(f"Item {item.id} ({', '.join(item.venues)} {item.syear}-{item.eyear}) failed: {e}")
+                queue.fail(item, owner, str(e))
+            else:
+                queue.complete(item, owner, papers)
+            finally:
+                heartbeat.cancel()
+
+    try:
+        await asyncio.gather(*(lane() for _ in range(max(concurrency, 1))))
+    finally:
+        for store in stores.values():
+            store.close()
+
+
+# One worker process; args are the work command's options, shards the directory of the workers' stores
+def run_worker(args, shards):
+    setup_logging(args)
+    owner = worker_name()
+    queue = WorkQueue(args.queue, lease=args.lease)
+    settings = queue.meta("settings")
+    limits, retry = limits_from_args(args)
+    limits.shared = SharedRate(args.queue, args.global_rate)
+    client = DblpClient(pool_size=args.concurrency, log=logger, cache=cache_from_args(args), limits=limits,
+                        retry=retry)
+    engine = CrawlEngine(client, concurrency=args.concurrency, log=logger, parse_workers=args.parse_workers)
+    try:
+        asyncio.run(crawl_items(queue, owner, engine, settings, shards, args.concurrency))
+        logger.info(client.metrics.summary(client))
+    finally:
+        engine.close()
+        limits.shared.close()
+        queue.close()
+
+
+def merge_shards(args, shards):
+    filenames = {"conference": args.conffilename, "journal": args.journalfilename}
+    stores = {"conference": args.confstore, "journal": args.journalstore}
+    for category, (_, _, _, venue_column) in categories.items():
+        path = stores[category]
+        paths = sorted(glob.glob(os.path.join(shards, f"{category}.*.sqlite")))
+        if not paths:
+            continue
+        store = PaperStore(path)
+        try:
+            # Papers are keyed by dblp record key, so an item crawled twice is stored once
+            added = sum(store.merge(shard) for shard in paths)
+            exported = store.export(filenames[category], venue_column=venue_column)
+            logger.info(f"Merged {len(paths)} {category} shards into {path}: {added} new papers, "
+                        f"exported {exported} to {filenames[category]}")
+        finally:
+            store.close()
+
+
+# Main function
+def main(args):
+    setup_logging(args)
+    shards = shards_dir(args)
+    queue = WorkQueue(args.queue)
+    try:
+        if args.command == "init":
+            queue_sweep(queue, args)
+        elif args.command == "work":
+            if queue.meta("settings") is None:
+                raise SystemExit(f"No sweep in {args.queue}, run init first")
+            processes = [multiprocessing.Process(target=run_worker, args=(args, shards), name=f"worker-{i}")
+                         for i in range(max(args.processes, 1))]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+        elif args.command == "retry":
+            logger.info(f"Queued {queue.retry_failed()} failed items again")
+        elif args.command == "merge":
+            merge_shards(args, shards)
+        for category, venues, syear, eyear, attempts, error in (queue.failures() if args.command == "status" else []):
+            logger.info(f"failed: {category} {venues} {syear}-{eyear} after {attempts} attempts: {error}")
+        logger.info(", ".join(f"{count} {state}" for state, count in queue.counts().items()))
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main(parse_args())
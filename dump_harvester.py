@@ -0,0 +1,151 @@
+import argparse
+import csv
+import logging
+import os
+import time
+
+from common.dump import iter_dump, record_bibtex, record_bibtex_url
+from common.scoring import MATCH_MODES, KeywordScorer, load_keywords
+from common.venues import VenueMatcher, venue_set
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+logger = logging.getLogger("dblp dump harvester log")
+
+
+# Argument parsing
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Harvest papers from the dblp.xml(.gz) dump in one streaming pass.')
+    parser.add_argument("--dump", default="dblp.xml.gz", metavar="dblp.xml.gz",
+                        help="Path of the dblp XML dump, gzipped or not. Default: dblp.xml.gz")
+    parser.add_argument("--category", choices=["conference", "journal", "all"], default="all",
+                        help="Venue category to harvest. Default: all")
+    parser.add_argument('--syear', type=int, default=2015, metavar="INT",
+                        help='Year to start the harvest. Default: 2015')
+    parser.add_argument('--eyear', type=int, default=None, metavar="INT",
+                        help='Last year to harvest (inclusive). Default: no upper bound')
+    parser.add_argument("--sthreshod", type=float, default=0.4, metavar="FLOAT",
+                        help="Threshold for paper score to add to paper list. Default: 0.4")
+    parser.add_argument("--strictmatch", type=bool, default=False,
+                        help="Enable conference strict match, e.g., do not match workshop. Default: False")
+    parser.add_argument("--confkeywords", default=os.path.join(ROOT, "conference", "keywords.txt"), metavar="FILE",
+                        help="Keyword weights for conferences. Default: conference/keywords.txt")
+    parser.add_argument("--journalkeywords", default=os.path.join(ROOT, "journal", "keywords.txt"), metavar="FILE",
+                        help="Keyword weights for journals. Default: journal/keywords.txt")
+    parser.add_argument("--scoremode", choices=MATCH_MODES, default="substring",
+                        help="Keyword matching: substring, whole word, or stemmed whole word. The bm25 / tfidf "
+                             "rankings need the whole corpus, run them with rescore.py. Default: substring")
+    parser.add_argument("--conffilename", default="conference_dump.csv", metavar="*.csv",
+                        help="Output file for conference papers. Default: conference_dump.csv")
+    parser.add_argument("--journalfilename", default="journal_dump.csv", metavar="*.csv",
+                        help="Output file for journal papers. Default: journal_dump.csv")
+    parser.add_argument("--loglevel", choices=["debug", "info", "silent"], default="info",
+                        help="Logging level. Default: info")
+    parser.add_argument("--logfilename", default="dump-dblplog.log")
+    args = parser.parse_args(argv)
+    return args
+
+
+# Logging setup
+def setup_logging(args):
+    logmap = {
+        "debug": logging.DEBUG,
+        "info": logging.INFO,
+        "silent": logging.CRITICAL
+    }
+    logger.setLevel(logmap[args.loglevel])
+    ch = logging.FileHandler(args.logfilename, "w")
+    ch.setLevel(logmap[args.loglevel])
+    ch.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    sh = logging.StreamHandler()
+    sh.setLevel(logmap[args.loglevel])
+    sh.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(ch)
+    logger.addHandler(sh)
+
+
+# dump record type, stream prefix and venue column of each category
+categories = {
+    "conference": ("inproceedings", "conf", "venue"),
+    "journal": ("article", "journals", "journal"),
+}
+
+SCORE_CHUNK = 1024
+
+
+# One matcher per category; the journal crawler does not filter on the venue name
+def buildMatchers(selected, strict=False):
+    return {category: VenueMatcher(venue_set[category], categories[category][1], strict=strict,
+                                   check_name=category == "conference")
+            for category in selected}
+
+
+# scorers maps each selected category to its KeywordScorer
+def harvest(dump, selected, filenames, scorers, syear, eyear=None, threshold=0.4, strict=False):
+    matchers = buildMatchers(selected, strict)
+    streams = set().union(*(matcher.streams for matcher in matchers.values()))
+    record_types = {categories[category][0]: category for category in selected}
+
+    files = {category: open(filenames[category], "w", newline="", encoding="utf-8") for category in selected}
+    writers = {}
+    for category, f in files.items():
+        writers[category] = csv.writer(f)
+        writers[category].writerow(["title", categories[category][2], "year", "pages", "authors",
+                                    "bibtex_url", "bibtex_data"])
+
+    # Records of each category waiting to be scored, SCORE_CHUNK titles per automaton pass
+    pending = {category: [] for category in selected}
+    seen = accepted = 0
+
+    def flush(category):
+        nonlocal accepted
+        records = pending[category]
+        for record, score in zip(records, scorers[category].score_many([record.title for record in records])):
+            if score < threshold:
+                continue
+            accepted += 1
+            writers[category].writerow([record.title, record.venue, record.year, record.pages,
+                                        ", ".join(record.authors), record_bibtex_url(record),
+                                        record_bibtex(record)])
+        records.clear()
+
+    start = time.monotonic()
+    try:
+        for record in iter_dump(dump, record_types=tuple(record_types), streams=streams):
+            seen += 1
+            if seen % 1000000 == 0:
+                logger.info(f"{seen} records scanned, {accepted} accepted, {time.monotonic() - start:.0f}s")
+
+            if record.year is None or record.year < syear:
+                continue
+            if eyear is not None and record.year > eyear:
+                continue
+            category = record_types[record.type]
+            if matchers[category].route(record.key, record.venue) is None:
+                continue
+            pending[category].append(record)
+            if len(pending[category]) >= SCORE_CHUNK:
+                flush(category)
+        for category in selected:
+            flush(category)
+    finally:
+        for f in files.values():
+            f.close()
+
+    logger.info(f"Scanned {seen} records in {time.monotonic() - start:.0f}s, accepted {accepted} papers")
+
+
+# Main function
+def main(args):
+    setup_logging(args)
+    selected = ["conference", "journal"] if args.category == "all" else [args.category]
+    # Keywords of each category, the same files the crawlers read
+    keyword_files = {"conference": args.confkeywords, "journal": args.journalkeywords}
+    scorers = {category: KeywordScorer(load_keywords(keyword_files[category]), mode=args.scoremode)
+               for category in selected}
+    harvest(args.dump, selected, {"conference": args.conffilename, "journal": args.journalfilename}, scorers,
+            args.syear, args.eyear, args.sthreshod, args.strictmatch)
+
+
+if __name__ == "__main__":
+    main(parse_args())
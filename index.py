@@ -0,0 +1,103 @@
+import argparse
+import logging
+import os
+import time
+
+from common.paperindex import PaperIndex
+
+# Store of each category
+categories = {
+    "conference": "conference.sqlite",
+    "journal": "journal.sqlite",
+}
+
+logger = logging.getLogger("dblp index log")
+
+
+# Argument parsing
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the search index of a crawled paper store and query it, "
+                                                 "without crawling.")
+    parser.add_argument("--category", choices=list(categories), default="conference",
+                        help="Sets the default of --store. Default: conference")
+    parser.add_argument("--store", default=None, metavar="FILE",
+                        help="Paper store written by the crawler. Default: conference.sqlite / journal.sqlite")
+    parser.add_argument("--title", default=None, metavar="QUERY",
+                        help="Words of the title, all of them unless joined by OR; NOT, parentheses, \"phrases\" and "
+                             "prefix* words work too, e.g. 'fuzz* AND (kernel OR \"smart contracts\") NOT android'")
+    parser.add_argument("--author", action="append", default=[], metavar="NAME",
+                        help="Papers by this author, whole name in any case; NAME* for every name starting with NAME. "
+                             "Repeat for papers by all of them.")
+    parser.add_argument("--venue", action="append", default=[], metavar="NAME",
+                        help="Papers of this venue, as named in the CSV (e.g. CCS, IEEE Trans. Software Eng.). "
+                             "Repeat for any of them.")
+    parser.add_argument('--syear', type=int, default=None, metavar="INT", help='Papers from this year on.')
+    parser.add_argument('--eyear', type=int, default=None, metavar="INT", help='Papers up to this year (inclusive).')
+    parser.add_argument("--accepted", action="store_true", help="Only papers accepted by the keyword score.")
+    parser.add_argument("--coauthors", default=None, metavar="NAME",
+                        help="List the coauthors of NAME (NAME* as in --author) on the papers matching the other "
+                             "options, instead of the papers.")
+    parser.add_argument("--limit", type=int, default=20, metavar="INT", help="Results shown, 0 for all. Default: 20")
+    parser.add_argument("--loglevel", choices=["debug", "info", "silent"], default="info",
+                        help="Logging level. Default: info")
+    args = parser.parse_args(argv)
+    args.store = args.store or categories[args.category]
+    if not os.path.exists(args.store):
+        parser.error(f"No paper store at {args.store}, run the crawler first")
+    return args
+
+
+# Logging setup
+def setup_logging(args):
+    logmap = {
+        "debug": logging.DEBUG,
+        "info": logging.INFO,
+        "silent": logging.CRITICAL
+    }
+    logger.setLevel(logmap[args.loglevel])
+    if not logger.handlers:
+        sh = logging.StreamHandler()
+        sh.setLevel(logmap[args.loglevel])
+        sh.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(sh)
+
+
+def query(index, args):
+    filters = dict(title=args.title, venues=args.venue, syear=args.syear, eyear=args.eyear, accepted=args.accepted)
+    limit = args.limit or None
+    start = time.monotonic()
+    if args.coauthors:
+        rows = index.coauthors(args.coauthors, limit=limit, **filters)
+        elapsed = time.monotonic() - start
+        for name, papers in rows:
+            logger.info(f"{papers:>5}  {name}")
+        logger.info(f"{len(rows)} coauthors of {args.coauthors} shown, in {elapsed * 1000:.1f} ms")
+        return
+    papers = index.search(authors=args.author, limit=limit, **filters)
+    matches = index.count_matches(authors=args.author, **filters) if limit and len(papers) == limit else len(papers)
+    elapsed = time.monotonic() - start
+    for paper in papers:
+        logger.info(f"{paper.year or '':<5} {paper.published_in or '':<16} {paper.title}")
+        logger.debug(f"      {', '.join(paper.authors)} ({paper.key})")
+    logger.info(f"{matches} papers match, {len(papers)} shown, in {elapsed * 1000:.1f} ms")
+
+
+# Main function
+def main(args):
+    setup_logging(args)
+    start = time.monotonic()
+    index = PaperIndex(args.store)
+    try:
+        if index.added:
+            logger.info(f"Indexed {index.added} papers of {args.store} in {time.monotonic() - start:.1f}s")
+        if args.title or args.author or args.venue or args.coauthors or args.syear or args.eyear:
+            try:
+                query(index, args)
+            except ValueError as e:
+                raise SystemExit(str(e))
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main(parse_args())
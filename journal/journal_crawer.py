@@ -1,172 +1,171 @@
-import requests
-from bs4 import BeautifulSoup
-import re
-import csv
 import logging
 import argparse
 import os
+import sys
+import asyncio
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.batch import HAS_PYARROW, columnar_format
+from common.bibtex import add_bibtex_arguments, attach_bibtex
+from common.cache import add_cache_arguments, cache_from_args
+from common.checkpoint import CheckpointStore, add_checkpoint_arguments, checkpoint_path
+from common.client import DblpClient
+from common.crawl import Paper, aiter_papers, settings_from_args
+from common.engine import CrawlEngine
+from common.metrics import add_metrics_arguments, metrics_from_args, write_metrics
+from common.ratelimit import add_ratelimit_arguments, limits_from_args
+from common.scoring import MATCH_MODES, KeywordScorer, load_keywords
+from common.schedule import add_schedule_arguments, aiter_items, budget_from_args, plan_from_args, scheduled
+from common.search import BACKENDS, HAS_LXML, add_parser_arguments
+from common.store import PaperStore, add_store_arguments, store_path
+from common.venues import venue_set
+
+
+# Argument parsing; the crawl itself lives in common.crawl, importable without this CLI
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='DBLP journal crawler.')
+    parser.add_argument('--syear', type=int, default=2020, metavar="INT", 
+                        help='Year to start the crawler. Default: 2020')
+    parser.add_argument('--eyear', type=int, default=None, metavar="INT",
+                        help='Last year to crawl (inclusive). Default: no upper bound')
+    parser.add_argument("--sthreshod", type=float, default=0.4, metavar="FLOAT", 
+                        help="Threshold for the paper score to add to the paper list. Default: 0.4")
+    parser.add_argument("--filename", default="journal.csv", metavar="*.csv", 
+                        help="Filename to save the papers; .parquet or .arrow for a columnar file (pyarrow). Default: journal_data.csv")
+    parser.add_argument("--strictmatch", type=bool, default=False, 
+                        help="Enable strict match, default: False")
+    parser.add_argument("--journal", default=None, 
+                        help="Specify target journal.")
+    parser.add_argument("--loglevel", choices=["debug", "info", "silent"], default="info", 
+                        help="Logging level. Default: info")
+    parser.add_argument("--logfilename", default="journal-dblplog.log")
+    parser.add_argument("--concurrency", type=int, default=4, metavar="INT",
+                        help="Number of journals crawled at the same time. Default: 4")
+    parser.add_argument("--backend", choices=BACKENDS, default="json",
+                        help="dblp search backend: the JSON search API, or the HTML fragment endpoint. "
+                             "Falls back to html if the API fails. Default: json")
+    parser.add_argument("--keywords", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "keywords.txt"),
+                        metavar="FILE", help="Keyword weights, 'keyword weight' lines or a JSON object. Default: journal/keywords.txt")
+    parser.add_argument("--scoremode", choices=MATCH_MODES, default="substring",
+                        help="Keyword matching: substring, whole word, or stemmed whole word. The bm25 / tfidf "
+                             "rankings need the whole corpus, run them with rescore.py. Default: substring")
+    parser.add_argument("--batch-size", type=int, default=1, metavar="INT",
+                        help="Number of journals packed into one OR'ed query, results are routed back by stream id. Default: 1")
+    parser.add_argument("--all-records", action="store_true",
+                        help="Fetch every record of the journals, not only titles matching a keyword, "
+                             "so rescore.py can try any keyword set offline.")
+    add_ratelimit_arguments(parser)
+    add_cache_arguments(parser)
+    add_checkpoint_arguments(parser)
+    add_store_arguments(parser)
+    add_parser_arguments(parser)
+    add_metrics_arguments(parser)
+    add_schedule_arguments(parser)
+    parser.add_argument("--bibtex", action="store_true",
+                        help="Fetch the BibTeX of new papers while crawling, and export --bibtexfile.")
+    parser.add_argument("--bibtexfile", default="journal_with_bibtex.csv", metavar="*.csv",
+                        help="Export with a bibtex_data column, written with --bibtex. Default: journal_with_bibtex.csv")
+    add_bibtex_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.html_parser == "lxml" and not HAS_LXML:
+        parser.error("--html-parser lxml needs the lxml package: pip install lxml")
+    if not HAS_PYARROW and any(map(columnar_format, (args.filename, args.bibtexfile))):
+        parser.error("Parquet and Arrow exports need the pyarrow package: pip install pyarrow")
+    if scheduled(args) and args.batch_size > 1:
+        parser.error("--batch-size packs whole venues into a query, scheduled runs crawl (venue, year) items")
+    return args
 
-# Argument parsing
-parser = argparse.ArgumentParser(description='DBLP journal crawler.')
-parser.add_argument('--syear', type=int, default=2020, metavar="INT", 
-                    help='Year to start the crawler. Default: 2020')
-parser.add_argument("--sthreshod", type=float, default=0.4, metavar="FLOAT", 
-                    help="Threshold for the paper score to add to the paper list. Default: 0.4")
-parser.add_argument("--filename", default="journal.csv", metavar="*.csv", 
-                    help="Filename to save the papers. Default: journal_data.csv")
-parser.add_argument("--strictmatch", type=bool, default=False, 
-                    help="Enable strict match, default: False")
-parser.add_argument("--journal", default=None, 
-                    help="Specify target journal.")
-parser.add_argument("--loglevel", choices=["debug", "info", "silent"], default="info", 
-                    help="Logging level. Default: info")
-parser.add_argument("--logfilename", default="journal-dblplog.log")
-args = parser.parse_args()
 
 # Logging setup
-logmap = {
-    "debug": logging.DEBUG,
-    "info": logging.INFO,
-    "silent": logging.CRITICAL
-}
-logger = logging.getLogger("dblp journal crawler log")
-logger.setLevel(logmap[args.loglevel])
-ch = logging.FileHandler(args.logfilename, "w")
-ch.setLevel(logmap[args.loglevel])
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-ch.setFormatter(formatter)
-sh = logging.StreamHandler()
-sh.setLevel(logmap[args.loglevel])
-sh.setFormatter(logging.Formatter("%(message)s"))
-logger.addHandler(ch)
-logger.addHandler(sh)
+def setup_logging(args):
+    logmap = {
+        "debug": logging.DEBUG,
+        "info": logging.INFO,
+        "silent": logging.CRITICAL
+    }
+    logger = logging.getLogger("dblp journal crawler log")
+    logger.setLevel(logmap[args.loglevel])
+    ch = logging.FileHandler(args.logfilename, "w")
+    ch.setLevel(logmap[args.loglevel])
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    ch.setFormatter(formatter)
+    sh = logging.StreamHandler()
+    sh.setLevel(logmap[args.loglevel])
+    sh.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(ch)
+    logger.addHandler(sh)
+    return logger
 
-keywords = {
-    "linear": 0.2,
-    "attention": 0.2,
-}
-
-venue_set = {
-    "journal": ["tocs", "tos", "tcad", "tc", "tpds", "taco", "taas", "todaes", "tecs", "trets", "tvlsi", "jpdc", "jsa", "parco", "jsac", "tmc", "ton", "toit", "tomccap", "tosn", "cn", "tcom", "twc", "tdsc", "tifs",  "tissec", "jcs", "toplas", "tosem", "tse", "tsc", "ase", "ese", "iets", "ist", "jfp", "jss", "re", "scp", "sosym", "stvr", "spe", "tods", "tois", "tkde", "vldbj", "tkdd", "tweb", "aei", "dke", "dmkd", "ejis", "ipm", "is", "jasist", "jws", "kais", "tit", "iandc", "sicomp", "talg", "tocl", "toms", "algorithmica", "cc", "fac", "fmsd", "informs", "jcss", "jgo", "jsc", "mscs", "tcs", "tog", "tip", "tvcg", "tomccap", "cagd", "cgf", "cad", "gm", "tcsvt", "tmm", "jasa", "siims", "speech com", "ai", "tpami", "ijcv", "jmlr", "tap", "aamas", "cviu", "dke", "tac", "taslp", "tec", "tfs", "tnnls", "ijar", "jair", "jslhr", "pr", "tacl", "tochi", "ijhcs", "cscw", "hci", "iwc", "ijhci", "umuai", "tsmc", "jacm", "proc. ieee", "scis", "cognition", "tasae", "tgars", "tits", "tmi", "tr", "tcbb", "jcst", "jamia", "www"]
-}
-YEAR_START = args.syear
-SCORE_THRESHOD = args.sthreshod
-
-# Paper class
-class Paper:
-    def __init__(self, title=None, journal=None, year=None, pages=None, bibtex_url=None):
-        self.title = title
-        self.journal = journal
-        self.year = year
-        self.pages = pages
-        self.authors = []
-        self.score = None
-        self.bibtex_url = bibtex_url
-
-    def calScore(self):
-        self.score = sum(keywords[keyword] for keyword in keywords if keyword in self.title.lower())
-
-    def __str__(self):
-        return "{} {}, {} {}, BibTeX URL: {}".format(
-            self.title, self.pages, self.journal, self.year, self.bibtex_url
-        )
-
-# Save papers to CSV file without the score column
-def savePaper2csv(paper_list, filename):
-    with open(f"{filename}", "w") as f:
-        writer = csv.writer(f)
-        writer.writerow(["title", "journal", "year", "pages", "authors", "bibtex_url"])
-        for paper in paper_list:
-            writer.writerow([paper.title, paper.journal, paper.year, paper.pages, ", ".join(paper.authors), paper.bibtex_url])
-
-# Extract content strings from HTML tag
-def getContentStrings(tag):
-    return "".join([getContentStrings(c) if hasattr(c, 'contents') else c.string for c in tag.contents])
-
-# Search for papers in a specific journal
-def searchJournal(journal, keywords, filename):
-    dblp_url = "https://dblp.org/search/publ/inc"
-    journalre = re.compile(".*{}.*".format(journal), re.IGNORECASE)
-    if args.strictmatch:
-        journalre = re.compile("(?=^((?!workshop).)*$)(?=[^@]?{}[^@]?)".format(journal), re.IGNORECASE)
-    search_word = "|".join(keywords) + f" streamid:journals/{journal}:"
-
-    page = 0
-    year_smaller_bool = False
-    paper_list = []
-    max_pages = 50  # Set maximum number of pages to search
-
-    if not os.path.exists(filename):
-        savePaper2csv([], filename)  # Ensure file exists with header
-
-    while not year_smaller_bool and page < max_pages:
-        payload = {
-            "q": search_word,
-            "s": "ydvspc",
-            "h": "1000",
-            "b": f"{page}",
-        }
-
-        try:
-            r = requests.get(dblp_url, params=payload, timeout=10)
-            r.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed: {e}")
-            break
-
-        soup = BeautifulSoup(r.text, "html.parser")
-        record_list = soup.find_all("li", class_=re.compile("year|article"))
-
-        if not record_list:
-            logger.warning("No more papers can be found!")
-            break
-
-        for record in record_list:
-            if "year" in record["class"]:
-                try:
-                    year = int(record.string)
-                    if year < YEAR_START:
-                        year_smaller_bool = True
-                        break
-                except (ValueError, TypeError):
-                    continue
-            elif "article" in record["class"]:
-                authors = record.cite.find_all(itemprop="author")
-                title_tag = record.cite.find(class_="title")
-                paper_title = getContentStrings(title_tag)
-                paper_journal = record.cite.find(itemprop="isPartOf").string
-                pagination_tag = record.cite.find(itemprop="pagination")
-                paper_pagination = pagination_tag.string if pagination_tag else None
-
-                pp = Paper(title=paper_title, journal=paper_journal, year=year, pages=paper_pagination)
-
-                for author in authors:
-                    author_name = author.a.string if author.a else author.string
-                    pp.authors.append(author_name)
-
-                bibtex_tag = record.find("a", href=re.compile(".*view=bibtex.*"))
-                pp.bibtex_url = bibtex_tag["href"] if bibtex_tag else None
-
-                pp.calScore()
-                if pp.score >= SCORE_THRESHOD:
-                    paper_list.append(pp)
-                    with open(filename, "a") as f:
-                        writer = csv.writer(f)
-                        writer.writerow([pp.title, pp.journal, pp.year, pp.pages, ", ".join(pp.authors), pp.bibtex_url])
-
-        page += 1  # Increase page count
-
-    logger.info(f"Found {len(paper_list)} papers for journal: {journal}")
-    return paper_list
 
 # Main function
-if __name__ == "__main__":
-    target_category = "journal"
+async def main(args):
+    logger = setup_logging(args)
+    # Keywords are loaded from a file and compiled once into a scorer
+    keywords = load_keywords(args.keywords)
+    scorer = KeywordScorer(keywords, mode=args.scoremode)
+    journals = [args.journal] if args.journal else venue_set["journal"]
+
+    limits, retry = limits_from_args(args)
+    metrics = metrics_from_args(args)
+    client = DblpClient(pool_size=args.concurrency + args.workers, log=logger, cache=cache_from_args(args),
+                        limits=limits, retry=retry, metrics=metrics)
+    engine = CrawlEngine(client, concurrency=args.concurrency, log=logger, parse_workers=args.parse_workers,
+                         budget=budget_from_args(args, metrics))
+    checkpoint = CheckpointStore(checkpoint_path(args))
+    if args.restart:
+        checkpoint.clear()
+    store = PaperStore(store_path(args))
+    if args.index:
+        store.create_index()
+
+    def save_bibtex(paper):
+        if paper.bibtex_data:
+            store.set_bibtex(paper.key, paper.bibtex_data)
+
+    async def missing_bibtex(before):
+        # Papers stored by earlier runs still without BibTeX, e.g. from an interrupted run. Those of this run
+        # that failed were already retried by the client and are left to the next run.
+        for key, bibtex_url, _ in store.missing_bibtex(before):
+            yield Paper(bibtex_url=bibtex_url, key=key)
+
+    started = time.time()
+
+    try:
+        if scheduled(args):
+            # (venue, year) items, the most accepted papers per request first, until the budget is spent
+            items = plan_from_args(args, journals, checkpoint, store)
+            logger.info(f"Planned {len(items)} items, first: {', '.join(map(str, items[:5]))}")
+            papers = aiter_items(items, keywords, scorer, settings_from_args(args, "journal"), engine, store, checkpoint,
+                                 log=logger)
+        else:
+            papers = aiter_papers(journals, keywords, scorer, settings_from_args(args, "journal"), engine, store, checkpoint,
+                                  batch_size=args.batch_size, log=logger)
+        if args.bibtex:
+            # BibTeX fetching overlaps with the crawl, papers are handed over as their page is stored
+            await attach_bibtex(papers, client, save_bibtex, workers=args.workers, mode=args.mode, log=logger)
+            await attach_bibtex(missing_bibtex(started), client, save_bibtex, workers=args.workers, mode=args.mode, log=logger)
+        else:
+            async for _ in papers:
+                pass
+    finally:
+        logger.info(f"Requests: {client.retries} retries, {client.throttled} throttled (429)")
+        if engine.skipped:
+            logger.info(f"Budget spent: {engine.budget}, {engine.skipped} items left for the next run")
+        if client.cache is not None:
+            logger.info(f"Cache: {client.cache.hits} hits, {client.cache.misses} misses")
+        # The CSV, Parquet or Arrow file is an export of the store
+        with metrics.time("write"):
+            exported = store.export(args.filename, venue_column="journal")
+            logger.info(f"Exported {exported} papers from {store.path} to {args.filename}")
+            if args.bibtex:
+                store.export(args.bibtexfile, venue_column="journal", bibtex=True)
+                logger.info(f"Exported papers with BibTeX to {args.bibtexfile}")
+        logger.info(metrics.summary(client))
+        write_metrics(metrics, args, client)
+        store.close()
+        checkpoint.close()
+        engine.close()
 
-    if target_category in venue_set:
-        journals = venue_set[target_category]
-        
-        for journal in journals:
-            logger.info(f"Starting search for journal: {journal}")
-            searchJournal(journal, keywords, args.filename)
-            logger.info(f"Completed search for journal: {journal}")
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,118 @@
+import argparse
+import heapq
+import logging
+import math
+import os
+import time
+from array import array
+
+from common.batch import HAS_PYARROW, columnar_format
+from common.ranking import RankingScorer, new_scorer
+from common.scoring import MODES, RANKINGS, load_keywords
+from common.store import PaperStore
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Store, keyword file, CSV export and venue column of each category
+categories = {
+    "conference": ("conference.sqlite", os.path.join(ROOT, "conference", "keywords.txt"), "conference.csv", "venue"),
+    "journal": ("journal.sqlite", os.path.join(ROOT, "journal", "keywords.txt"), "journal.csv", "journal"),
+}
+
+logger = logging.getLogger("dblp rescore log")
+
+
+# Argument parsing
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Re-score a crawled paper store with new keywords, without crawling.')
+    parser.add_argument("--category", choices=list(categories), default="conference",
+                        help="Sets the defaults of --store, --keywords, --filename and the venue column. Default: conference")
+    parser.add_argument("--store", default=None, metavar="FILE",
+                        help="Paper store written by the crawler. Default: conference.sqlite / journal.sqlite")
+    parser.add_argument("--keywords", default=None, metavar="FILE",
+                        help="Keyword weights, 'keyword weight' lines or a JSON object. Default: the category's keywords.txt")
+    parser.add_argument("--scoremode", choices=MODES, default="substring",
+                        help="Keyword matching: substring, whole word, or stemmed whole word; or bm25 / tfidf ranking. "
+                             "Default: substring")
+    parser.add_argument("--sthreshod", type=float, default=None, metavar="FLOAT",
+                        help="Threshold for paper score to add to paper list. Default: 0.4; the bm25 / tfidf scores are "
+                             "on another scale and need --sthreshod or --top")
+    parser.add_argument("--top", type=int, default=None, metavar="K",
+                        help="Only accept the K best scored papers above --sthreshod. Default: every paper above it")
+    parser.add_argument('--syear', type=int, default=None, metavar="INT",
+                        help='Only accept papers from this year on. Default: no lower bound')
+    parser.add_argument('--eyear', type=int, default=None, metavar="INT",
+                        help='Only accept papers up to this year (inclusive). Default: no upper bound')
+    parser.add_argument("--filename", default=None, metavar="*.csv",
+                        help="Export of the accepted papers, CSV or by extension .parquet / .arrow. Default: conference.csv / journal.csv")
+    parser.add_argument("--loglevel", choices=["debug", "info", "silent"], default="info",
+                        help="Logging level. Default: info")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.store or categories[args.category][0]):
+        parser.error(f"No paper store at {args.store or categories[args.category][0]}, run the crawler first")
+    if args.scoremode in RANKINGS and args.sthreshod is None and args.top is None:
+        parser.error(f"--scoremode {args.scoremode} scores are not on the keyword weight scale, give --sthreshod or --top")
+    if args.filename and columnar_format(args.filename) and not HAS_PYARROW:
+        parser.error("Parquet and Arrow exports need the pyarrow package: pip install pyarrow")
+    return args
+
+
+# Logging setup
+def setup_logging(args):
+    logmap = {
+        "debug": logging.DEBUG,
+        "info": logging.INFO,
+        "silent": logging.CRITICAL
+    }
+    logger.setLevel(logmap[args.loglevel])
+    if not logger.handlers:
+        sh = logging.StreamHandler()
+        sh.setLevel(logmap[args.loglevel])
+        sh.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(sh)
+
+
+# Score every stored title with the compiled scorer, one chunk of titles per automaton pass.
+# A ranking scorer first reads every chunk for the corpus statistics, then scores them in a second pass.
+# Scores are collected first and written back in one transaction, so an interrupted run changes nothing.
+def rescore(store, scorer, threshold, syear=None, eyear=None, top=None):
+    start = time.monotonic()
+    rowids = array("q")
+    scores = array("d")
+    if isinstance(scorer, RankingScorer):
+        for chunk in store.iter_titles(syear=syear, eyear=eyear):
+            scorer.add([title for _, title in chunk])
+    for chunk in store.iter_titles(syear=syear, eyear=eyear):
+        rowids.extend(rowid for rowid, _ in chunk)
+        scores.extend(scorer.score_many([title for _, title in chunk]))
+    if top and len(scores) > top:
+        # Ties with the K-th score are accepted too
+        threshold = max(threshold, heapq.nlargest(top, scores)[-1])
+    scored = time.monotonic()
+    accepted = store.rescore(zip(rowids, scores), threshold, syear, eyear)
+    logger.info(f"Scored {len(rowids)} papers in {scored - start:.2f}s, "
+                f"saved in {time.monotonic() - scored:.2f}s: {accepted} above {threshold:g}")
+    return accepted
+
+
+# Main function
+def main(args):
+    setup_logging(args)
+    default_store, default_keywords, default_filename, venue_column = categories[args.category]
+    store = PaperStore(args.store or default_store)
+    try:
+        scorer = new_scorer(load_keywords(args.keywords or default_keywords), args.scoremode)
+        threshold = args.sthreshod
+        if threshold is None:
+            # --top alone ranks the papers with any keyword hit
+            threshold = math.nextafter(0.0, 1.0) if args.scoremode in RANKINGS else 0.4
+        rescore(store, scorer, threshold, args.syear, args.eyear, args.top)
+        filename = args.filename or default_filename
+        exported = store.export(filename, venue_column=venue_column)
+        logger.info(f"Exported {exported} papers to {filename}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main(parse_args())
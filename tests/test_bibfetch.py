@@ -0,0 +1,79 @@
+import csv
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.dblp_stub import parse_args, stub_from_args
+from common.bibfetch import process_csv
+from common.client import DblpClient
+from common.ratelimit import HostLimits
+from common.rowindex import RowIndex
+
+FIELDS = ["title", "venue", "bibtex_url"]
+
+
+def write_csv(path, fieldnames, rows):
+    with open(path, mode="w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def test_row_index_reads_rows_back(tmp_path):
+    # Quoted fields spanning lines, so offsets are not line numbers
+    first = [{"key": "a", "text": "one,\ntwo"}, {"key": "b", "text": "ü \"quoted\""}, {"key": "", "text": "no key"}]
+    second = [{"key": "b", "text": "newer\r\nb"}, {"key": "c", "text": "skipped"}]
+    write_csv(tmp_path / "first.csv", ["key", "text"], first)
+    write_csv(tmp_path / "second.csv", ["key", "text"], second)
+    index = RowIndex(str(tmp_path / "rows.index"), lambda row: row["key"])
+    assert index.add_file(str(tmp_path / "first.csv")) == 2
+    # Later files win on equal keys
+    assert index.add_file(str(tmp_path / "second.csv"), keep=lambda row: row["key"] != "c") == 1
+    assert index.get("a") == first[0]
+    assert index.get("b") == second[0]
+    assert index.get("c") is None and index.get("") is None
+    index.close()
+    assert not os.path.exists(tmp_path / "rows.index")
+
+
+# Stub with some latency jitter, so fetches finish out of input order
+@pytest.fixture
+def stub():
+    server = stub_from_args(parse_args(["--papers-per-year", "5", "--latency", "20", "--jitter", "15"]))
+    yield server
+    server.shutdown()
+
+
+def test_process_csv_keeps_input_order_and_resumes(stub, tmp_path):
+    rows = [{"title": f"Paper {year} {i}.", "venue": "CCS",
+             "bibtex_url": f"{stub.url}/rec/conf/ccs/P{year}x{i}.html?view=bibtex"}
+            for year in (2023, 2024) for i in range(5)]
+    rows.insert(3, {"title": "Paper without a record page.", "venue": "CCS", "bibtex_url": ""})
+    inputfile, outputfile = str(tmp_path / "papers.csv"), str(tmp_path / "papers_with_bibtex.csv")
+    write_csv(inputfile, FIELDS, rows)
+    # An interrupted run left the first rows in the partial output
+    resumed = {row["bibtex_url"]: f"@inproceedings{{resumed{i}}}" for i, row in enumerate(rows[:3])}
+    write_csv(f"{outputfile}.partial", FIELDS + ["bibtex_data"],
+              [dict(row, bibtex_data=resumed[row["bibtex_url"]]) for row in rows[:3]])
+
+    client = DblpClient(limits=HostLimits(rate=1000.0, max_rate=1000.0))
+    assert process_csv(inputfile, outputfile, client, workers=4, mode="html") == len(rows)
+    client.close()
+
+    output = read_csv(outputfile)
+    assert [row["title"] for row in output] == [row["title"] for row in rows]
+    assert [row["bibtex_data"] for row in output[:3]] == list(resumed.values())
+    assert output[3]["bibtex_data"] == "No URL"
+    for row in output[4:]:
+        key = row["bibtex_url"].split("/rec/")[1].split(".html")[0]
+        assert row["bibtex_data"].startswith(f"@inproceedings{{DBLP:{key},")
+    # Only the rows the partial output did not have were fetched
+    assert stub.snapshot()["requests"] == len(rows) - 4
+    assert not os.path.exists(f"{outputfile}.partial") and not os.path.exists(f"{outputfile}.resume")
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.bibstore import HAS_ZSTD, BibtexStore
+
+CODECS = ["zlib"] + (["zstd"] if HAS_ZSTD else [])
+
+
+def entry(i, venue="CCS"):
+    return (f"@inproceedings{{DBLP:conf/ccs/P{i},\n  author = {{Author {i} and Anna Li}},\n"
+            f"  title = {{Paper number {i}.}},\n  booktitle = {{{venue} 2024}},\n  pages = {{{i}--{i + 9}}},\n"
+            f"  year = {{2024}}\n}}")
+
+
+@pytest.mark.parametrize("codec", CODECS)
+@pytest.mark.parametrize("train_samples", [0, 8])
+def test_entries_read_back_as_written(codec, train_samples, tmp_path):
+    path = str(tmp_path / "bibtex.sqlite")
+    entries = {f"conf/ccs/P{i}": entry(i) for i in range(300)}
+    # Two keys with the same text are stored once
+    entries["conf/ccs/Copy"] = entry(7)
+    store = BibtexStore(path, codec=codec, train_samples=train_samples)
+    for key, text in entries.items():
+        store.put(key, text)
+    # Pending entries are readable before their flush
+    assert store.get("conf/ccs/Copy") == entry(7)
+    store.close()
+
+    store = BibtexStore(path, codec=codec, train_samples=train_samples)
+    assert store.count() == len(entries)
+    assert all(store.get(key) == text for key, text in entries.items())
+    assert dict(store.iter_entries()) == entries
+    assert store.get("conf/ccs/Missing") is None and "conf/ccs/Missing" not in store
+    stored, _, size, compressed = store.stats()
+    assert stored == len(entries) and size == sum(len(text) + 1 for text in entries.values()) - len(entry(7)) - 1
+    assert compressed < size
+    # Blocks after the first TRAIN_SAMPLES entries use the trained dictionary
+    assert store._db.execute("SELECT COUNT(*) FROM dictionaries").fetchone()[0] == (1 if train_samples else 0)
+
+    # A rerun appends its entries to the same store
+    store.put("conf/sp/P1", entry(1, venue="SP"))
+    store.close()
+    store = BibtexStore(path, codec=codec, train_samples=train_samples)
+    assert store.get("conf/sp/P1") == entry(1, venue="SP")
+    assert store.count() == len(entries) + 1
+    store.close()
@@ -0,0 +1,39 @@
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import crawl
+from common.crawl import CrawlSettings, iter_unit
+from common.engine import CrawlEngine
+from common.scoring import KeywordScorer
+from common.search import Record
+from common.store import PaperStore
+
+
+def test_records_without_a_key_are_skipped(tmp_path, monkeypatch, caplog):
+    records = [Record("conf/ccs/P2024x0", 2024, "Kernel fuzzing.", "CCS", "1-12", ["Anna Li"],
+                      "https://dblp.org/rec/conf/ccs/P2024x0.html?view=bibtex"),
+               Record(None, 2024, "Fuzzing without a key.", "CCS", "13-24", ["Anna Li"], None)]
+
+    # Every page of the search returns the same records, as a re-crawl would
+    async def search_page(engine, query, page, record_class, backend, html_parser=None):
+        return list(records), True, True
+
+    monkeypatch.setattr(crawl, "search_page", search_page)
+    keywords = {"fuzzing": 1.0}
+    store = PaperStore(str(tmp_path / "papers.sqlite"))
+    engine = CrawlEngine()
+
+    async def run():
+        return [pp.key async for pp in iter_unit("ccs", keywords, KeywordScorer(keywords), CrawlSettings(),
+                                                 store=store, engine=engine)]
+
+    with caplog.at_level(logging.WARNING, logger=crawl.logger.name):
+        assert asyncio.run(run()) == ["conf/ccs/P2024x0"]
+        assert asyncio.run(run()) == []
+    assert store.count() == 1
+    assert "Skipped 1 records of conference ccs without a dblp record key or BibTeX url" in caplog.text
+    engine.close()
+    store.close()
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# The benchmark scripts import the stub as a top-level module
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+from benchmarks.bench_parsing import synthetic_pages
+from common.search import HAS_LXML, parse_html_page
+
+PARSERS = ["selective"] + (["lxml"] if HAS_LXML else [])
+
+
+# One benchmark page (1000 records) and its records from the BeautifulSoup html.parser walk, parsed once
+@pytest.fixture(scope="module")
+def page():
+    text = synthetic_pages(1)[0]
+    return text, parse_html_page(text, "inproceedings", "html.parser")
+
+
+@pytest.mark.parametrize("parser", PARSERS)
+def test_parsers_agree_on_the_benchmark_page(parser, page):
+    text, expected = page
+    assert len(expected[0]) == 1000
+    assert parse_html_page(text, "inproceedings", parser) == expected
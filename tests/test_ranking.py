@@ -0,0 +1,63 @@
+import math
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common import ranking
+from common.ranking import RankingScorer
+from common.scoring import RANKINGS, TOKEN, stem
+
+KEYWORDS = {"attack": 1.0, "side channel": 0.5, "users": 0.2, "fuzzing": 0.8}
+CORPUS = [
+    "Side-Channel Attacks on Machine Learning Accelerators.",
+    "Attacking the attackers: fuzzing fuzzers.",
+    "A user study of superusers.",
+    "",
+    "Graph learning at scale.",
+    "Side channels, side doors and side effects of users' attacks.",
+]
+
+
+# Textbook BM25 / TF-IDF over the stemmed title tokens, one title and one term at a time
+def naive_scores(mode, titles, k1=1.2, b=0.75):
+    profile = Counter()
+    for keyword, weight in KEYWORDS.items():
+        tokens = [stem(token) for token in TOKEN.findall(keyword.lower())]
+        for token in tokens:
+            profile[token] += weight / len(tokens)
+    documents = [[stem(token) for token in TOKEN.findall(title.lower())] for title in titles]
+    n = len(documents)
+    avgdl = sum(map(len, documents)) / n
+    scores = []
+    for document in documents:
+        score = 0.0
+        for term, weight in profile.items():
+            count = document.count(term)
+            if not count:
+                continue
+            df = sum(1 for other in documents if term in other)
+            if mode == "bm25":
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                score += weight * idf * count * (k1 + 1) / (count + k1 * (1 - b + b * len(document) / avgdl))
+            else:
+                score += weight * (math.log((1 + n) / (1 + df)) + 1) * (1 + math.log(count))
+        scores.append(score)
+    return scores
+
+
+@pytest.mark.parametrize("numpy", [True, False] if ranking.HAS_NUMPY else [False])
+@pytest.mark.parametrize("mode", RANKINGS)
+def test_ranking_matches_the_textbook_formulas(mode, numpy, monkeypatch):
+    monkeypatch.setattr(ranking, "HAS_NUMPY", numpy)
+    scorer = RankingScorer(KEYWORDS, mode)
+    # Corpus statistics do not depend on how the titles are paged
+    scorer.add(CORPUS[:2])
+    scorer.add(CORPUS[2:])
+    expected = naive_scores(mode, CORPUS)
+    assert scorer.score_many(CORPUS) == pytest.approx(expected)
+    assert scorer.score_many(CORPUS[::-1]) == pytest.approx(expected[::-1])
+    assert scorer.score(CORPUS[1]) == pytest.approx(expected[1])
+    assert scorer.score_many([]) == []
@@ -0,0 +1,190 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.dblp_stub import parse_args, stub_from_args
+from common.client import DblpClient, RequestCancelled
+from common.ratelimit import CircuitBreaker, CircuitOpenError, HostLimits, RetryPolicy, SharedRate
+from common.search import api_payload
+
+QUERY = api_payload("streamid:conf/ccs:", 0, hits=10)
+
+
+# Stub started with the command line options of benchmarks/dblp_stub.py
+@pytest.fixture
+def stub(request):
+    server = stub_from_args(parse_args(["--papers-per-year", "5", "--latency", "0", "--jitter", "0"] + request.param))
+    yield server
+    server.shutdown()
+
+
+# Short backoffs, so waits in the tests come from Retry-After and the rate limiter
+def new_client(retries=3, **limits):
+    limits.setdefault("rate", 1000.0)
+    limits.setdefault("max_rate", 1000.0)
+    return DblpClient(limits=HostLimits(**limits), retry=RetryPolicy(max_retries=retries, base=0.01, cap=0.02))
+
+
+def get(client, server):
+    return client.get(f"{server.url}/search/publ/api", QUERY)
+
+
+@pytest.mark.parametrize("stub", [["--throttle-rate", "1", "--retry-after", "1"]], indirect=True)
+def test_retry_after_is_honoured_and_throttles_do_not_open_the_circuit(stub):
+    client = new_client(retries=2, threshold=1)
+    start = time.monotonic()
+    with pytest.raises(requests.exceptions.HTTPError) as raised:
+        get(client, stub)
+    # Two waits of Retry-After: 1, not the backoff of at most 0.02s
+    assert time.monotonic() - start >= 2.0
+    assert raised.value.response.status_code == 429
+    assert client.throttled == 3
+    assert stub.snapshot()["throttled"] == 3
+    limiter, breaker = client.limits.for_host(stub.url.split("//")[1])
+    assert breaker.opened_at is None and breaker.failures == 0
+    client.close()
+
+
+@pytest.mark.parametrize("stub", [["--error-rate", "1"]], indirect=True)
+def test_rate_backs_off_on_errors_and_recovers(stub):
+    client = new_client(rate=64.0, min_rate=4.0, max_rate=128.0, threshold=100)
+    limiter, _ = client.limits.for_host(stub.url.split("//")[1])
+    with pytest.raises(requests.exceptions.HTTPError):
+        get(client, stub)
+    # Four 503s, each halving the rate
+    assert limiter.rate == pytest.approx(4.0)
+
+    stub.error_rate = 0.0
+    rates = []
+    for _ in range(4):
+        get(client, stub)
+        rates.append(limiter.rate)
+    assert rates == sorted(rates) and rates[0] > 4.0
+    assert rates[-1] == pytest.approx(4.0 + 4 * limiter.increase)
+    client.close()
+
+
+def test_breaker_lets_one_probe_through_then_closes_or_reopens():
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=2, cooldown=10.0, clock=lambda: now[0])
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    # After the cooldown one request is the probe, the others fail fast until it reports back
+    now[0] = 10.0
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError, match="half-open"):
+        breaker.before_request()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError, match="open"):
+        breaker.before_request()
+
+    now[0] = 20.0
+    breaker.before_request()
+    breaker.record_success()
+    for _ in range(3):
+        breaker.before_request()
+
+
+@pytest.mark.parametrize("stub", [["--error-rate", "1"]], indirect=True)
+def test_open_circuit_is_raised_by_the_client_without_retries(stub):
+    client = new_client(threshold=2, cooldown=0.5, retries=5)
+    with pytest.raises(CircuitOpenError):
+        get(client, stub)
+    assert stub.snapshot()["errors"] == 2
+    assert client.retries == 2
+
+    retries = client.retries
+    with pytest.raises(CircuitOpenError):
+        get(client, stub)
+    assert client.retries == retries
+    assert stub.snapshot()["errors"] == 2
+
+    # A failed probe re-opens the circuit
+    time.sleep(0.6)
+    with pytest.raises(CircuitOpenError):
+        get(client, stub)
+    assert stub.snapshot()["errors"] == 3
+
+    # One probe reaches the healthy host while the other callers fail fast, then the circuit closes
+    time.sleep(0.6)
+    stub.snapshot(reset=True)
+    stub.error_rate = 0.0
+    stub.latency = 300.0
+    outcomes = []
+
+    def call():
+        try:
+            outcomes.append(get(client, stub).status_code)
+        except CircuitOpenError:
+            outcomes.append("open")
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(outcomes, key=str) == [200, "open", "open", "open", "open"]
+    assert stub.snapshot()["requests"] == 1
+    stub.latency = 0.0
+    assert get(client, stub).status_code == 200
+    client.close()
+
+
+@pytest.mark.parametrize("stub", [[]], indirect=True)
+def test_cancel_ends_requests_waiting_for_their_turn(stub):
+    # One request per 5 seconds: the second and third caller wait for their slot until the client is cancelled
+    client = new_client(rate=0.2, max_rate=0.2)
+    outcomes = []
+
+    def call():
+        try:
+            outcomes.append(get(client, stub).status_code)
+        except RequestCancelled:
+            outcomes.append("cancelled")
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+    start = time.monotonic()
+    client.cancel()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - start < 1.0
+    assert sorted(outcomes, key=str) == [200, "cancelled", "cancelled"]
+    client.close()
+
+
+def take_slots(path, rate, count, times):
+    shared = SharedRate(path, rate)
+    for _ in range(count):
+        shared.acquire("dblp.org")
+        times.put(time.time())
+    shared.close()
+
+
+def test_processes_sharing_a_rate_stay_under_it(tmp_path):
+    rate, count = 20.0, 20
+    context = multiprocessing.get_context("spawn")
+    times = context.Queue()
+    processes = [context.Process(target=take_slots, args=(str(tmp_path / "rate.sqlite"), rate, count, times))
+                 for _ in range(2)]
+    for process in processes:
+        process.start()
+    sent = sorted(times.get(timeout=60) for _ in range(2 * count))
+    for process in processes:
+        process.join()
+    assert sent[-1] - sent[0] >= (2 * count - 1) / rate - 0.05
+    # No second holds more than the rate, give or take a late wake-up
+    for i, start in enumerate(sent):
+        assert sum(1 for t in sent[i:] if t < start + 1.0) <= rate + 1
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.scoring import MATCH_MODES, TOKEN, KeywordScorer, load_keywords, stem
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Overlapping keywords, so matches are found through the automaton's fail links
+KEYWORDS = {"he": 0.1, "she": 0.2, "his": 0.3, "hers": 0.4, "attack": 1.0, "side channel": 0.5,
+            "side-channel attacks": 0.7, "learning": 0.25, "machine learning": 0.6, "fuzz": 0.9}
+KEYWORDS.update(load_keywords(os.path.join(ROOT, "conference", "keywords.txt")))
+TITLES = [
+    "",
+    "Ushers and his hershey bars.",
+    "Side-Channel Attacks on Machine Learning Accelerators.",
+    "Detecting side channel attackers with learned fuzzing.",
+    "Fuzzing, fuzzers and FUZZ: the attack of the fuzzed.",
+    "Malicious users attacking user detection systems.",
+    "Recognition of malicious attacks: a side channel view.",
+    "Privacy-preserving federated machine-learning.",
+]
+
+
+# The loops the automaton replaces: one substring or token window test per keyword and title
+def naive_score(title, mode):
+    if mode == "substring":
+        return sum(weight for keyword, weight in KEYWORDS.items() if keyword in title.lower())
+    normalize = stem if mode == "stem" else str
+    tokens = [normalize(token) for token in TOKEN.findall(title.lower())]
+    score = 0.0
+    for keyword, weight in KEYWORDS.items():
+        words = [normalize(token) for token in TOKEN.findall(keyword)]
+        if any(tokens[i:i + len(words)] == words for i in range(len(tokens) - len(words) + 1)):
+            score += weight
+    return score
+
+
+@pytest.mark.parametrize("mode", MATCH_MODES)
+def test_automaton_scores_like_the_naive_loops(mode):
+    scorer = KeywordScorer(KEYWORDS, mode)
+    expected = [naive_score(title, mode) for title in TITLES]
+    assert scorer.score_many(TITLES) == pytest.approx(expected)
+    assert [scorer.score(title) for title in TITLES] == pytest.approx(expected)
+    # Matches never run across the titles of a page
+    assert scorer.score_many(["machine", "learning"]) == pytest.approx([0.0, naive_score("learning", mode)])
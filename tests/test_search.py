@@ -0,0 +1,31 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.dblp_stub import StubRecord, api_page, html_page
+from common.dump import iter_dump
+from common.search import HAS_LXML, parse_api_page, parse_html_page
+
+HTML_PARSERS = ["html.parser", "selective"] + (["lxml"] if HAS_LXML else [])
+
+
+# dblp numbers homonyms; the number must survive every backend, or "Wei Wang*" misses "Wei Wang 0001"
+@pytest.mark.parametrize("backend", ["json", "dump"] + HTML_PARSERS)
+def test_homonym_numbers_are_kept(backend, tmp_path):
+    authors = ["Wei Wang 0001", "Anna Li", "Wei Wang 0042"]
+    record = StubRecord("conf/ccs/P2024x0", 2024, "Fuzzing kernels.", "CCS", "1-12", authors, "inproceedings")
+    if backend == "json":
+        records, _, _ = parse_api_page(json.loads(api_page([record], 1, 0, "https://dblp.org")), "inproceedings")
+    elif backend == "dump":
+        path = tmp_path / "dblp.xml"
+        path.write_text('<?xml version="1.0"?><dblp><inproceedings key="conf/ccs/P2024x0">'
+                        + "".join(f"<author>{author}</author>" for author in authors)
+                        + "<title>Fuzzing kernels.</title><booktitle>CCS</booktitle><year>2024</year>"
+                          "</inproceedings></dblp>", encoding="utf-8")
+        records = list(iter_dump(str(path), record_types=("inproceedings",)))
+    else:
+        records, _ = parse_html_page(html_page([record], "https://dblp.org"), "inproceedings", backend)
+    assert [list(r.authors) for r in records] == [authors]
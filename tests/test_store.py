@@ -0,0 +1,39 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.store import PaperRow, PaperStore
+
+
+def row(key, title, score, accepted):
+    return PaperRow(key, "ccs", "CCS", title, 2024, "1-12", ["Anna Li"], f"https://dblp.org/rec/{key}.html?view=bibtex",
+                    score, accepted)
+
+
+def test_recrawl_keeps_the_rescored_selection(tmp_path):
+    store = PaperStore(str(tmp_path / "papers.sqlite"))
+    first = [row("conf/ccs/A", "Kernel fuzzing.", 0.8, True), row("conf/ccs/B", "Graph learning.", 0.0, False)]
+    assert store.add_page(first) == first
+
+    # rescore.py with other keywords: B is now the only accepted paper
+    rowids = {title: rowid for chunk in store.iter_titles() for rowid, title in chunk}
+    assert store.rescore([(rowids["Kernel fuzzing."], 0.1), (rowids["Graph learning."], 2.5)], 1.0) == 1
+
+    # A re-crawl with the crawl-time keywords adds nothing and leaves the selection alone
+    again = [row("conf/ccs/A", "Kernel fuzzing.", 0.8, True), row("conf/ccs/B", "Graph learning.", 0.0, False)]
+    assert store.add_page(again) == []
+    assert store._db.execute("SELECT key, score, accepted FROM papers ORDER BY key").fetchall() == [
+        ("conf/ccs/A", 0.1, 0), ("conf/ccs/B", 2.5, 1)]
+    store.close()
+
+
+def test_missing_bibtex_before_a_run(tmp_path):
+    store = PaperStore(str(tmp_path / "papers.sqlite"))
+    store.add_page([row("conf/ccs/A", "Kernel fuzzing.", 0.8, True), row("conf/ccs/B", "Graph learning.", 0.0, False)])
+    store._db.execute("UPDATE papers SET added_at = 100.0")
+    store.add_page([row("conf/ccs/C", "Fuzzing again.", 0.8, True)])
+    assert [key for key, _, _ in store.missing_bibtex()] == ["conf/ccs/A", "conf/ccs/C"]
+    assert [key for key, _, _ in store.missing_bibtex(before=200.0)] == ["conf/ccs/A"]
+    store.set_bibtex("conf/ccs/A", "@inproceedings{...}")
+    assert store.missing_bibtex(before=200.0) == []
+    store.close()
@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.dblp_stub import Corpus
+from common.venues import VenueMatcher, batch_units, venue_set
+
+
+def test_multi_word_venue_batched_with_a_normal_one():
+    units = batch_units(["usenix atc", "ccs"], 10, "conf")
+    assert units == [("usenix atc", "ccs")]
+    matcher = VenueMatcher(units[0], "conf")
+    query = matcher.query()
+    # One token of OR'ed stream filters, so the batch is not split
+    assert query.split() == [query]
+    assert query == "streamid:conf/usenix:|streamid:conf/ccs:"
+
+    records = Corpus(papers_per_year=5, first_year=2020, last_year=2021).search(query)
+    routed = [matcher.route(record.key, record.venue) for record in records]
+    assert routed.count("usenix atc") == 10
+    assert routed.count("ccs") == 10
+
+
+def test_venue_without_a_stream_token_is_crawled_alone():
+    units = batch_units(["ccs", "my workshop", "ndss", "sp"], 2, "conf")
+    assert units == [("ccs", "ndss"), ("sp",), "my workshop"]
+
+
+def test_every_default_venue_is_one_query_token():
+    for category, prefix in (("conference", "conf"), ("journal", "journals")):
+        for unit in batch_units(venue_set[category], 10, prefix):
+            assert isinstance(unit, tuple)
+            assert len(VenueMatcher(unit, prefix).query().split()) == 1